@@ -1,8 +1,8 @@
 import streamlit as st
 import json
 import os
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from sheets_schema import SHEET_SCHEMAS
+from sheets_utils import ensure_sheets, get_spreadsheet
 
 st.set_page_config(
     page_title="Para Komuta Merkezi",
@@ -15,55 +15,15 @@ st.set_page_config(
 # GOOGLE SHEETS AUTO-SETUP FUNCTIONS
 # =============================================================================
 
-@st.cache_resource
-def get_sheets_client(_creds_data):
-    """Connect to Google Sheets using credentials from session state."""
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(_creds_data, scope)
-    client = gspread.authorize(creds)
-    return client.open("PKM Database")
-
 def initialize_all_sheets(spreadsheet):
     """
     Tüm gerekli sheet'leri kontrol et ve eksik olanları oluştur.
     Kullanıcı hiçbir şey yapmaz - otomatik kurulum!
+    Tek metadata isteği + tek batchUpdate; doğrulanan spreadsheet süreç boyunca
+    tekrar kontrol edilmez (bkz. sheets_utils.ensure_sheets).
     """
-    # Tüm gerekli sheet'ler ve başlık satırları
-    required_sheets = {
-        'assets': ['ID', 'asset_type', 'symbol', 'amount', 'buy_price', 'data_source', 'manual_price', 'basket', 'created_at'],
-        'debts': ['ID', 'debt_type', 'description', 'amount', 'due_date'],
-        'asset_history': ['ID', 'asset_id', 'action', 'amount', 'price', 'date', 'notes'],
-        'debt_history': ['ID', 'debt_id', 'action', 'amount', 'date', 'notes'],
-        'closed_positions': ['ID', 'symbol', 'asset_type', 'amount', 'buy_price', 'sell_price', 'profit_loss', 'buy_date', 'sell_date', 'notes'],
-        'Pozisyonlar': ['ID', 'Symbol', 'Tip', 'Pozisyon', 'Giriş', 'Stop', 'Hedef', 'Miktar', 'Durum', 'Tarih'],
-        'Gorsel_Tecrubeler': ['ID', 'Tarih', 'Baslik', 'Aciklama', 'Kategori', 'Gorsel_URL', 'Delete_URL'],
-        'Kategoriler': ['ID', 'Kategori_Adi', 'Renk'],
-        'Ozlu_Sozler': ['ID', 'Tarih', 'Soz'],
-        'Kendime_Notlar': ['ID', 'Tarih', 'Not'],
-        'Challenge': ['ID', 'Tarih', 'Kar_Zarar', 'Kasa', 'Kalan_Gun', 'Hedef', 'Hedefe_Kalan_Tutar'],
-        'Challenge_Settings': ['Baslangic_Sermaye', 'Hedef_Tutar', 'Hedef_Sure_Gun', 'Baslangic_Tarihi'],
-        'Challenge_Trades': ['ID', 'Yon', 'Enstruman', 'Giris_Fiyat', 'Lot', 'Cikis_Fiyat', 'Kar_Zarar', 'Durum', 'Acilis_Tarihi', 'Kapanis_Tarihi']
-    }
-
-    created_sheets = []
-    existing_sheets = []
-
-    for sheet_name, headers in required_sheets.items():
-        try:
-            # Önce var mı kontrol et
-            spreadsheet.worksheet(sheet_name)
-            existing_sheets.append(sheet_name)
-        except gspread.exceptions.WorksheetNotFound:
-            # Yoksa oluştur
-            try:
-                sheet = spreadsheet.add_worksheet(title=sheet_name, rows=100, cols=len(headers))
-                # Başlık satırını ekle
-                sheet.append_row(headers)
-                created_sheets.append(sheet_name)
-            except Exception as e:
-                st.error(f"❌ '{sheet_name}' sheet'i oluşturulurken hata: {e}")
-
-    return created_sheets, existing_sheets
+    # Tüm gerekli sheet'ler ve başlık satırları sheets_schema kaydından gelir
+    return ensure_sheets(spreadsheet, SHEET_SCHEMAS)
 
 # =============================================================================
 # LOCALSTORAGE PERSISTENCE
@@ -269,7 +229,7 @@ if 'sheets_initialized' not in st.session_state:
 if st.session_state['credentials_loaded'] and not st.session_state['sheets_initialized']:
     with st.spinner("📊 Google Sheets bağlantısı kontrol ediliyor..."):
         try:
-            db = get_sheets_client(st.session_state['credentials_data'])
+            db = get_spreadsheet(st.session_state['credentials_data'])
 
             with st.spinner("🔧 Gerekli sheet'ler kontrol ediliyor ve oluşturuluyor..."):
                 created_sheets, existing_sheets = initialize_all_sheets(db)
@@ -284,14 +244,9 @@ if st.session_state['credentials_loaded'] and not st.session_state['sheets_initi
             if existing_sheets:
                 st.info(f"ℹ️ {len(existing_sheets)} sheet zaten mevcut.")
 
-            # Başarılı kurulum işaretle
+            # Başarılı kurulum işaretle (bekleme/rerun yok, panel aynı çalıştırmada açılır)
             st.session_state['sheets_initialized'] = True
 
-            # 2 saniye bekle ve sayfayı yenile
-            import time
-            time.sleep(2)
-            st.rerun()
-
         except Exception as e:
             st.error(f"❌ Google Sheets bağlantı hatası: {e}")
             st.warning("Lütfen Google Sheets'inizin adının **'PKM Database'** olduğundan ve service account'a paylaşıldığından emin olun!")
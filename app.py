@@ -1,17 +1,13 @@
 import streamlit as st
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
 from datetime import datetime
+from sheets_utils import open_spreadsheet_from_file
 
 st.set_page_config(page_title="Para Komuta Merkezi", page_icon="💰", layout="wide")
 
-@st.cache_resource
 def get_sheets():
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name("credentials.json", scope)
-    client = gspread.authorize(creds)
-    return client.open("PKM Database")
+    # Bağlantı sheets_utils havuzundan (credentials.json hesabı başına tek client)
+    return open_spreadsheet_from_file("credentials.json", "PKM Database")
 
 def main():
     st.title("💰 Para Komuta Merkezi")
@@ -4,8 +4,6 @@ Portfolio Management Platform with Dark Theme
 """
 
 import streamlit as st
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
 from datetime import datetime
 import yfinance as yf
@@ -13,6 +11,7 @@ import plotly.graph_objects as go
 import plotly.express as px
 from time import time
 import threading
+from sheets_utils import NUMERIC_COLUMNS, get_records, get_values, invalidate, open_spreadsheet_from_file
 
 # Page Config
 st.set_page_config(
@@ -162,47 +161,11 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Cache for Google Sheets connection
-@st.cache_resource
-def get_sheets_client():
-    """Connect to Google Sheets."""
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name("credentials.json", scope)
-    client = gspread.authorize(creds)
-    return client.open("PKM Database")
-
 # Price cache to avoid too many API calls
 price_cache = {}
 cache_lock = threading.Lock()
 CACHE_DURATION = 300  # 5 minutes
 
-def parse_turkish_decimal(value):
-    """
-    Parse Turkish decimal format (comma as decimal separator) to float.
-    Google Sheets with Turkish locale returns decimals as "16,23" instead of "16.23"
-    """
-    if value is None or value == '':
-        return 0.0
-
-    # If already a number, return it
-    if isinstance(value, (int, float)):
-        return float(value)
-
-    # If string, parse Turkish format
-    if isinstance(value, str):
-        # Remove any spaces and TL currency symbol
-        value = value.strip().replace(' TL', '').replace('TL', '').strip()
-
-        # Replace comma with period for decimal parsing
-        value = value.replace(',', '.')
-
-        try:
-            return float(value)
-        except ValueError:
-            return 0.0
-
-    return 0.0
-
 def format_currency(value):
     """Format currency value, hiding if privacy mode is active."""
     if st.session_state.get('privacy_mode', False):
@@ -217,51 +180,6 @@ def format_number(value, decimals=2):
         return f"{value:,.0f}"
     return f"{value:,.{decimals}f}"
 
-def get_sheet_data_as_dict(worksheet):
-    """
-    Get worksheet data as list of dictionaries, properly handling Turkish decimal format.
-    This replaces get_all_records() which incorrectly parses Turkish decimals.
-    """
-    # Get all values as raw strings
-    all_values = worksheet.get_all_values()
-
-    if not all_values or len(all_values) < 2:
-        return []
-
-    # First row is headers
-    headers = all_values[0]
-
-    # Convert rows to dictionaries
-    records = []
-    for row in all_values[1:]:  # Skip header
-        if not any(row):  # Skip empty rows
-            continue
-
-        record = {}
-        for i, header in enumerate(headers):
-            if i < len(row):
-                value = row[i]
-
-                # Parse numeric columns with Turkish decimal format
-                if header in ['amount', 'buy_price', 'manual_price', 'total_value', 'total_debt',
-                              'sell_price', 'profit_loss_percent']:
-                    record[header] = parse_turkish_decimal(value)
-                # Parse ID columns as integers
-                elif header == 'ID':
-                    try:
-                        record[header] = int(value) if value else 0
-                    except ValueError:
-                        record[header] = 0
-                # Everything else as string
-                else:
-                    record[header] = str(value)
-            else:
-                record[header] = ''
-
-        records.append(record)
-
-    return records
-
 def fetch_price(symbol, asset_type):
     """Fetch current price using yfinance with caching - EXACTLY like Flask app."""
     cache_key = f"{asset_type}:{symbol}"
@@ -498,13 +416,13 @@ def main():
 
     try:
         # Connect to database
-        db = get_sheets_client()
+        db = open_spreadsheet_from_file("credentials.json")
         assets_sheet = db.worksheet("assets")
         debts_sheet = db.worksheet("debts")
 
         # Get data - Using custom function to handle Turkish decimal format
-        assets_data = get_sheet_data_as_dict(assets_sheet)
-        debts_data = get_sheet_data_as_dict(debts_sheet)
+        assets_data = get_records(assets_sheet, NUMERIC_COLUMNS)
+        debts_data = get_records(debts_sheet, NUMERIC_COLUMNS)
 
         # Convert to DataFrames
         assets_df = pd.DataFrame(assets_data) if assets_data else pd.DataFrame()
@@ -733,7 +651,7 @@ def main():
             # Asset History Line Chart - Modern ve dramatik görünüm
             st.markdown("#### Toplam Varlığın Tarihsel Değişimi")
             history_sheet = db.worksheet("asset_history")
-            history_data = get_sheet_data_as_dict(history_sheet)
+            history_data = get_records(history_sheet, NUMERIC_COLUMNS)
 
             if history_data:
                 dates = [h['date'] for h in history_data]
@@ -883,7 +801,7 @@ def main():
 
                     # Save to asset_history
                     history_sheet = db.worksheet("asset_history")
-                    history_data = get_sheet_data_as_dict(history_sheet)
+                    history_data = get_records(history_sheet, NUMERIC_COLUMNS, refresh=True)
 
                     # Get max ID
                     max_id = max([h.get('ID', 0) for h in history_data], default=0) if history_data else 0
@@ -891,10 +809,11 @@ def main():
 
                     # Add new history record
                     history_sheet.append_row([new_id, date_str, total_wealth])
+                    invalidate(history_sheet)
 
                     # Save to debt_history
                     debt_history_sheet = db.worksheet("debt_history")
-                    debt_hist_data = get_sheet_data_as_dict(debt_history_sheet)
+                    debt_hist_data = get_records(debt_history_sheet, NUMERIC_COLUMNS, refresh=True)
 
                     # Get max ID
                     max_id = max([d.get('ID', 0) for d in debt_hist_data], default=0) if debt_hist_data else 0
@@ -902,6 +821,7 @@ def main():
 
                     # Add new debt history record
                     debt_history_sheet.append_row([new_id, date_str, total_debt])
+                    invalidate(debt_history_sheet)
 
                     st.success(f"✅ Günlük snapshot başarıyla kaydedildi! ({date_str})")
                     st.rerun()
@@ -1043,7 +963,7 @@ def show_assets_tab(assets_df, sheet, asset_type, type_label):
 
             if submitted and symbol and amount > 0 and buy_price > 0:
                 # Get max ID
-                all_data = get_sheet_data_as_dict(sheet)
+                all_data = get_records(sheet, NUMERIC_COLUMNS, refresh=True)
                 max_id = max([item.get("ID", 0) for item in all_data], default=0)
                 new_id = max_id + 1
 
@@ -1060,6 +980,7 @@ def show_assets_tab(assets_df, sheet, asset_type, type_label):
                     basket,
                     now
                 ])
+                invalidate(sheet)
 
                 st.success(f"✅ {symbol.upper()} başarıyla eklendi!")
                 st.session_state[f"show_add_modal_{asset_type}"] = False
@@ -1263,7 +1184,7 @@ def show_assets_tab(assets_df, sheet, asset_type, type_label):
 
                 if submitted and new_symbol and new_amount > 0 and new_buy_price > 0:
                     # Find and update the row in Google Sheets
-                    all_values = sheet.get_all_values()
+                    all_values = get_values(sheet, refresh=True)
 
                     for row_idx, row in enumerate(all_values[1:], start=2):  # Start from row 2 (skip header)
                         if int(row[0]) == st.session_state[f"edit_asset_id_{asset_type}"]:
@@ -1280,6 +1201,7 @@ def show_assets_tab(assets_df, sheet, asset_type, type_label):
                                 row[8] if len(row) > 8 else ''  # Keep original created_at
                             ]
                             sheet.update(f'A{row_idx}:I{row_idx}', [updated_row])
+                            invalidate(sheet)
                             break
 
                     st.success(f"✅ {new_symbol.upper()} güncellendi!")
@@ -1326,7 +1248,7 @@ def show_assets_tab(assets_df, sheet, asset_type, type_label):
 
                     # Get closed positions sheet
                     closed_sheet = db.worksheet("closed_positions")
-                    closed_data = get_sheet_data_as_dict(closed_sheet)
+                    closed_data = get_records(closed_sheet, NUMERIC_COLUMNS, refresh=True)
 
                     # Get max ID
                     max_id = max([item.get("ID", 0) for item in closed_data], default=0) if closed_data else 0
@@ -1344,12 +1266,14 @@ def show_assets_tab(assets_df, sheet, asset_type, type_label):
                         profit_loss,
                         now
                     ])
+                    invalidate(closed_sheet)
 
                     # Delete from assets
-                    all_values = sheet.get_all_values()
+                    all_values = get_values(sheet, refresh=True)
                     for row_idx, row in enumerate(all_values[1:], start=2):
                         if int(row[0]) == st.session_state[f"close_position_id_{asset_type}"]:
                             sheet.delete_rows(row_idx)
+                            invalidate(sheet)
                             break
 
                     st.success(f"✅ {close_data.get('symbol', '').upper()} pozisyonu kapatıldı! K/Z: {profit_loss:+.2f}%")
@@ -1374,11 +1298,12 @@ def show_assets_tab(assets_df, sheet, asset_type, type_label):
             with col1:
                 if st.button("🗑️ Evet, Sil", key=f"confirm_delete_{asset_type}", use_container_width=True):
                     # Find and delete the row
-                    all_values = sheet.get_all_values()
+                    all_values = get_values(sheet, refresh=True)
 
                     for row_idx, row in enumerate(all_values[1:], start=2):  # Start from row 2
                         if int(row[0]) == st.session_state[f"delete_asset_id_{asset_type}"]:
                             sheet.delete_rows(row_idx)
+                            invalidate(sheet)
                             break
 
                     st.success(f"✅ {st.session_state[f'delete_asset_symbol_{asset_type}']} silindi!")
@@ -1436,13 +1361,14 @@ def show_debts_tab(debts_df, sheet):
 
             if submitted and description and amount > 0:
                 # Get max ID
-                all_data = get_sheet_data_as_dict(sheet)
+                all_data = get_records(sheet, NUMERIC_COLUMNS, refresh=True)
                 max_id = max([item.get("ID", 0) for item in all_data], default=0)
                 new_id = max_id + 1
 
                 # Add to sheet
                 now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 sheet.append_row([new_id, description, amount, now])
+                invalidate(sheet)
 
                 st.success(f"✅ Borç başarıyla eklendi!")
                 st.session_state["show_add_debt_modal"] = False
@@ -1509,7 +1435,7 @@ def show_debts_tab(debts_df, sheet):
 
                 if submitted and new_description and new_amount > 0:
                     # Find and update the row in Google Sheets
-                    all_values = sheet.get_all_values()
+                    all_values = get_values(sheet, refresh=True)
 
                     for row_idx, row in enumerate(all_values[1:], start=2):  # Start from row 2 (skip header)
                         if int(row[0]) == st.session_state["edit_debt_id"]:
@@ -1521,6 +1447,7 @@ def show_debts_tab(debts_df, sheet):
                                 row[3] if len(row) > 3 else ''  # Keep original created_at
                             ]
                             sheet.update(f'A{row_idx}:D{row_idx}', [updated_row])
+                            invalidate(sheet)
                             break
 
                     st.success(f"✅ {new_description} güncellendi!")
@@ -1542,11 +1469,12 @@ def show_debts_tab(debts_df, sheet):
             with col1:
                 if st.button("🗑️ Evet, Sil", key="confirm_delete_debt", use_container_width=True):
                     # Find and delete the row
-                    all_values = sheet.get_all_values()
+                    all_values = get_values(sheet, refresh=True)
 
                     for row_idx, row in enumerate(all_values[1:], start=2):  # Start from row 2
                         if int(row[0]) == st.session_state["delete_debt_id"]:
                             sheet.delete_rows(row_idx)
+                            invalidate(sheet)
                             break
 
                     st.success(f"✅ {st.session_state['delete_debt_description']} silindi!")
@@ -1571,7 +1499,7 @@ def show_closed_positions_tab(db):
 
     # Get closed positions data
     closed_sheet = db.worksheet("closed_positions")
-    closed_data = get_sheet_data_as_dict(closed_sheet)
+    closed_data = get_records(closed_sheet, NUMERIC_COLUMNS)
 
     if closed_data:
         # Calculate statistics - Flask uygulamasındaki gibi
@@ -1649,6 +1577,7 @@ def show_closed_positions_tab(db):
                 profit_loss_percent = ((sell_price - buy_price) / buy_price) * 100
 
                 # Get max ID
+                closed_data = get_records(closed_sheet, NUMERIC_COLUMNS, refresh=True)
                 max_id = max([item.get("ID", 0) for item in closed_data], default=0) if closed_data else 0
                 new_id = max_id + 1
 
@@ -1664,6 +1593,7 @@ def show_closed_positions_tab(db):
                     profit_loss_percent,
                     now
                 ])
+                invalidate(closed_sheet)
 
                 st.success(f"✅ {symbol.upper()} kapanan pozisyon olarak eklendi!")
                 st.session_state["show_add_closed_modal"] = False
@@ -1791,7 +1721,7 @@ def show_closed_positions_tab(db):
                     new_profit_loss = ((new_sell_price - new_buy_price) / new_buy_price) * 100
 
                     # Find the row to update
-                    all_values = closed_sheet.get_all_values()
+                    all_values = get_values(closed_sheet, refresh=True)
                     headers = all_values[0]
 
                     for row_idx, row in enumerate(all_values[1:], start=2):  # Start from row 2 (skip header)
@@ -1807,6 +1737,7 @@ def show_closed_positions_tab(db):
                                 new_profit_loss,
                                 row[6]  # Keep original created_at
                             ]])
+                            invalidate(closed_sheet)
                             break
 
                     st.success(f"✅ {new_symbol.upper()} güncellendi!")
@@ -1828,11 +1759,12 @@ def show_closed_positions_tab(db):
             with col1:
                 if st.button("🗑️ Evet, Sil", key="confirm_delete_closed", use_container_width=True):
                     # Find and delete the row
-                    all_values = closed_sheet.get_all_values()
+                    all_values = get_values(closed_sheet, refresh=True)
 
                     for row_idx, row in enumerate(all_values[1:], start=2):  # Start from row 2
                         if int(row[0]) == st.session_state["delete_closed_id"]:
                             closed_sheet.delete_rows(row_idx)
+                            invalidate(closed_sheet)
                             break
 
                     st.success(f"✅ {st.session_state['delete_closed_symbol']} silindi!")
@@ -4,15 +4,17 @@ Portfolio Management Platform with Dark Theme
 """
 
 import streamlit as st
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
 from datetime import datetime
-import yfinance as yf
+from time import time
 import plotly.graph_objects as go
 import plotly.express as px
-from time import time
-import threading
+from price_utils import PRICE_DEADLINE, get_fx_rates, get_market_quotes, get_portfolio_prices, price_service_stats
+from portfolio_utils import STALE_STATUSES, value_portfolio
+from price_refresher import start_price_refresher
+from sheets_quota import quota_stats
+from sheets_utils import (NUMERIC_COLUMNS, append_record, delete_record, get_row, get_spreadsheet,
+                          get_worksheet, invalidate, load_frames, load_records, next_id, sheet_cache)
 
 # Page Config
 st.set_page_config(
@@ -173,46 +175,8 @@ if 'credentials_data' not in st.session_state or not st.session_state.get('crede
         st.switch_page("Home.py")
     st.stop()
 
-# Cache for Google Sheets connection
-@st.cache_resource
-def get_sheets_client(_creds_data):
-    """Connect to Google Sheets using credentials from session state."""
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(_creds_data, scope)
-    client = gspread.authorize(creds)
-    return client.open("PKM Database")
-
-# Price cache to avoid too many API calls
-price_cache = {}
-cache_lock = threading.Lock()
-CACHE_DURATION = 1800  # 30 minutes (daha az API çağrısı = daha hızlı)
-
-def parse_turkish_decimal(value):
-    """
-    Parse Turkish decimal format (comma as decimal separator) to float.
-    Google Sheets with Turkish locale returns decimals as "16,23" instead of "16.23"
-    """
-    if value is None or value == '':
-        return 0.0
-
-    # If already a number, return it
-    if isinstance(value, (int, float)):
-        return float(value)
-
-    # If string, parse Turkish format
-    if isinstance(value, str):
-        # Remove any spaces and TL currency symbol
-        value = value.strip().replace(' TL', '').replace('TL', '').strip()
-
-        # Replace comma with period for decimal parsing
-        value = value.replace(',', '.')
-
-        try:
-            return float(value)
-        except ValueError:
-            return 0.0
-
-    return 0.0
+# Opsiyonel arka plan fiyat yenileyicisi (PKM_PRICE_REFRESHER=1 ise süreç başına bir kez)
+start_price_refresher(st.session_state['credentials_data'])
 
 def format_currency(value):
     """Format currency value, hiding if privacy mode is active."""
@@ -228,212 +192,61 @@ def format_number(value, decimals=2):
         return f"{value:,.0f}"
     return f"{value:,.{decimals}f}"
 
-def get_sheet_data_as_dict(worksheet):
-    """
-    Get worksheet data as list of dictionaries, properly handling Turkish decimal format.
-    This replaces get_all_records() which incorrectly parses Turkish decimals.
-    """
-    # Get all values as raw strings
-    all_values = worksheet.get_all_values()
-
-    if not all_values or len(all_values) < 2:
-        return []
-
-    # First row is headers
-    headers = all_values[0]
-
-    # Convert rows to dictionaries
-    records = []
-    for row in all_values[1:]:  # Skip header
-        if not any(row):  # Skip empty rows
-            continue
-
-        record = {}
-        for i, header in enumerate(headers):
-            if i < len(row):
-                value = row[i]
-
-                # Parse numeric columns with Turkish decimal format
-                if header in ['amount', 'buy_price', 'manual_price', 'total_value', 'total_debt',
-                              'sell_price', 'profit_loss_percent']:
-                    record[header] = parse_turkish_decimal(value)
-                # Parse ID columns as integers
-                elif header == 'ID':
-                    try:
-                        record[header] = int(value) if value else 0
-                    except ValueError:
-                        record[header] = 0
-                # Everything else as string
-                else:
-                    record[header] = str(value)
-            else:
-                record[header] = ''
-
-        records.append(record)
+# Portföy sayfasının okuduğu tüm sheet'ler (tek values_batch_get ile)
+PORTFOLIO_SHEETS = ['assets', 'debts', 'asset_history', 'closed_positions']
 
-    return records
-
-def fetch_price(symbol, asset_type):
-    """Fetch current price using yfinance with caching and timeout protection."""
-    cache_key = f"{asset_type}:{symbol}"
-
-    # Check cache
-    with cache_lock:
-        if cache_key in price_cache:
-            cached_data = price_cache[cache_key]
-            if time() - cached_data['timestamp'] < CACHE_DURATION:
-                return cached_data['price']
-
-    try:
-        # Hisse senetleri için .IS ekleme
-        if asset_type == 'hisse' and not symbol.endswith('.IS'):
-            symbol = symbol + '.IS'
+# Piyasa şeridi: kart anahtarı -> Yahoo Finance ticker'ı
+MARKET_TICKERS = {
+    'usd_tl': 'USDTRY=X',
+    'gold': 'GC=F',
+    'bitcoin': 'BTC-USD',
+    'bist100': 'XU100.IS'
+}
 
-        ticker = yf.Ticker(symbol)
-
-        # TIMEOUT: Maksimum 5 saniye (agresif!)
-        data = ticker.history(period='1d', timeout=5)
-
-        if not data.empty:
-            price = data['Close'].iloc[-1]
-
-            # Cache the price
-            with cache_lock:
-                price_cache[cache_key] = {
-                    'price': price,
-                    'timestamp': time()
-                }
-
-            return price
-        else:
-            print(f"⚠️ {symbol} - Veri boş döndü")
-
-    except TimeoutError as e:
-        print(f"⏱️ {symbol} - TIMEOUT (5 saniye aşıldı), alış fiyatı kullanılacak")
-    except Exception as e:
-        print(f"❌ {symbol} - Hata: {str(e)[:100]}")
-
-    return None
-
-def get_usd_tl_rate():
-    """Get USD/TL exchange rate - tries multiple tickers with timeout."""
-    # Birden fazla ticker dene (Yahoo Finance bazen ticker değiştiriyor)
-    tickers_to_try = ["USDTRY=X", "TRY=X", "TRYUSD=X"]
-
-    for ticker_symbol in tickers_to_try:
-        try:
-            ticker = yf.Ticker(ticker_symbol)
-            # TIMEOUT: Maksimum 5 saniye (agresif!)
-            data = ticker.history(period='1d', timeout=5)
-            if not data.empty:
-                rate = data['Close'].iloc[-1]
-                # TRY=X tersten geliyorsa düzelt
-                if ticker_symbol == "TRY=X" and rate < 1:
-                    rate = 1 / rate
-                # Makul aralıkta mı kontrol et (30-50 TL arası)
-                if 30 <= rate <= 50:
-                    print(f"✅ USD/TL kuru: {rate:.4f} ({ticker_symbol})")
-                    return rate
-        except TimeoutError:
-            print(f"⏱️ {ticker_symbol} timeout - sonrakini deniyorum")
-            continue
-        except Exception as e:
-            print(f"❌ {ticker_symbol} hata: {str(e)[:50]}")
-            continue
-
-    # Hiçbiri çalışmazsa fallback
-    print("⚠️ USD/TL kuru çekilemedi, fallback kullanılıyor: 42.0")
-    return 42.0  # Güncel fallback değer (manuel güncelle)
-
-def get_market_data():
-    """Get market data for dashboard."""
-    market_data = {}
+def get_market_data(deadline=PRICE_DEADLINE):
+    """
+    Get market data for dashboard.
+    Tek paralel çağrı, portföy fiyat cache'ini paylaşır; market_data['ages'] her verinin yaşı (sn).
+    deadline: rerun'ın fiyat süresinden kalan (saniye)
+    """
+    market_data = {'ages': {}}
 
     try:
-        # USD/TL
-        usd_tl = get_usd_tl_rate()
-        market_data['usd_tl'] = usd_tl
-
-        # Gold (USD)
-        gold_ticker = yf.Ticker("GC=F")
-        gold_data = gold_ticker.history(period='1d')
-        if not gold_data.empty:
-            market_data['gold'] = gold_data['Close'].iloc[-1]
-
-        # Bitcoin
-        btc_ticker = yf.Ticker("BTC-USD")
-        btc_data = btc_ticker.history(period='1d')
-        if not btc_data.empty:
-            market_data['bitcoin'] = btc_data['Close'].iloc[-1]
-
-        # BIST100
-        bist_ticker = yf.Ticker("XU100.IS")
-        bist_data = bist_ticker.history(period='1d')
-        if not bist_data.empty:
-            market_data['bist100'] = bist_data['Close'].iloc[-1]
+        quotes = get_market_quotes([t for t in MARKET_TICKERS.values() if t != 'USDTRY=X'], deadline)
+        for key, ticker_symbol in MARKET_TICKERS.items():
+            if ticker_symbol in quotes:
+                market_data[key] = quotes[ticker_symbol]['price']
+                market_data['ages'][key] = quotes[ticker_symbol]['age']
     except Exception as e:
         st.warning(f"Piyasa verisi alma hatası: {e}")
 
     return market_data
 
-def calculate_portfolio_value(assets_df):
+def format_age(seconds):
+    """Veri yaşını okunur hale getirir (örn. 'şimdi', '5 dk', '3 sa', '2 gün')."""
+    if seconds is None:
+        return "-"
+    if seconds < 60:
+        return "şimdi"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} dk"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)} sa"
+    return f"{int(seconds // 86400)} gün"
+
+def calculate_portfolio_value(valuation_df):
     """Calculate total portfolio value - EXACTLY like Flask app."""
-    if assets_df.empty:
+    if valuation_df.empty:
         return 0
 
-    usd_tl_rate = get_usd_tl_rate()
-    total_value = 0
-
-    for _, asset in assets_df.iterrows():
-        # Manuel veri kaynağı kontrolü (EXACTLY like Flask app)
-        if asset['data_source'] == 'manuel':
-            current_price = asset['manual_price']
-        else:
-            # Otomatik fiyat getir
-            current_price = fetch_price(asset['symbol'], asset['asset_type'])
-            if current_price is None:
-                # Fiyat alınamazsa alış fiyatını kullan (EXACTLY like Flask app)
-                current_price = asset['buy_price']
-
-        asset_value = asset['amount'] * current_price
-
-        # Kripto paralar USD bazlı, TL'ye çevir (EXACTLY like Flask app)
-        if asset['asset_type'] == 'kripto':
-            asset_value = asset_value * usd_tl_rate
+    return float(valuation_df['value_tl'].sum())
 
-        total_value += asset_value
-
-    return total_value
-
-def calculate_asset_distribution(assets_df):
+def calculate_asset_distribution(valuation_df):
     """Calculate asset distribution by type - EXACTLY like Flask app."""
-    if assets_df.empty:
+    if valuation_df.empty:
         return None
 
-    usd_tl_rate = get_usd_tl_rate()
-    distribution = {}
-
-    for _, asset in assets_df.iterrows():
-        asset_type = asset['asset_type']
-
-        # Get current price
-        if asset['data_source'] == 'manuel':
-            current_price = asset['manual_price']
-        else:
-            current_price = fetch_price(asset['symbol'], asset['asset_type'])
-            if current_price is None:
-                current_price = asset['buy_price']
-
-        value = asset['amount'] * current_price
-
-        # Kripto paralar USD bazlı, TL'ye çevir
-        if asset_type == 'kripto':
-            value = value * usd_tl_rate
-
-        if asset_type in distribution:
-            distribution[asset_type] += value
-        else:
-            distribution[asset_type] = value
+    distribution = valuation_df.groupby('asset_type', sort=False)['value_tl'].sum().to_dict()
 
     # Kategori isimleri - Flask uygulamasındaki gibi
     labels_map = {
@@ -535,23 +348,38 @@ def main():
 
     try:
         # Connect to database using credentials from session state
-        db = get_sheets_client(st.session_state['credentials_data'])
-        assets_sheet = db.worksheet("assets")
-        debts_sheet = db.worksheet("debts")
-
-        # Get data - Using custom function to handle Turkish decimal format
-        assets_data = get_sheet_data_as_dict(assets_sheet)
-        debts_data = get_sheet_data_as_dict(debts_sheet)
-
-        # Convert to DataFrames
-        assets_df = pd.DataFrame(assets_data) if assets_data else pd.DataFrame()
-        debts_df = pd.DataFrame(debts_data) if debts_data else pd.DataFrame()
+        db = get_spreadsheet(st.session_state['credentials_data'])
+        assets_sheet = get_worksheet(db, "assets")
+        debts_sheet = get_worksheet(db, "debts")
+
+        # Get data - Sayfanın tüm sheet'leri tek istekte, şemaya göre tiplenmiş DataFrame olarak
+        sheet_frames = load_frames(db, PORTFOLIO_SHEETS)
+        sheet_data = load_records(db, ['closed_positions'], NUMERIC_COLUMNS)
+        assets_df = sheet_frames['assets']
+        debts_df = sheet_frames['debts']
+
+        # Tüm otomatik fiyatlı semboller tek seferde (toplu) çekilir,
+        # ardından tüm varlıklar tek bir vektörel geçişte değerlenir
+        prices_started = time()
+        prices, price_status = get_portfolio_prices(assets_df)
+        # Kurlar da aynı rerun süresinden pay alır: kalan sürede gelmezse son bilinen kurlar kullanılır
+        fx_rates = get_fx_rates(deadline=max(0.0, PRICE_DEADLINE - (time() - prices_started)))
+        valuation_df = value_portfolio(assets_df, prices, fx_rates, price_status) if not assets_df.empty else pd.DataFrame()
 
         # Calculate totals
-        total_wealth = calculate_portfolio_value(assets_df) if not assets_df.empty else 0
+        total_wealth = calculate_portfolio_value(valuation_df) if not valuation_df.empty else 0
         total_debt = debts_df['amount'].sum() if not debts_df.empty and 'amount' in debts_df.columns else 0
         net_worth = total_wealth - total_debt
 
+        # Süre sınırına yetişmeyen fiyatlar (⏳ ile işaretlenir)
+        if not valuation_df.empty:
+            late_symbols = valuation_df.loc[valuation_df['price_status'].isin(STALE_STATUSES), 'symbol'].tolist()
+            if late_symbols:
+                st.warning(
+                    f"⏳ {len(late_symbols)} varlığın güncel fiyatı zamanında alınamadı, "
+                    f"son bilinen fiyat veya alış fiyatı gösteriliyor: {', '.join(late_symbols)}"
+                )
+
         # Dashboard - Top Metrics (with privacy mode support) - Çerçeveli ve modern tasarım
         st.markdown("### 📊 Finansal Özet")
         col1, col2, col3 = st.columns(3)
@@ -617,7 +445,8 @@ def main():
 
         # Market Data - Colored Cards (EXACTLY like Flask app)
         st.markdown("### 📈 Piyasa Verileri")
-        market_data = get_market_data()
+        # Portföy fiyatları ve kurlarla aynı süre: rerun başına tek bütçe
+        market_data = get_market_data(deadline=max(0.0, PRICE_DEADLINE - (time() - prices_started)))
 
         col1, col2, col3, col4 = st.columns(4)
 
@@ -697,6 +526,42 @@ def main():
                 </div>
                 """, unsafe_allow_html=True)
 
+        # Piyasa verilerinin yaşı
+        market_labels = {'usd_tl': 'USD/TL', 'gold': 'Altın', 'bitcoin': 'BTC', 'bist100': 'BIST 100'}
+        ages = market_data.get('ages', {})
+        if ages:
+            st.caption("🕒 Veri yaşı: " + " · ".join(
+                f"{market_labels[key]} {format_age(age)}" for key, age in ages.items()
+            ))
+
+        # Fiyat servisi istatistikleri
+        service_stats = price_service_stats()
+        cache_stats = service_stats['cache']
+        negative_stats = service_stats['negative']
+        breaker_stats = service_stats['breaker']
+        breaker_labels = {'closed': '🟢 kapalı', 'open': '🔴 açık', 'half_open': '🟡 deneniyor'}
+        st.caption(
+            f"⚡ Fiyat cache: {cache_stats['size']} sembol | "
+            f"isabet {cache_stats['hits']} | kaçırma {cache_stats['misses']} | "
+            f"atılan {cache_stats['evictions']} · "
+            f"🚫 Hatalı sembol: {negative_stats['blocked']} (atlanan {negative_stats['skipped']}) · "
+            f"🔌 yfinance devresi: {breaker_labels[breaker_stats['state']]} "
+            f"(açılma {breaker_stats['trips']}, engellenen {breaker_stats['rejected']})"
+        )
+        sheet_stats = sheet_cache.stats()
+        st.caption(
+            f"📄 Sheet cache: {sheet_stats['size']} sayfa | isabet {sheet_stats['hits']} | "
+            f"kaçırma {sheet_stats['misses']} | temizlenen {sheet_stats['invalidations']} | "
+            f"değişmeden uzatılan {sheet_stats['revalidations']}"
+        )
+        quota = quota_stats(st.session_state['credentials_data'].get('client_email'))
+        st.caption(
+            f"🚦 Sheets kotası (son 1 dk): okuma {quota['read']['used']}/{quota['read']['limit']} | "
+            f"yazma {quota['write']['used']}/{quota['write']['limit']} · "
+            f"bekletilen {quota['read']['waits'] + quota['write']['waits']} | "
+            f"429 {quota['throttled']} | tekrar {quota['retries']}"
+        )
+
         st.divider()
 
         # Charts Section
@@ -722,7 +587,7 @@ def main():
                 </div>
                 """, unsafe_allow_html=True)
 
-                distribution = calculate_asset_distribution(assets_df)
+                distribution = calculate_asset_distribution(valuation_df)
 
                 if distribution:
                     # Renk haritası - Flask uygulamasındaki gibi
@@ -769,12 +634,11 @@ def main():
         with chart_col2:
             # Asset History Line Chart - Modern ve dramatik görünüm
             st.markdown("#### Toplam Varlığın Tarihsel Değişimi")
-            history_sheet = db.worksheet("asset_history")
-            history_data = get_sheet_data_as_dict(history_sheet)
+            history_df = sheet_frames['asset_history']
 
-            if history_data:
-                dates = [h['date'] for h in history_data]
-                values = [h['total_value'] for h in history_data]
+            if not history_df.empty:
+                dates = history_df['date']
+                values = history_df['total_value']
 
                 # Y eksenini daha dar tutarak yükselişi keskinleştir
                 min_value = min(values)
@@ -889,25 +753,25 @@ def main():
         ])
 
         with tab1:
-            show_assets_tab(assets_df, assets_sheet, "hisse", "Hisse Senedi")
+            show_assets_tab(valuation_df, assets_sheet, "hisse", "Hisse Senedi")
 
         with tab2:
-            show_assets_tab(assets_df, assets_sheet, "kripto", "Kripto Para")
+            show_assets_tab(valuation_df, assets_sheet, "kripto", "Kripto Para")
 
         with tab3:
-            show_assets_tab(assets_df, assets_sheet, "hisse_fonlari", "Hisse Fonu")
+            show_assets_tab(valuation_df, assets_sheet, "hisse_fonlari", "Hisse Fonu")
 
         with tab4:
-            show_assets_tab(assets_df, assets_sheet, "Nakit_ve_Benzeri", "Nakit")
+            show_assets_tab(valuation_df, assets_sheet, "Nakit_ve_Benzeri", "Nakit")
 
         with tab5:
-            show_assets_tab(assets_df, assets_sheet, "emtia", "Emtia")
+            show_assets_tab(valuation_df, assets_sheet, "emtia", "Emtia")
 
         with tab6:
             show_debts_tab(debts_df, debts_sheet)
 
         with tab7:
-            show_closed_positions_tab(db)
+            show_closed_positions_tab(db, sheet_data['closed_positions'])
 
         st.divider()
 
@@ -918,27 +782,13 @@ def main():
                 try:
                     date_str = datetime.now().strftime('%Y-%m-%d')
 
-                    # Save to asset_history
-                    history_sheet = db.worksheet("asset_history")
-                    history_data = get_sheet_data_as_dict(history_sheet)
-
-                    # Get max ID
-                    max_id = max([h.get('ID', 0) for h in history_data], default=0) if history_data else 0
-                    new_id = max_id + 1
-
-                    # Add new history record
-                    history_sheet.append_row([new_id, date_str, total_wealth])
+                    # Save to asset_history (ID sayaçtan, geçmiş sheet indirilmez)
+                    history_sheet = get_worksheet(db, "asset_history")
+                    append_record(history_sheet, [next_id(history_sheet), date_str, total_wealth])
 
                     # Save to debt_history
-                    debt_history_sheet = db.worksheet("debt_history")
-                    debt_hist_data = get_sheet_data_as_dict(debt_history_sheet)
-
-                    # Get max ID
-                    max_id = max([d.get('ID', 0) for d in debt_hist_data], default=0) if debt_hist_data else 0
-                    new_id = max_id + 1
-
-                    # Add new debt history record
-                    debt_history_sheet.append_row([new_id, date_str, total_debt])
+                    debt_history_sheet = get_worksheet(db, "debt_history")
+                    append_record(debt_history_sheet, [next_id(debt_history_sheet), date_str, total_debt])
 
                     st.success(f"✅ Günlük snapshot başarıyla kaydedildi! ({date_str})")
                     st.rerun()
@@ -949,78 +799,57 @@ def main():
         st.error(f"❌ Hata oluştu: {str(e)}")
         st.exception(e)
 
-def show_assets_tab(assets_df, sheet, asset_type, type_label):
+def show_assets_tab(valuation_df, sheet, asset_type, type_label):
     """Show assets for a specific type."""
 
     # Filter assets by type
-    if not assets_df.empty and 'asset_type' in assets_df.columns:
-        filtered_df = assets_df[assets_df['asset_type'] == asset_type].copy()
+    if not valuation_df.empty and 'asset_type' in valuation_df.columns:
+        filtered_df = valuation_df[valuation_df['asset_type'] == asset_type].copy()
     else:
         filtered_df = pd.DataFrame()
 
-    # PRE-CALCULATE EVERYTHING ONCE - Store in session state with unique key per asset_type
-    display_cache_key = f"display_data_{asset_type}"
-
-    # Only recalculate if not in cache
-    if display_cache_key not in st.session_state and not filtered_df.empty:
-        # Calculate all display data ONCE
-        usd_tl_rate = get_usd_tl_rate()
-        all_display_data = []
-
-        for _, asset in filtered_df.iterrows():
-            if asset['data_source'] == 'manuel':
-                current_price = asset['manual_price']
-            else:
-                current_price = fetch_price(asset['symbol'], asset['asset_type'])
-                if current_price is None:
-                    current_price = asset['buy_price']
-
-            current_value = asset['amount'] * current_price
-
-            # Convert crypto to TL
-            if asset['asset_type'] == 'kripto':
-                current_value_tl = current_value * usd_tl_rate
-            else:
-                current_value_tl = current_value
-
-            profit_loss = ((current_price - asset['buy_price']) / asset['buy_price'] * 100) if asset['buy_price'] > 0 else 0
-
-            # Add basket badge for stocks
-            basket_display = ""
-            if asset_type == 'hisse' and asset.get('basket'):
-                basket_emoji = {
-                    'buffet': '⭐',
-                    'tesla': '⚡',
-                    'tosuncuk': '💖'
-                }
-                basket_display = basket_emoji.get(asset['basket'], '')
-
-            row_data = {
-                'Sembol': f"{basket_display} {asset['symbol']}" if basket_display else asset['symbol'],
-                'Miktar': format_number(asset['amount'], decimals=4),
-                'Alış Fiyatı': format_currency(asset['buy_price']),
-                'Güncel Fiyat': format_currency(current_price),
-                'Güncel Değer': format_currency(current_value_tl),
-                'K/Z %': f"{profit_loss:+.2f}%",
-                'Kaynak': asset['data_source'],
-                'ID': asset['ID'],
-                'basket': asset.get('basket', '')  # Store basket for filtering
-            }
-
-            # Add basket column only for stocks
-            if asset_type == 'hisse':
-                basket_names = {
-                    'buffet': 'Buffet',
-                    'tesla': 'Tesla',
-                    'tosuncuk': 'Tosuncuk',
-                    '': '-'
-                }
-                row_data['Sepet'] = basket_names.get(asset.get('basket', ''), '-')
+    # Görüntü satırları değerleme tablosundan türetilir (fiyat/kur tekrar çekilmez)
+    all_display_data = []
+    basket_emoji = {
+        'buffet': '⭐',
+        'tesla': '⚡',
+        'tosuncuk': '💖'
+    }
+    basket_names = {
+        'buffet': 'Buffet',
+        'tesla': 'Tesla',
+        'tosuncuk': 'Tosuncuk',
+        '': '-'
+    }
 
-            all_display_data.append(row_data)
+    for asset in filtered_df.to_dict('records'):
+        # Add basket badge for stocks
+        basket_display = ""
+        if asset_type == 'hisse' and asset.get('basket'):
+            basket_display = basket_emoji.get(asset['basket'], '')
+
+        symbol_display = f"{basket_display} {asset['symbol']}" if basket_display else asset['symbol']
+        if asset['price_status'] in STALE_STATUSES:
+            symbol_display = f"⏳ {symbol_display}"
+
+        row_data = {
+            'Sembol': symbol_display,
+            'Miktar': format_number(asset['amount'], decimals=4),
+            'Alış Fiyatı': format_currency(asset['buy_price']),
+            'Güncel Fiyat': format_currency(asset['current_price']),
+            'Güncel Değer': format_currency(asset['value_tl']),
+            'K/Z %': f"{asset['pnl_pct']:+.2f}%",
+            'Kaynak': asset['data_source'],
+            'ID': asset['ID'],
+            'basket': asset.get('basket', ''),  # Store basket for filtering
+            'value_tl': asset['value_tl']
+        }
+
+        # Add basket column only for stocks
+        if asset_type == 'hisse':
+            row_data['Sepet'] = basket_names.get(asset.get('basket', ''), '-')
 
-        # Store in session state
-        st.session_state[display_cache_key] = all_display_data
+        all_display_data.append(row_data)
 
     # BASKET FILTER BUTTONS - Only for stocks (hisse)
     if asset_type == 'hisse' and not filtered_df.empty:
@@ -1079,14 +908,11 @@ def show_assets_tab(assets_df, sheet, asset_type, type_label):
                 cancelled = st.form_submit_button("❌ İptal", use_container_width=True)
 
             if submitted and symbol and amount > 0 and buy_price > 0:
-                # Get max ID
-                all_data = get_sheet_data_as_dict(sheet)
-                max_id = max([item.get("ID", 0) for item in all_data], default=0)
-                new_id = max_id + 1
+                new_id = next_id(sheet)
 
                 # Add to sheet
                 now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                sheet.append_row([
+                append_record(sheet, [
                     new_id,
                     asset_type,
                     symbol.upper(),
@@ -1107,10 +933,7 @@ def show_assets_tab(assets_df, sheet, asset_type, type_label):
                 st.rerun()
 
     # Show assets table
-    if not filtered_df.empty and display_cache_key in st.session_state:
-        # Get cached display data
-        all_display_data = st.session_state[display_cache_key]
-
+    if all_display_data:
         # Filter by basket if needed (ONLY FOR STOCKS)
         if asset_type == 'hisse':
             current_filter = st.session_state.get(f"basket_filter_{asset_type}", "all")
@@ -1264,7 +1087,7 @@ def show_assets_tab(assets_df, sheet, asset_type, type_label):
         # Total value (hide if privacy mode active)
         privacy_mode = st.session_state.get('privacy_mode', False)
         if not privacy_mode:
-            total = sum([float(item['Güncel Değer'].replace('₺', '').replace(',', '').replace('*', '0')) for item in display_data])
+            total = sum(item['value_tl'] for item in display_data)
             st.markdown(f"**Toplam Değer: ₺{total:,.2f}**")
 
         # Show edit modal if edit button clicked
@@ -1300,31 +1123,27 @@ def show_assets_tab(assets_df, sheet, asset_type, type_label):
 
                 if submitted and new_symbol and new_amount > 0 and new_buy_price > 0:
                     # Find and update the row in Google Sheets
-                    all_values = sheet.get_all_values()
-
-                    for row_idx, row in enumerate(all_values[1:], start=2):  # Start from row 2 (skip header)
-                        if int(row[0]) == st.session_state[f"edit_asset_id_{asset_type}"]:
-                            # Update the row
-                            updated_row = [
-                                st.session_state[f"edit_asset_id_{asset_type}"],
-                                asset_type,
-                                new_symbol.upper(),
-                                new_amount,
-                                new_buy_price,
-                                new_data_source,
-                                new_manual_price,
-                                new_basket if asset_type == 'hisse' else edit_data.get('basket', ''),
-                                row[8] if len(row) > 8 else ''  # Keep original created_at
-                            ]
-                            sheet.update(f'A{row_idx}:I{row_idx}', [updated_row])
-                            break
+                    row_idx, row = get_row(sheet, st.session_state[f"edit_asset_id_{asset_type}"])
+
+                    if row_idx is not None:
+                        # Update the row
+                        updated_row = [
+                            st.session_state[f"edit_asset_id_{asset_type}"],
+                            asset_type,
+                            new_symbol.upper(),
+                            new_amount,
+                            new_buy_price,
+                            new_data_source,
+                            new_manual_price,
+                            new_basket if asset_type == 'hisse' else edit_data.get('basket', ''),
+                            row[8] if len(row) > 8 else ''  # Keep original created_at
+                        ]
+                        sheet.update(f'A{row_idx}:I{row_idx}', [updated_row])
+                        invalidate(sheet)
 
                     st.success(f"✅ {new_symbol.upper()} güncellendi!")
                     st.session_state[f"edit_asset_id_{asset_type}"] = None
                     st.session_state[f"edit_asset_data_{asset_type}"] = None
-                    # Clear cache to force recalculation
-                    if display_cache_key in st.session_state:
-                        del st.session_state[display_cache_key]
                     st.rerun()
 
                 if cancelled:
@@ -1362,17 +1181,13 @@ def show_assets_tab(assets_df, sheet, asset_type, type_label):
                     profit_loss = ((sell_price - close_data.get('buy_price', 0)) / close_data.get('buy_price', 0)) * 100 if close_data.get('buy_price', 0) > 0 else 0
 
                     # Get closed positions sheet
-                    closed_sheet = db.worksheet("closed_positions")
-                    closed_data = get_sheet_data_as_dict(closed_sheet)
-
-                    # Get max ID
-                    max_id = max([item.get("ID", 0) for item in closed_data], default=0) if closed_data else 0
-                    new_id = max_id + 1
+                    closed_sheet = get_worksheet(sheet.spreadsheet, "closed_positions")
+                    new_id = next_id(closed_sheet)
 
                     # Add to closed positions
                     date_str = datetime.now().strftime('%Y-%m-%d')
                     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    closed_sheet.append_row([
+                    append_record(closed_sheet, [
                         new_id,
                         date_str,
                         close_data.get('symbol', '').upper(),
@@ -1383,18 +1198,11 @@ def show_assets_tab(assets_df, sheet, asset_type, type_label):
                     ])
 
                     # Delete from assets
-                    all_values = sheet.get_all_values()
-                    for row_idx, row in enumerate(all_values[1:], start=2):
-                        if int(row[0]) == st.session_state[f"close_position_id_{asset_type}"]:
-                            sheet.delete_rows(row_idx)
-                            break
+                    delete_record(sheet, st.session_state[f"close_position_id_{asset_type}"])
 
                     st.success(f"✅ {close_data.get('symbol', '').upper()} pozisyonu kapatıldı! K/Z: {profit_loss:+.2f}%")
                     st.session_state[f"close_position_id_{asset_type}"] = None
                     st.session_state[f"close_position_data_{asset_type}"] = None
-                    # Clear cache
-                    if display_cache_key in st.session_state:
-                        del st.session_state[display_cache_key]
                     st.rerun()
 
                 if cancelled:
@@ -1411,19 +1219,11 @@ def show_assets_tab(assets_df, sheet, asset_type, type_label):
             with col1:
                 if st.button("🗑️ Evet, Sil", key=f"confirm_delete_{asset_type}", use_container_width=True):
                     # Find and delete the row
-                    all_values = sheet.get_all_values()
-
-                    for row_idx, row in enumerate(all_values[1:], start=2):  # Start from row 2
-                        if int(row[0]) == st.session_state[f"delete_asset_id_{asset_type}"]:
-                            sheet.delete_rows(row_idx)
-                            break
+                    delete_record(sheet, st.session_state[f"delete_asset_id_{asset_type}"])
 
                     st.success(f"✅ {st.session_state[f'delete_asset_symbol_{asset_type}']} silindi!")
                     st.session_state[f"delete_asset_id_{asset_type}"] = None
                     st.session_state[f"delete_asset_symbol_{asset_type}"] = None
-                    # Clear cache to force recalculation
-                    if display_cache_key in st.session_state:
-                        del st.session_state[display_cache_key]
                     st.rerun()
 
             with col2:
@@ -1436,7 +1236,7 @@ def show_assets_tab(assets_df, sheet, asset_type, type_label):
         if len(display_data) > 0 and not privacy_mode:
             fig = go.Figure(data=[go.Pie(
                 labels=[item['Sembol'] for item in display_data],
-                values=[float(item['Güncel Değer'].replace('₺', '').replace(',', '')) for item in display_data],
+                values=[item['value_tl'] for item in display_data],
                 hole=0.3
             )])
             fig.update_layout(
@@ -1472,14 +1272,11 @@ def show_debts_tab(debts_df, sheet):
                 cancelled = st.form_submit_button("❌ İptal", use_container_width=True)
 
             if submitted and description and amount > 0:
-                # Get max ID
-                all_data = get_sheet_data_as_dict(sheet)
-                max_id = max([item.get("ID", 0) for item in all_data], default=0)
-                new_id = max_id + 1
+                new_id = next_id(sheet)
 
                 # Add to sheet
                 now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                sheet.append_row([new_id, description, amount, now])
+                append_record(sheet, [new_id, description, amount, now])
 
                 st.success(f"✅ Borç başarıyla eklendi!")
                 st.session_state["show_add_debt_modal"] = False
@@ -1507,7 +1304,8 @@ def show_debts_tab(debts_df, sheet):
                     st.markdown(format_currency(debt.get('amount', 0)))
 
                 with cols[2]:
-                    st.markdown(debt.get('created_at', ''))
+                    created_at = debt.get('created_at')
+                    st.markdown(created_at.strftime('%Y-%m-%d %H:%M:%S') if pd.notna(created_at) else '')
 
                 with cols[3]:
                     if st.button("✏️", key=f"edit_debt_{debt_id}", help="Düzenle"):
@@ -1546,19 +1344,18 @@ def show_debts_tab(debts_df, sheet):
 
                 if submitted and new_description and new_amount > 0:
                     # Find and update the row in Google Sheets
-                    all_values = sheet.get_all_values()
-
-                    for row_idx, row in enumerate(all_values[1:], start=2):  # Start from row 2 (skip header)
-                        if int(row[0]) == st.session_state["edit_debt_id"]:
-                            # Update the row
-                            updated_row = [
-                                st.session_state["edit_debt_id"],
-                                new_description,
-                                new_amount,
-                                row[3] if len(row) > 3 else ''  # Keep original created_at
-                            ]
-                            sheet.update(f'A{row_idx}:D{row_idx}', [updated_row])
-                            break
+                    row_idx, row = get_row(sheet, st.session_state["edit_debt_id"])
+
+                    if row_idx is not None:
+                        # Update the row
+                        updated_row = [
+                            st.session_state["edit_debt_id"],
+                            new_description,
+                            new_amount,
+                            row[3] if len(row) > 3 else ''  # Keep original created_at
+                        ]
+                        sheet.update(f'A{row_idx}:D{row_idx}', [updated_row])
+                        invalidate(sheet)
 
                     st.success(f"✅ {new_description} güncellendi!")
                     st.session_state["edit_debt_id"] = None
@@ -1579,12 +1376,7 @@ def show_debts_tab(debts_df, sheet):
             with col1:
                 if st.button("🗑️ Evet, Sil", key="confirm_delete_debt", use_container_width=True):
                     # Find and delete the row
-                    all_values = sheet.get_all_values()
-
-                    for row_idx, row in enumerate(all_values[1:], start=2):  # Start from row 2
-                        if int(row[0]) == st.session_state["delete_debt_id"]:
-                            sheet.delete_rows(row_idx)
-                            break
+                    delete_record(sheet, st.session_state["delete_debt_id"])
 
                     st.success(f"✅ {st.session_state['delete_debt_description']} silindi!")
                     st.session_state["delete_debt_id"] = None
@@ -1600,15 +1392,14 @@ def show_debts_tab(debts_df, sheet):
     else:
         st.info("📭 Henüz borç eklenmemiş")
 
-def show_closed_positions_tab(db):
+def show_closed_positions_tab(db, closed_data):
     """Show closed positions with statistics and CRUD operations - Flask uygulamasındaki gibi."""
 
     st.markdown("### 🔒 Kapanan Pozisyonlar")
     st.markdown("Geçmiş alım-satım işlemleriniz")
 
-    # Get closed positions data
-    closed_sheet = db.worksheet("closed_positions")
-    closed_data = get_sheet_data_as_dict(closed_sheet)
+    # closed_data sayfanın toplu okumasından gelir; sheet sadece yazmalar için
+    closed_sheet = get_worksheet(db, "closed_positions")
 
     if closed_data:
         # Calculate statistics - Flask uygulamasındaki gibi
@@ -1685,14 +1476,12 @@ def show_closed_positions_tab(db):
                 # Calculate profit/loss percent
                 profit_loss_percent = ((sell_price - buy_price) / buy_price) * 100
 
-                # Get max ID
-                max_id = max([item.get("ID", 0) for item in closed_data], default=0) if closed_data else 0
-                new_id = max_id + 1
+                new_id = next_id(closed_sheet)
 
                 # Add to sheet
                 date_str = date.strftime('%Y-%m-%d')
                 now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                closed_sheet.append_row([
+                append_record(closed_sheet, [
                     new_id,
                     date_str,
                     symbol.upper(),
@@ -1828,23 +1617,21 @@ def show_closed_positions_tab(db):
                     new_profit_loss = ((new_sell_price - new_buy_price) / new_buy_price) * 100
 
                     # Find the row to update
-                    all_values = closed_sheet.get_all_values()
-                    headers = all_values[0]
-
-                    for row_idx, row in enumerate(all_values[1:], start=2):  # Start from row 2 (skip header)
-                        if int(row[0]) == st.session_state["edit_closed_id"]:
-                            # Update the row
-                            date_str = new_date.strftime('%Y-%m-%d')
-                            closed_sheet.update(f'A{row_idx}:G{row_idx}', [[
-                                st.session_state["edit_closed_id"],
-                                date_str,
-                                new_symbol.upper(),
-                                new_buy_price,
-                                new_sell_price,
-                                new_profit_loss,
-                                row[6]  # Keep original created_at
-                            ]])
-                            break
+                    row_idx, row = get_row(closed_sheet, st.session_state["edit_closed_id"])
+
+                    if row_idx is not None:
+                        # Update the row
+                        date_str = new_date.strftime('%Y-%m-%d')
+                        closed_sheet.update(f'A{row_idx}:G{row_idx}', [[
+                            st.session_state["edit_closed_id"],
+                            date_str,
+                            new_symbol.upper(),
+                            new_buy_price,
+                            new_sell_price,
+                            new_profit_loss,
+                            row[6] if len(row) > 6 else ''  # Keep original created_at
+                        ]])
+                        invalidate(closed_sheet)
 
                     st.success(f"✅ {new_symbol.upper()} güncellendi!")
                     st.session_state["edit_closed_id"] = None
@@ -1865,12 +1652,7 @@ def show_closed_positions_tab(db):
             with col1:
                 if st.button("🗑️ Evet, Sil", key="confirm_delete_closed", use_container_width=True):
                     # Find and delete the row
-                    all_values = closed_sheet.get_all_values()
-
-                    for row_idx, row in enumerate(all_values[1:], start=2):  # Start from row 2
-                        if int(row[0]) == st.session_state["delete_closed_id"]:
-                            closed_sheet.delete_rows(row_idx)
-                            break
+                    delete_record(closed_sheet, st.session_state["delete_closed_id"])
 
                     st.success(f"✅ {st.session_state['delete_closed_symbol']} silindi!")
                     st.session_state["delete_closed_id"] = None
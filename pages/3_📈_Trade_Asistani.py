@@ -4,8 +4,6 @@ Trading pozisyon yönetimi, hata analizi ve kontrol sistemi
 """
 
 import streamlit as st
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
 from datetime import datetime
 import plotly.graph_objects as go
@@ -13,6 +11,9 @@ import plotly.express as px
 from PIL import Image
 import io
 import base64
+from sheets_utils import (delete_rows_bulk, find_record, get_spreadsheet, get_values, get_worksheet,
+                          load_records, load_sheets, next_id)
+from write_queue import queue_append, queue_delete, queue_update, show_write_status
 
 # imgbb entegrasyonu (yüksek kalite görsel hosting için)
 try:
@@ -69,58 +70,6 @@ if 'credentials_data' not in st.session_state or not st.session_state.get('crede
         st.switch_page("Home.py")
     st.stop()
 
-# =============================================================================
-# GOOGLE SHEETS FUNCTIONS
-# =============================================================================
-
-@st.cache_resource
-def get_google_sheets(_creds_data):
-    """Google Sheets bağlantısını döndürür - credentials session state'ten alınır"""
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(_creds_data, scope)
-    client = gspread.authorize(creds)
-    return client.open("PKM Database")
-
-def get_sheet_data_as_dict(sheet):
-    """Sheet verisini dictionary listesi olarak döndürür - ID'leri integer'a çevirir"""
-    try:
-        all_values = sheet.get_all_values()
-        if len(all_values) <= 1:
-            return []
-
-        headers = all_values[0]
-        data = []
-
-        for row in all_values[1:]:
-            row_dict = {}
-            for i, header in enumerate(headers):
-                value = row[i] if i < len(row) else ""
-                # ID sütununu integer'a çevir
-                if header == "ID" and value:
-                    try:
-                        row_dict[header] = int(value)
-                    except:
-                        row_dict[header] = value
-                else:
-                    row_dict[header] = value
-            data.append(row_dict)
-
-        return data
-    except Exception as e:
-        st.error(f"Veri yüklenirken hata: {e}")
-        return []
-
-def get_next_id(sheet):
-    """Bir sonraki ID değerini döndürür"""
-    try:
-        data = get_sheet_data_as_dict(sheet)
-        if not data:
-            return 1
-        ids = [int(row['ID']) for row in data if row.get('ID')]
-        return max(ids) + 1 if ids else 1
-    except:
-        return 1
-
 # =============================================================================
 # IMAGE OPTIMIZATION FUNCTIONS
 # =============================================================================
@@ -174,51 +123,27 @@ def decode_base64_image(base64_str):
 # =============================================================================
 
 def load_positions_data():
-    """Pozisyonları yükler ve cache'ler"""
-    cache_key = "positions_cache"
-    cache_time_key = "positions_cache_time"
-
-    # Cache kontrolü (30 saniye)
-    current_time = datetime.now().timestamp()
-    if cache_key in st.session_state and cache_time_key in st.session_state:
-        if current_time - st.session_state[cache_time_key] < 30:
-            return st.session_state[cache_key]
-
-    # Veriyi yükle
+    """Pozisyonları yükler (sheets_utils ortak cache'inden)"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Pozisyonlar')
-        data = get_sheet_data_as_dict(sheet)
-
-        # Cache'e kaydet
-        st.session_state[cache_key] = data
-        st.session_state[cache_time_key] = current_time
-
-        return data
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        return load_records(spreadsheet, ['Pozisyonlar'])['Pozisyonlar']
     except Exception as e:
         st.error(f"Pozisyonlar yüklenirken hata: {e}")
         return []
 
-def clear_positions_cache():
-    """Pozisyon cache'ini temizler"""
-    if "positions_cache" in st.session_state:
-        del st.session_state["positions_cache"]
-    if "positions_cache_time" in st.session_state:
-        del st.session_state["positions_cache_time"]
-
 def add_position(position_type, entry_price, lot_size, stop_loss, take_profit, plan_note, market=""):
     """Yeni pozisyon ekler"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Pozisyonlar')
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Pozisyonlar')
 
-        next_id = get_next_id(sheet)
+        new_id = next_id(sheet)
         now = datetime.now()
         timestamp = now.isoformat()
         date_str = now.strftime('%Y-%m-%d %H:%M:%S')
 
         row = [
-            next_id,
+            new_id,
             position_type,
             float(entry_price),
             float(lot_size),
@@ -235,8 +160,7 @@ def add_position(position_type, entry_price, lot_size, stop_loss, take_profit, p
             timestamp
         ]
 
-        sheet.append_row(row)
-        clear_positions_cache()
+        queue_append(sheet, row, 'Pozisyon ekleme')
         return True
     except Exception as e:
         st.error(f"Pozisyon eklenirken hata: {e}")
@@ -245,48 +169,35 @@ def add_position(position_type, entry_price, lot_size, stop_loss, take_profit, p
 def close_position(position_id, exit_price, lesson_learned=""):
     """Pozisyonu kapatır"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Pozisyonlar')
-
-        all_data = sheet.get_all_values()
-        header = all_data[0]
-
-        # Kolon indekslerini bul
-        id_col = header.index('ID') + 1
-        status_col = header.index('Durum') + 1
-        result_col = header.index('Sonuç') + 1
-        lesson_col = header.index('Öğrenilen Ders') + 1
-        close_date_col = header.index('Kapanış Tarihi') + 1
-        exit_price_col = header.index('Çıkış Fiyatı') + 1
-        entry_price_col = header.index('Giriş Fiyatı') + 1
-        lot_col = header.index('Lot Büyüklüğü') + 1
-        type_col = header.index('Pozisyon Tipi') + 1
-
-        # Satırı bul ve güncelle
-        for row_idx, row in enumerate(all_data[1:], start=2):
-            if str(row[id_col - 1]) == str(position_id):
-                entry_price = float(row[entry_price_col - 1])
-                lot_size = float(row[lot_col - 1])
-                pos_type = row[type_col - 1]
-
-                # Kar/Zarar hesapla
-                if pos_type == 'LONG':
-                    result = (float(exit_price) - entry_price) * lot_size
-                else:  # SHORT
-                    result = (entry_price - float(exit_price)) * lot_size
-
-                # Güncelleme yap
-                now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                sheet.update_cell(row_idx, status_col, 'CLOSED')
-                sheet.update_cell(row_idx, result_col, round(result, 2))
-                sheet.update_cell(row_idx, lesson_col, lesson_learned)
-                sheet.update_cell(row_idx, close_date_col, now)
-                sheet.update_cell(row_idx, exit_price_col, float(exit_price))
-
-                clear_positions_cache()
-                return True, result
-
-        return False, 0
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Pozisyonlar')
+
+        # Pozisyonu cache'ten bul (kuyrukta bekleyen değişiklikler dahil)
+        position = find_record(sheet, position_id)
+        if position is None:
+            return False, 0
+
+        entry_price = float(position['Giriş Fiyatı'])
+        lot_size = float(position['Lot Büyüklüğü'])
+        pos_type = position['Pozisyon Tipi']
+
+        # Kar/Zarar hesapla
+        if pos_type == 'LONG':
+            result = (float(exit_price) - entry_price) * lot_size
+        else:  # SHORT
+            result = (entry_price - float(exit_price)) * lot_size
+
+        # Güncelleme yap
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        queue_update(sheet, position_id, {
+            'Durum': 'CLOSED',
+            'Sonuç': round(result, 2),
+            'Öğrenilen Ders': lesson_learned,
+            'Kapanış Tarihi': now,
+            'Çıkış Fiyatı': float(exit_price)
+        }, 'Pozisyon kapatma')
+
+        return True, result
     except Exception as e:
         st.error(f"Pozisyon kapatılırken hata: {e}")
         return False, 0
@@ -294,30 +205,23 @@ def close_position(position_id, exit_price, lesson_learned=""):
 def update_position(position_id, stop_loss=None, take_profit=None, plan_note=None):
     """Pozisyon bilgilerini günceller"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Pozisyonlar')
-
-        all_data = sheet.get_all_values()
-        header = all_data[0]
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Pozisyonlar')
 
-        id_col = header.index('ID') + 1
-        sl_col = header.index('Stop Loss') + 1
-        tp_col = header.index('Take Profit') + 1
-        plan_col = header.index('Plan Notu') + 1
+        if find_record(sheet, position_id) is None:
+            return False
 
-        for row_idx, row in enumerate(all_data[1:], start=2):
-            if str(row[id_col - 1]) == str(position_id):
-                if stop_loss is not None:
-                    sheet.update_cell(row_idx, sl_col, float(stop_loss) if stop_loss > 0 else "")
-                if take_profit is not None:
-                    sheet.update_cell(row_idx, tp_col, float(take_profit) if take_profit > 0 else "")
-                if plan_note is not None:
-                    sheet.update_cell(row_idx, plan_col, plan_note)
+        cells = {}
+        if stop_loss is not None:
+            cells['Stop Loss'] = float(stop_loss) if stop_loss > 0 else ""
+        if take_profit is not None:
+            cells['Take Profit'] = float(take_profit) if take_profit > 0 else ""
+        if plan_note is not None:
+            cells['Plan Notu'] = plan_note
 
-                clear_positions_cache()
-                return True
+        queue_update(sheet, position_id, cells, 'Pozisyon güncelleme')
 
-        return False
+        return True
     except Exception as e:
         st.error(f"Pozisyon güncellenirken hata: {e}")
         return False
@@ -325,20 +229,14 @@ def update_position(position_id, stop_loss=None, take_profit=None, plan_note=Non
 def delete_position(position_id):
     """Pozisyonu siler"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Pozisyonlar')
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Pozisyonlar')
 
-        all_data = sheet.get_all_values()
-        header = all_data[0]
-        id_col = header.index('ID') + 1
+        if find_record(sheet, position_id) is None:
+            return False
 
-        for row_idx, row in enumerate(all_data[1:], start=2):
-            if str(row[id_col - 1]) == str(position_id):
-                sheet.delete_rows(row_idx)
-                clear_positions_cache()
-                return True
-
-        return False
+        queue_delete(sheet, position_id, 'Pozisyon silme')
+        return True
     except Exception as e:
         st.error(f"Pozisyon silinirken hata: {e}")
         return False
@@ -348,44 +246,19 @@ def delete_position(position_id):
 # =============================================================================
 
 def load_experiences_data():
-    """Görsel tecrübeleri yükler ve cache'ler"""
-    cache_key = "experiences_cache"
-    cache_time_key = "experiences_cache_time"
-
-    # Cache kontrolü (30 saniye)
-    current_time = datetime.now().timestamp()
-    if cache_key in st.session_state and cache_time_key in st.session_state:
-        if current_time - st.session_state[cache_time_key] < 30:
-            return st.session_state[cache_key]
-
-    # Veriyi yükle
+    """Görsel tecrübeleri yükler (sheets_utils ortak cache'inden)"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Gorsel_Tecrubeler')
-        data = get_sheet_data_as_dict(sheet)
-
-        # Cache'e kaydet
-        st.session_state[cache_key] = data
-        st.session_state[cache_time_key] = current_time
-
-        return data
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        return load_records(spreadsheet, ['Gorsel_Tecrubeler'])['Gorsel_Tecrubeler']
     except Exception as e:
         st.error(f"Görsel tecrübeler yüklenirken hata: {e}")
         return []
 
-def clear_experiences_cache():
-    """Görsel tecrübeler cache'ini temizler"""
-    if "experiences_cache" in st.session_state:
-        del st.session_state["experiences_cache"]
-    if "experiences_cache_time" in st.session_state:
-        del st.session_state["experiences_cache_time"]
-
 def load_categories():
     """Kategorileri yükler"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Kategoriler')
-        data = get_sheet_data_as_dict(sheet)
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        data = load_records(spreadsheet, ['Kategoriler'])['Kategoriler']
         return [cat.get('Kategori Adı', '') for cat in data if cat.get('Kategori Adı')]
     except Exception as e:
         st.error(f"Kategoriler yüklenirken hata: {e}")
@@ -400,16 +273,16 @@ def add_experience(title, category, note, image_data, loss_amount=0, is_url=Fals
         is_url: True ise image_data bir URL'dir
     """
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Gorsel_Tecrubeler')
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Gorsel_Tecrubeler')
 
-        next_id = get_next_id(sheet)
+        new_id = next_id(sheet)
         now = datetime.now()
         timestamp = now.isoformat()
         date_str = now.strftime('%Y-%m-%d %H:%M:%S')
 
         row = [
-            next_id,
+            new_id,
             title,
             category,
             note,
@@ -419,8 +292,7 @@ def add_experience(title, category, note, image_data, loss_amount=0, is_url=Fals
             timestamp
         ]
 
-        sheet.append_row(row)
-        clear_experiences_cache()
+        queue_append(sheet, row, 'Tecrübe ekleme')
         return True
     except Exception as e:
         st.error(f"Tecrübe eklenirken hata: {e}")
@@ -429,20 +301,14 @@ def add_experience(title, category, note, image_data, loss_amount=0, is_url=Fals
 def delete_experience(experience_id):
     """Görsel tecrübeyi siler"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Gorsel_Tecrubeler')
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Gorsel_Tecrubeler')
 
-        all_data = sheet.get_all_values()
-        header = all_data[0]
-        id_col = header.index('ID') + 1
+        if find_record(sheet, experience_id) is None:
+            return False
 
-        for row_idx, row in enumerate(all_data[1:], start=2):
-            if str(row[id_col - 1]) == str(experience_id):
-                sheet.delete_rows(row_idx)
-                clear_experiences_cache()
-                return True
-
-        return False
+        queue_delete(sheet, experience_id, 'Tecrübe silme')
+        return True
     except Exception as e:
         st.error(f"Tecrübe silinirken hata: {e}")
         return False
@@ -450,33 +316,25 @@ def delete_experience(experience_id):
 def update_experience(experience_id, title=None, category=None, note=None, loss_amount=None):
     """Görsel tecrübeyi günceller (görsel hariç)"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Gorsel_Tecrubeler')
-
-        all_data = sheet.get_all_values()
-        header = all_data[0]
-
-        id_col = header.index('ID') + 1
-        title_col = header.index('Başlık') + 1
-        cat_col = header.index('Kategori') + 1
-        note_col = header.index('Not') + 1
-        loss_col = header.index('Zarar Miktarı') + 1
-
-        for row_idx, row in enumerate(all_data[1:], start=2):
-            if str(row[id_col - 1]) == str(experience_id):
-                if title is not None:
-                    sheet.update_cell(row_idx, title_col, title)
-                if category is not None:
-                    sheet.update_cell(row_idx, cat_col, category)
-                if note is not None:
-                    sheet.update_cell(row_idx, note_col, note)
-                if loss_amount is not None:
-                    sheet.update_cell(row_idx, loss_col, float(loss_amount) if loss_amount else "")
-
-                clear_experiences_cache()
-                return True
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Gorsel_Tecrubeler')
 
-        return False
+        if find_record(sheet, experience_id) is None:
+            return False
+
+        cells = {}
+        if title is not None:
+            cells['Başlık'] = title
+        if category is not None:
+            cells['Kategori'] = category
+        if note is not None:
+            cells['Not'] = note
+        if loss_amount is not None:
+            cells['Zarar Miktarı'] = float(loss_amount) if loss_amount else ""
+
+        queue_update(sheet, experience_id, cells, 'Tecrübe güncelleme')
+
+        return True
     except Exception as e:
         st.error(f"Tecrübe güncellenirken hata: {e}")
         return False
@@ -488,9 +346,8 @@ def update_experience(experience_id, title=None, category=None, note=None, loss_
 def load_quotes_data():
     """Özlü sözleri yükler"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Ozlu_Sozler')
-        data = get_sheet_data_as_dict(sheet)
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        data = load_records(spreadsheet, ['Ozlu_Sozler'])['Ozlu_Sozler']
         # Sıraya göre sırala
         return sorted(data, key=lambda x: int(x.get('Sıra', 999)) if x.get('Sıra') else 999)
     except Exception as e:
@@ -500,14 +357,14 @@ def load_quotes_data():
 def add_quote(quote_text, order, color="#3b82f6"):
     """Yeni özlü söz ekler"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Ozlu_Sozler')
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Ozlu_Sozler')
 
-        next_id = get_next_id(sheet)
+        new_id = next_id(sheet)
         now = datetime.now()
 
         row = [
-            next_id,
+            new_id,
             quote_text,
             int(order),
             color,
@@ -515,7 +372,7 @@ def add_quote(quote_text, order, color="#3b82f6"):
             now.isoformat()
         ]
 
-        sheet.append_row(row)
+        queue_append(sheet, row, 'Özlü söz ekleme')
         return True
     except Exception as e:
         st.error(f"Özlü söz eklenirken hata: {e}")
@@ -524,27 +381,19 @@ def add_quote(quote_text, order, color="#3b82f6"):
 def update_quote(quote_id, quote_text, order, color):
     """Özlü sözü günceller"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Ozlu_Sozler')
-
-        all_data = sheet.get_all_values()
-        header = all_data[0]
-
-        # Kolon indekslerini bul
-        id_col = header.index('ID') + 1
-        text_col = header.index('Söz') + 1
-        order_col = header.index('Sıra') + 1
-        color_col = header.index('Renk') + 1
-
-        # Satırı bul ve güncelle
-        for row_idx, row in enumerate(all_data[1:], start=2):
-            if str(row[id_col - 1]) == str(quote_id):
-                sheet.update_cell(row_idx, text_col, quote_text)
-                sheet.update_cell(row_idx, order_col, int(order))
-                sheet.update_cell(row_idx, color_col, color)
-                return True
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Ozlu_Sozler')
 
-        return False
+        if find_record(sheet, quote_id) is None:
+            return False
+
+        queue_update(sheet, quote_id, {
+            'Söz': quote_text,
+            'Sıra': int(order),
+            'Renk': color
+        }, 'Özlü söz güncelleme')
+
+        return True
     except Exception as e:
         st.error(f"Özlü söz güncellenirken hata: {e}")
         return False
@@ -552,19 +401,14 @@ def update_quote(quote_id, quote_text, order, color):
 def delete_quote(quote_id):
     """Özlü sözü siler"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Ozlu_Sozler')
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Ozlu_Sozler')
 
-        all_data = sheet.get_all_values()
-        header = all_data[0]
-        id_col = header.index('ID') + 1
+        if find_record(sheet, quote_id) is None:
+            return False
 
-        for row_idx, row in enumerate(all_data[1:], start=2):
-            if str(row[id_col - 1]) == str(quote_id):
-                sheet.delete_rows(row_idx)
-                return True
-
-        return False
+        queue_delete(sheet, quote_id, 'Özlü söz silme')
+        return True
     except Exception as e:
         st.error(f"Özlü söz silinirken hata: {e}")
         return False
@@ -574,24 +418,10 @@ def delete_quote(quote_id):
 # =============================================================================
 
 def load_notes_data():
-    """Kendime notları yükler ve cache'ler"""
-    cache_key = "notes_cache"
-    cache_time_key = "notes_cache_time"
-
-    current_time = datetime.now().timestamp()
-    if cache_key in st.session_state and cache_time_key in st.session_state:
-        if current_time - st.session_state[cache_time_key] < 30:
-            return st.session_state[cache_key]
-
+    """Kendime notları yükler (sheets_utils ortak cache'inden)"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Kendime_Notlar')
-        data = get_sheet_data_as_dict(sheet)
-
-        st.session_state[cache_key] = data
-        st.session_state[cache_time_key] = current_time
-
-        return data
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        return load_records(spreadsheet, ['Kendime_Notlar'])['Kendime_Notlar']
     except Exception as e:
         st.error(f"Notlar yüklenirken hata: {e}")
         return []
@@ -599,14 +429,14 @@ def load_notes_data():
 def add_note(baslik, kategori, icerik, gorsel_url=""):
     """Yeni not ekler"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Kendime_Notlar')
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Kendime_Notlar')
 
-        next_id = get_next_id(sheet)
+        new_id = next_id(sheet)
         now = datetime.now()
 
         row = [
-            next_id,
+            new_id,
             baslik,
             kategori,
             icerik,
@@ -615,8 +445,7 @@ def add_note(baslik, kategori, icerik, gorsel_url=""):
             now.isoformat()
         ]
 
-        sheet.append_row(row)
-        clear_notes_cache()
+        queue_append(sheet, row, 'Not ekleme')
         return True
     except Exception as e:
         st.error(f"Not eklenirken hata: {e}")
@@ -625,28 +454,20 @@ def add_note(baslik, kategori, icerik, gorsel_url=""):
 def update_note(note_id, baslik, kategori, icerik, gorsel_url=""):
     """Notu günceller"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Kendime_Notlar')
-
-        all_data = sheet.get_all_values()
-        header = all_data[0]
-
-        id_col = header.index('ID') + 1
-        baslik_col = header.index('Başlık') + 1
-        kategori_col = header.index('Kategori') + 1
-        icerik_col = header.index('İçerik') + 1
-        gorsel_col = header.index('Görsel URL') + 1
-
-        for row_idx, row in enumerate(all_data[1:], start=2):
-            if str(row[id_col - 1]) == str(note_id):
-                sheet.update_cell(row_idx, baslik_col, baslik)
-                sheet.update_cell(row_idx, kategori_col, kategori)
-                sheet.update_cell(row_idx, icerik_col, icerik)
-                sheet.update_cell(row_idx, gorsel_col, gorsel_url)
-                clear_notes_cache()
-                return True
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Kendime_Notlar')
 
-        return False
+        if find_record(sheet, note_id) is None:
+            return False
+
+        queue_update(sheet, note_id, {
+            'Başlık': baslik,
+            'Kategori': kategori,
+            'İçerik': icerik,
+            'Görsel URL': gorsel_url
+        }, 'Not güncelleme')
+
+        return True
     except Exception as e:
         st.error(f"Not güncellenirken hata: {e}")
         return False
@@ -654,30 +475,18 @@ def update_note(note_id, baslik, kategori, icerik, gorsel_url=""):
 def delete_note(note_id):
     """Notu siler"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Kendime_Notlar')
-
-        all_data = sheet.get_all_values()
-        header = all_data[0]
-        id_col = header.index('ID') + 1
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Kendime_Notlar')
 
-        for row_idx, row in enumerate(all_data[1:], start=2):
-            if str(row[id_col - 1]) == str(note_id):
-                sheet.delete_rows(row_idx)
-                clear_notes_cache()
-                return True
+        if find_record(sheet, note_id) is None:
+            return False
 
-        return False
+        queue_delete(sheet, note_id, 'Not silme')
+        return True
     except Exception as e:
         st.error(f"Not silinirken hata: {e}")
         return False
 
-def clear_notes_cache():
-    """Not cache'ini temizler"""
-    if "notes_cache" in st.session_state:
-        del st.session_state["notes_cache"]
-    if "notes_cache_time" in st.session_state:
-        del st.session_state["notes_cache_time"]
 
 # =============================================================================
 # MAIN APP
@@ -694,6 +503,22 @@ with st.sidebar:
          "📝 Kendime Notlar", "🏆 Challenge"],
         key="feature_selector"
     )
+    show_write_status(st.session_state['credentials_data'].get('client_email'))
+
+# Her özelliğin okuduğu sheet'ler tek values_batch_get ile önceden çekilir,
+# load_* fonksiyonları sonra ortak cache'ten okur
+FEATURE_SHEETS = {
+    "🏠 Ana Sayfa": ['Ozlu_Sozler', 'Pozisyonlar', 'Gorsel_Tecrubeler'],
+    "📊 Pozisyon Yönetimi": ['Pozisyonlar'],
+    "🖼️ Görsel Tecrübeler": ['Kategoriler', 'Gorsel_Tecrubeler'],
+    "📝 Kendime Notlar": ['Kendime_Notlar'],
+}
+if FEATURE_SHEETS.get(feature):
+    try:
+        load_sheets(get_spreadsheet(st.session_state['credentials_data']), FEATURE_SHEETS[feature])
+    except Exception as e:
+        # Eksik sheet vb. durumda load_* fonksiyonları tek tek okuyup hatayı gösterir
+        print(f"⚠️ Toplu sheet okuma başarısız: {str(e)[:100]}")
 
 # =============================================================================
 # ANA SAYFA
@@ -1073,12 +898,12 @@ elif feature == "📊 Pozisyon Yönetimi":
             with col_confirm:
                 if st.button("✅ Evet, Tümünü Sil", key="confirm_clear", use_container_width=True):
                     try:
-                        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-                        sheet = spreadsheet.worksheet('Pozisyonlar')
-                        all_data = sheet.get_all_values()
+                        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+                        sheet = get_worksheet(spreadsheet, 'Pozisyonlar')
+                        all_data = get_values(sheet, refresh=True, pending=False)
                         header = all_data[0]
 
-                        # CLOSED pozisyonları bul ve sil (sondan başa doğru)
+                        # CLOSED pozisyonları bul
                         status_col_idx = header.index('Durum')
                         rows_to_delete = []
 
@@ -1086,12 +911,9 @@ elif feature == "📊 Pozisyon Yönetimi":
                             if row[status_col_idx] == 'CLOSED':
                                 rows_to_delete.append(row_idx)
 
-                        # Sondan başa doğru sil (indeks kayması olmasın)
-                        for row_idx in reversed(rows_to_delete):
-                            sheet.delete_rows(row_idx)
-
-                        clear_positions_cache()
-                        st.success(f"✅ {len(rows_to_delete)} kapatılmış pozisyon silindi!")
+                        # Hepsini tek istekte sil (ardışık satırlar tek aralık)
+                        deleted_count = delete_rows_bulk(sheet, rows_to_delete)
+                        st.success(f"✅ {deleted_count} kapatılmış pozisyon silindi!")
                         st.session_state["confirm_clear_history"] = False
                         st.rerun()
                     except Exception as e:
@@ -1,9 +1,11 @@
 import streamlit as st
 import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime, timedelta
 import pandas as pd
 import plotly.graph_objects as go
+from sheets_utils import (append_record, find_record, get_records, get_spreadsheet, get_worksheet,
+                          invalidate, invalidate_spreadsheet, load_records, load_sheets, next_id)
+from write_queue import queue_append, queue_delete, queue_update, show_write_status
 
 st.set_page_config(
     page_title="Özgürlük Savaşı",
@@ -22,56 +24,9 @@ if 'credentials_data' not in st.session_state or not st.session_state.get('crede
     st.stop()
 
 # =============================================================================
-# GOOGLE SHEETS FUNCTIONS
+# CHALLENGE FUNCTIONS
 # =============================================================================
 
-@st.cache_resource
-def get_google_sheets(_creds_data):
-    """Google Sheets bağlantısını döndürür"""
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(_creds_data, scope)
-    client = gspread.authorize(creds)
-    return client.open("PKM Database")
-
-def get_sheet_data_as_dict(sheet):
-    """Sheet verisini dictionary listesi olarak döndürür"""
-    try:
-        all_values = sheet.get_all_values()
-        if len(all_values) <= 1:
-            return []
-
-        headers = all_values[0]
-        data = []
-
-        for row in all_values[1:]:
-            row_dict = {}
-            for i, header in enumerate(headers):
-                value = row[i] if i < len(row) else ""
-                if header == "ID" and value:
-                    try:
-                        row_dict[header] = int(value)
-                    except:
-                        row_dict[header] = value
-                else:
-                    row_dict[header] = value
-            data.append(row_dict)
-
-        return data
-    except Exception as e:
-        st.error(f"Veri yüklenirken hata: {e}")
-        return []
-
-def get_next_id(sheet):
-    """Bir sonraki ID değerini döndürür"""
-    try:
-        data = get_sheet_data_as_dict(sheet)
-        if not data:
-            return 1
-        ids = [int(row['ID']) for row in data if row.get('ID')]
-        return max(ids) + 1 if ids else 1
-    except:
-        return 1
-
 def safe_float(value, default=0):
     """String'i güvenli şekilde float'a çevirir (virgül ve nokta desteği)"""
     try:
@@ -85,16 +40,11 @@ def safe_float(value, default=0):
     except:
         return default
 
-# =============================================================================
-# CHALLENGE FUNCTIONS
-# =============================================================================
-
 def get_challenge_settings():
     """Challenge ayarlarını yükler"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Challenge_Settings')
-        data = get_sheet_data_as_dict(sheet)
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        data = load_records(spreadsheet, ['Challenge_Settings'])['Challenge_Settings']
 
         if data:
             return {
@@ -111,8 +61,8 @@ def get_challenge_settings():
 def save_challenge_settings(baslangic_sermaye, hedef_tutar, hedef_sure_gun):
     """Challenge ayarlarını kaydeder"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Challenge_Settings')
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Challenge_Settings')
 
         # Mevcut veriyi temizle
         sheet.clear()
@@ -125,16 +75,17 @@ def save_challenge_settings(baslangic_sermaye, hedef_tutar, hedef_sure_gun):
         now = datetime.now().strftime('%Y-%m-%d')
         row = [baslangic_sermaye, hedef_tutar, hedef_sure_gun, now]
         sheet.append_row(row)
+        invalidate(sheet)
 
         # İlk gün kaydını Challenge sheet'ine ekle
-        challenge_sheet = spreadsheet.worksheet('Challenge')
-        challenge_data = get_sheet_data_as_dict(challenge_sheet)
+        challenge_sheet = get_worksheet(spreadsheet, 'Challenge')
+        challenge_data = get_records(challenge_sheet, refresh=True)
 
         # Eğer hiç kayıt yoksa ilk günü ekle
         if not challenge_data:
-            next_id = get_next_id(challenge_sheet)
+            new_id = next_id(challenge_sheet)
             challenge_row = [
-                next_id,
+                new_id,
                 now,
                 0,  # Kar/Zarar (ilk gün 0)
                 baslangic_sermaye,  # Kasa
@@ -142,7 +93,7 @@ def save_challenge_settings(baslangic_sermaye, hedef_tutar, hedef_sure_gun):
                 hedef_tutar,  # Hedef
                 hedef_tutar - baslangic_sermaye  # Hedefe Kalan Tutar
             ]
-            challenge_sheet.append_row(challenge_row)
+            append_record(challenge_sheet, challenge_row)
 
         return True
     except Exception as e:
@@ -152,10 +103,8 @@ def save_challenge_settings(baslangic_sermaye, hedef_tutar, hedef_sure_gun):
 def get_challenge_data():
     """Challenge verilerini yükler"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Challenge')
-        data = get_sheet_data_as_dict(sheet)
-        return data
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        return load_records(spreadsheet, ['Challenge'])['Challenge']
     except Exception as e:
         st.error(f"Challenge verileri yüklenirken hata: {e}")
         return []
@@ -163,14 +112,14 @@ def get_challenge_data():
 def add_daily_record(kasa_tutari, settings):
     """Günlük kayıt ekler"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Challenge')
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Challenge')
 
         # Bugünün tarihi
         today = datetime.now().strftime('%Y-%m-%d')
 
         # Bugün kayıt var mı kontrol et
-        data = get_sheet_data_as_dict(sheet)
+        data = get_records(sheet, refresh=True)
         today_exists = any(row.get('Tarih') == today for row in data)
 
         if today_exists:
@@ -202,9 +151,9 @@ def add_daily_record(kasa_tutari, settings):
         hedefe_kalan = settings['hedef_tutar'] - kasa_tutari
 
         # Yeni kayıt ekle
-        next_id = get_next_id(sheet)
+        new_id = next_id(sheet)
         row = [
-            next_id,
+            new_id,
             today,
             kar_zarar,
             kasa_tutari,
@@ -213,7 +162,7 @@ def add_daily_record(kasa_tutari, settings):
             hedefe_kalan
         ]
 
-        sheet.append_row(row)
+        queue_append(sheet, row, 'Günlük kayıt')
         return True
     except Exception as e:
         st.error(f"Günlük kayıt eklenirken hata: {e}")
@@ -226,13 +175,13 @@ def add_daily_record(kasa_tutari, settings):
 def load_challenge_trades():
     """Özgürlük Savaşı işlemlerini yükler"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Challenge_Trades')
-        data = get_sheet_data_as_dict(sheet)
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Challenge_Trades')
+        data = get_records(sheet)
         return data
     except gspread.exceptions.WorksheetNotFound:
         # Sheet yoksa oluştur
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
         sheet = spreadsheet.add_worksheet(title='Challenge_Trades', rows=100, cols=10)
         headers = ['ID', 'Yon', 'Enstruman', 'Giris_Fiyat', 'Lot', 'Cikis_Fiyat', 'Kar_Zarar', 'Durum', 'Acilis_Tarihi', 'Kapanis_Tarihi']
         sheet.append_row(headers)
@@ -244,14 +193,14 @@ def load_challenge_trades():
 def add_trade(yon, enstruman, giris_fiyat, lot):
     """Yeni işlem aç"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Challenge_Trades')
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Challenge_Trades')
 
-        next_id = get_next_id(sheet)
+        new_id = next_id(sheet)
         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
         row = [
-            next_id,
+            new_id,
             yon,
             enstruman,
             float(giris_fiyat),
@@ -263,7 +212,7 @@ def add_trade(yon, enstruman, giris_fiyat, lot):
             ''  # Kapanış tarihi (henüz yok)
         ]
 
-        sheet.append_row(row)
+        queue_append(sheet, row, 'İşlem açma')
         return True
     except Exception as e:
         st.error(f"İşlem eklenirken hata: {e}")
@@ -272,45 +221,34 @@ def add_trade(yon, enstruman, giris_fiyat, lot):
 def close_trade(trade_id, cikis_fiyat):
     """İşlemi kapat"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Challenge_Trades')
-
-        all_data = sheet.get_all_values()
-        header = all_data[0]
-
-        # Kolon indekslerini bul
-        id_col = header.index('ID') + 1
-        yon_col = header.index('Yon') + 1
-        giris_col = header.index('Giris_Fiyat') + 1
-        lot_col = header.index('Lot') + 1
-        cikis_col = header.index('Cikis_Fiyat') + 1
-        kar_zarar_col = header.index('Kar_Zarar') + 1
-        durum_col = header.index('Durum') + 1
-        kapanis_col = header.index('Kapanis_Tarihi') + 1
-
-        # Satırı bul ve güncelle
-        for row_idx, row in enumerate(all_data[1:], start=2):
-            if str(row[id_col - 1]) == str(trade_id):
-                yon = row[yon_col - 1]
-                giris = float(row[giris_col - 1])
-                lot = float(row[lot_col - 1])
-
-                # Kar/Zarar hesapla
-                if yon == 'LONG':
-                    kar_zarar = (float(cikis_fiyat) - giris) * lot
-                else:  # SHORT
-                    kar_zarar = (giris - float(cikis_fiyat)) * lot
-
-                # Güncelleme yap
-                now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                sheet.update_cell(row_idx, cikis_col, float(cikis_fiyat))
-                sheet.update_cell(row_idx, kar_zarar_col, round(kar_zarar, 2))
-                sheet.update_cell(row_idx, durum_col, 'KAPALI')
-                sheet.update_cell(row_idx, kapanis_col, now)
-
-                return True, kar_zarar
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Challenge_Trades')
 
-        return False, 0
+        # İşlemi cache'ten bul (kuyrukta bekleyen değişiklikler dahil)
+        trade = find_record(sheet, trade_id)
+        if trade is None:
+            return False, 0
+
+        yon = trade['Yon']
+        giris = float(trade['Giris_Fiyat'])
+        lot = float(trade['Lot'])
+
+        # Kar/Zarar hesapla
+        if yon == 'LONG':
+            kar_zarar = (float(cikis_fiyat) - giris) * lot
+        else:  # SHORT
+            kar_zarar = (giris - float(cikis_fiyat)) * lot
+
+        # Güncelleme yap
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        queue_update(sheet, trade_id, {
+            'Cikis_Fiyat': float(cikis_fiyat),
+            'Kar_Zarar': round(kar_zarar, 2),
+            'Durum': 'KAPALI',
+            'Kapanis_Tarihi': now
+        }, 'İşlem kapatma')
+
+        return True, kar_zarar
     except Exception as e:
         st.error(f"İşlem kapatılırken hata: {e}")
         return False, 0
@@ -318,20 +256,14 @@ def close_trade(trade_id, cikis_fiyat):
 def delete_closed_trade(trade_id):
     """Kapatılmış işlemi sil"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Challenge_Trades')
-
-        all_data = sheet.get_all_values()
-        header = all_data[0]
-        id_col = header.index('ID') + 1
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Challenge_Trades')
 
-        # Satırı bul ve sil
-        for row_idx, row in enumerate(all_data[1:], start=2):
-            if str(row[id_col - 1]) == str(trade_id):
-                sheet.delete_rows(row_idx)
-                return True
+        if find_record(sheet, trade_id) is None:
+            return False
 
-        return False
+        queue_delete(sheet, trade_id, 'İşlem silme')
+        return True
     except Exception as e:
         st.error(f"İşlem silinirken hata: {e}")
         return False
@@ -339,52 +271,52 @@ def delete_closed_trade(trade_id):
 def update_closed_trade(trade_id, cikis_fiyat):
     """Kapatılmış işlemin çıkış fiyatını güncelle"""
     try:
-        spreadsheet = get_google_sheets(st.session_state['credentials_data'])
-        sheet = spreadsheet.worksheet('Challenge_Trades')
-
-        all_data = sheet.get_all_values()
-        header = all_data[0]
-
-        # Kolon indekslerini bul
-        id_col = header.index('ID') + 1
-        yon_col = header.index('Yon') + 1
-        giris_col = header.index('Giris_Fiyat') + 1
-        lot_col = header.index('Lot') + 1
-        cikis_col = header.index('Cikis_Fiyat') + 1
-        kar_zarar_col = header.index('Kar_Zarar') + 1
-
-        # Satırı bul ve güncelle
-        for row_idx, row in enumerate(all_data[1:], start=2):
-            if str(row[id_col - 1]) == str(trade_id):
-                yon = row[yon_col - 1]
-                giris = float(row[giris_col - 1])
-                lot = float(row[lot_col - 1])
-
-                # Kar/Zarar yeniden hesapla
-                if yon == 'LONG':
-                    kar_zarar = (float(cikis_fiyat) - giris) * lot
-                else:  # SHORT
-                    kar_zarar = (giris - float(cikis_fiyat)) * lot
-
-                # Güncelleme yap
-                sheet.update_cell(row_idx, cikis_col, float(cikis_fiyat))
-                sheet.update_cell(row_idx, kar_zarar_col, round(kar_zarar, 2))
-
-                return True
+        spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
+        sheet = get_worksheet(spreadsheet, 'Challenge_Trades')
 
-        return False
+        trade = find_record(sheet, trade_id)
+        if trade is None:
+            return False
+
+        yon = trade['Yon']
+        giris = float(trade['Giris_Fiyat'])
+        lot = float(trade['Lot'])
+
+        # Kar/Zarar yeniden hesapla
+        if yon == 'LONG':
+            kar_zarar = (float(cikis_fiyat) - giris) * lot
+        else:  # SHORT
+            kar_zarar = (giris - float(cikis_fiyat)) * lot
+
+        # Güncelleme yap
+        queue_update(sheet, trade_id, {
+            'Cikis_Fiyat': float(cikis_fiyat),
+            'Kar_Zarar': round(kar_zarar, 2)
+        }, 'İşlem güncelleme')
+
+        return True
     except Exception as e:
         st.error(f"İşlem güncellenirken hata: {e}")
         return False
 
+
 # =============================================================================
 # MAIN PAGE
 # =============================================================================
 
 st.title("🏆 Özgürlük Savaşı")
 st.markdown("### Finansal özgürlüğe giden yolculuk!")
+show_write_status(st.session_state['credentials_data'].get('client_email'))
 st.markdown("---")
 
+# Sayfanın okuduğu üç sheet tek values_batch_get ile
+try:
+    load_sheets(get_spreadsheet(st.session_state['credentials_data']),
+                ['Challenge_Settings', 'Challenge', 'Challenge_Trades'])
+except Exception as e:
+    # Challenge_Trades henüz yoksa load_challenge_trades oluşturur
+    print(f"⚠️ Toplu sheet okuma başarısız: {str(e)[:100]}")
+
 # Challenge ayarlarını kontrol et
 settings = get_challenge_settings()
 
@@ -714,12 +646,12 @@ else:
 
         if st.button("🔄 Challenge'ı Sıfırla", type="secondary"):
             try:
-                spreadsheet = get_google_sheets(st.session_state['credentials_data'])
+                spreadsheet = get_spreadsheet(st.session_state['credentials_data'])
 
                 # Tüm sheet'leri temizle
                 for sheet_name in ['Challenge', 'Challenge_Settings', 'Challenge_Trades']:
                     try:
-                        sheet = spreadsheet.worksheet(sheet_name)
+                        sheet = get_worksheet(spreadsheet, sheet_name)
                         sheet.clear()
 
                         # Başlıkları geri ekle
@@ -732,6 +664,7 @@ else:
                     except:
                         pass
 
+                invalidate_spreadsheet(spreadsheet)
                 st.success("✅ Challenge sıfırlandı!")
                 st.rerun()
             except Exception as e:
@@ -0,0 +1,75 @@
+"""
+Portföy değerleme motoru
+Her rerun'da tek bir vektörel geçişle tüm varlıkların güncel fiyatı,
+TL değeri ve kar/zarar yüzdesi hesaplanır.
+"""
+
+import numpy as np
+import pandas as pd
+
+from price_utils import STATUS_LIVE, STATUS_MISSING, normalize_symbol, quote_currency
+
+VALUATION_COLUMNS = ['current_price', 'value_tl', 'pnl_pct', 'fx_applied', 'quote_currency', 'price_status']
+
+# Fiyatı güncel olmayan (süre sınırına yetişmemiş/alınamamış) durumlar
+STALE_STATUSES = ['stale', 'pending', 'missing', 'failed']
+
+
+def value_portfolio(assets_df, prices, fx_rates, price_status=None):
+    """
+    Varlık tablosuna değerleme kolonlarını ekler
+
+    Args:
+        assets_df: assets sheet'inden gelen DataFrame
+        prices: {ticker: fiyat} map'i (price_utils.get_portfolio_prices)
+        fx_rates: {döviz: TL kuru} matrisi (price_utils.get_fx_rates)
+        price_status: {ticker: durum} map'i (price_utils.resolve_prices)
+
+    Returns:
+        assets_df kopyası + current_price, value_tl, pnl_pct (float64),
+        fx_applied (bool), quote_currency ve price_status kolonları
+    """
+    if assets_df is None or assets_df.empty:
+        return pd.DataFrame(columns=VALUATION_COLUMNS)
+
+    df = assets_df.copy()
+    amount = pd.to_numeric(df['amount'], errors='coerce').fillna(0.0).to_numpy(dtype='float64')
+    buy_price = pd.to_numeric(df['buy_price'], errors='coerce').fillna(0.0).to_numpy(dtype='float64')
+    manual_price = pd.to_numeric(df['manual_price'], errors='coerce').fillna(0.0).to_numpy(dtype='float64')
+
+    # Otomatik fiyat: map'ten, bulunamazsa alış fiyatı
+    tickers = [normalize_symbol(symbol, asset_type)
+               for symbol, asset_type in zip(df['symbol'], df['asset_type'])]
+    ticker_series = pd.Series(tickers, index=df.index)
+    auto_price = ticker_series.map(prices).to_numpy(dtype='float64', na_value=np.nan)
+    auto_price = np.where(np.isnan(auto_price), buy_price, auto_price)
+
+    is_manual = (df['data_source'] == 'manuel').to_numpy()
+    current_price = np.where(is_manual, manual_price, auto_price)
+    default_status = pd.Series(
+        np.where(ticker_series.isin(list(prices)), STATUS_LIVE, STATUS_MISSING), index=df.index
+    )
+    status = ticker_series.map(price_status or {}).fillna(default_status)
+    status = status.where(~is_manual, 'manuel')
+
+    # Her varlık kendi dövizinden tek kur matrisiyle TL'ye çevrilir
+    currency_col = df['currency'] if 'currency' in df.columns else pd.Series('', index=df.index)
+    currencies = pd.Series(
+        [quote_currency(symbol, asset_type, currency)
+         for symbol, asset_type, currency in zip(df['symbol'], df['asset_type'], currency_col)],
+        index=df.index
+    )
+    fx_rate = currencies.map(fx_rates).fillna(1.0).to_numpy(dtype='float64')
+    fx_applied = (currencies != 'TRY').to_numpy() & currencies.isin(list(fx_rates)).to_numpy()
+    value_tl = amount * current_price * fx_rate
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pnl_pct = np.where(buy_price > 0, (current_price - buy_price) / buy_price * 100, 0.0)
+
+    df['current_price'] = current_price
+    df['value_tl'] = value_tl
+    df['pnl_pct'] = pnl_pct
+    df['fx_applied'] = fx_applied
+    df['quote_currency'] = currencies
+    df['price_status'] = status
+    return df
@@ -0,0 +1,135 @@
+"""
+Arka plan fiyat yenileyicisi (opsiyonel)
+Süreç başına tek bir daemon thread, belirli aralıklarla `assets` ve
+`Pozisyonlar` sayfalarındaki sembolleri okuyup fiyatlarını ortak cache'e
+önceden çeker. Böylece sayfalar fiyatları sadece bellekten okur.
+
+Açmak için: PKM_PRICE_REFRESHER=1 ortam değişkeni
+"""
+
+import os
+import re
+import threading
+import time
+
+import gspread
+import pandas as pd
+
+from price_utils import auto_priced_tickers, refresh_prices, ticker_asset_types
+from sheets_utils import get_spreadsheet, get_values, get_worksheet
+
+REFRESHER_ENABLED = os.environ.get('PKM_PRICE_REFRESHER', '').lower() in ('1', 'true', 'yes')
+REFRESH_INTERVAL = int(os.environ.get('PKM_PRICE_REFRESH_INTERVAL', 300))  # 5 dakika
+REFRESH_HORIZON = 120  # Süresi 2 dakika içinde dolacak fiyatlar da yenilenir
+UNIVERSE_INTERVAL = 1800  # Sembol listesi 30 dakikada bir sheet'ten yeniden okunur
+
+# Piyasa alanında serbest yazılan semboller -> Yahoo Finance ticker'ı
+MARKET_ALIASES = {
+    'XAUUSD': 'GC=F', 'ALTIN': 'GC=F', 'GOLD': 'GC=F',
+    'XAGUSD': 'SI=F', 'GUMUS': 'SI=F', 'GÜMÜŞ': 'SI=F', 'SILVER': 'SI=F',
+    'USOIL': 'CL=F', 'WTI': 'CL=F', 'UKOIL': 'BZ=F', 'BRENT': 'BZ=F',
+    'BIST100': 'XU100.IS', 'XU100': 'XU100.IS', 'BIST30': 'XU030.IS', 'XU030': 'XU030.IS',
+    'NAS100': '^NDX', 'NASDAQ': '^IXIC', 'US100': '^NDX', 'SPX500': '^GSPC', 'US500': '^GSPC',
+    'US30': '^DJI', 'GER40': '^GDAXI', 'DAX': '^GDAXI',
+}
+FX_CODES = {'USD', 'EUR', 'GBP', 'JPY', 'CHF', 'TRY', 'AUD', 'CAD', 'NZD', 'SEK', 'NOK'}
+CRYPTO_QUOTES = ('USDT', 'USDC', 'BUSD', 'USD')
+
+refresher_lock = threading.Lock()
+refresher_thread = None
+refresher_stats = {'runs': 0, 'symbols': 0, 'refreshed': 0, 'last_run': None, 'last_error': None}
+
+
+def market_to_ticker(market):
+    """
+    Pozisyonlar'daki 'Piyasa' metnini Yahoo Finance ticker'ına çevirir
+    Örn: BTCUSDT -> BTC-USD, EURUSD -> EURUSD=X, XAUUSD -> GC=F, THYAO.IS -> THYAO.IS
+    Tanınmayan metinler için None
+    """
+    text = re.sub(r'[\s/_]', '', str(market or '')).upper()
+    if not text:
+        return None
+    if text in MARKET_ALIASES:
+        return MARKET_ALIASES[text]
+    if any(ch in text for ch in '.=-^'):
+        return text  # Zaten Yahoo formatında
+    if len(text) == 6 and text[:3] in FX_CODES and text[3:] in FX_CODES:
+        return f"{text}=X"
+    for quote in CRYPTO_QUOTES:
+        if text.endswith(quote) and len(text) > len(quote):
+            return f"{text[:-len(quote)]}-USD"
+    return None
+
+
+def _records(worksheet):
+    values = get_values(worksheet)
+    if len(values) <= 1:
+        return pd.DataFrame()
+    return pd.DataFrame(values[1:], columns=values[0])
+
+
+def load_symbol_universe(spreadsheet):
+    """assets (otomatik fiyatlı) ve açık Pozisyonlar sembollerinden ticker listesi"""
+    tickers = auto_priced_tickers(_records(get_worksheet(spreadsheet, 'assets')))
+
+    try:
+        positions = _records(get_worksheet(spreadsheet, 'Pozisyonlar'))
+    except gspread.exceptions.WorksheetNotFound:
+        positions = pd.DataFrame()
+    if not positions.empty and 'Piyasa' in positions.columns:
+        if 'Durum' in positions.columns:
+            open_positions = positions[positions['Durum'] == 'OPEN']
+        else:
+            open_positions = positions
+        for market in open_positions['Piyasa']:
+            ticker_symbol = market_to_ticker(market)
+            if ticker_symbol:
+                if ticker_symbol.endswith('-USD'):
+                    ticker_asset_types.setdefault(ticker_symbol, 'kripto')
+                tickers.append(ticker_symbol)
+
+    return list(dict.fromkeys(tickers))
+
+
+def _run(creds_data, interval):
+    tickers = []
+    universe_loaded_at = 0
+    while True:
+        try:
+            if time.time() - universe_loaded_at >= UNIVERSE_INTERVAL or not tickers:
+                spreadsheet = get_spreadsheet(creds_data)
+                tickers = load_symbol_universe(spreadsheet)
+                universe_loaded_at = time.time()
+
+            refreshed = refresh_prices(tickers, horizon=REFRESH_HORIZON)
+            refresher_stats['runs'] += 1
+            refresher_stats['symbols'] = len(tickers)
+            refresher_stats['refreshed'] += refreshed
+            refresher_stats['last_run'] = time.time()
+            refresher_stats['last_error'] = None
+        except Exception as e:
+            refresher_stats['last_error'] = str(e)[:100]
+            print(f"❌ Arka plan fiyat yenileme hatası: {str(e)[:100]}")
+        time.sleep(interval)
+
+
+def start_price_refresher(creds_data, interval=REFRESH_INTERVAL):
+    """
+    Yenileyici thread'i süreç başına bir kez başlatır
+    (REFRESHER_ENABLED kapalıysa hiçbir şey yapmaz)
+
+    Returns:
+        True: thread çalışıyor
+    """
+    global refresher_thread
+    if not REFRESHER_ENABLED or not creds_data:
+        return False
+    with refresher_lock:
+        if refresher_thread is None or not refresher_thread.is_alive():
+            refresher_thread = threading.Thread(
+                target=_run, args=(dict(creds_data), interval),
+                name='price-refresher', daemon=True
+            )
+            refresher_thread.start()
+            print(f"🔄 Arka plan fiyat yenileyicisi başladı ({interval} sn aralıkla)")
+    return True
@@ -0,0 +1,869 @@
+"""
+Fiyat verisi için yardımcı fonksiyonlar (yfinance)
+Cache süreç genelinde tutulur: Streamlit sayfa script'ini her rerun'da yeniden
+çalıştırır ama import edilen modüller bellekte kalır.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta, timezone
+from time import time
+
+import pandas as pd
+import yfinance as yf
+
+import quote_store
+
+CACHE_DURATION = 1800  # 30 dakika (daha az API çağrısı = daha hızlı)
+CACHE_MAX_SIZE = 500  # Cache'te tutulacak en fazla sembol sayısı
+BATCH_SIZE = 50  # Tek yf.download çağrısındaki en fazla ticker
+PRICE_WORKERS = 6  # Eksik semboller en fazla bu kadar paralel gruba bölünür
+PRICE_DEADLINE = 4.0  # Tek rerun'da fiyatlar için beklenecek toplam süre (saniye)
+
+# Varlık sınıfına ve borsa saatlerine göre TTL'ler
+CRYPTO_TTL = 120  # Kripto 7/24 işlem görür, kısa tutulur
+FUND_TTL = 24 * 3600  # Hisse fonları günde bir kez fiyatlanır
+BIST_TZ = timezone(timedelta(hours=3))  # İstanbul: UTC+3, yaz saati yok
+BIST_OPEN = (10, 0)  # Seans açılışı
+BIST_CLOSE = (18, 10)  # Kapanış seansı dahil
+MARKET_CLOSE_MARGIN = 600  # Kapanış fiyatı yerleşsin diye kapanıştan 10 dk sonra bir kez daha çek
+FX_WEEKEND_REOPEN = (6, 22)  # Döviz piyasası Pazar 22:00 UTC'de açılır (Cuma 22:00'de kapanır)
+
+# Fiyat durumları (sayfada işaretlemek için)
+STATUS_LIVE = 'live'  # Bu rerun'da çekildi
+STATUS_CACHE = 'cache'  # Geçerli cache kaydından
+STATUS_STALE = 'stale'  # Süre doldu, süresi geçmiş son fiyat gösteriliyor
+STATUS_PENDING = 'pending'  # Süre doldu, hiç fiyat yok (alış fiyatı gösteriliyor)
+STATUS_MISSING = 'missing'  # Sağlayıcı fiyat döndürmedi (alış fiyatı gösteriliyor)
+STATUS_FAILED = 'failed'  # Sembol yakın zamanda hata verdi, tekrar denenmedi
+
+# Hatalı semboller için negatif cache (üstel geri çekilme)
+NEGATIVE_BASE_TTL = 60  # İlk hatadan sonra 1 dakika bekle
+NEGATIVE_MAX_TTL = 6 * 3600  # En fazla 6 saat
+# Sağlayıcı (yfinance) geneli devre kesici
+BREAKER_THRESHOLD = 3  # Art arda bu kadar zaman aşımı/hata olursa devre açılır
+BREAKER_COOLDOWN = 120  # Açık devre bu kadar saniye yfinance'e gitmez
+# Bu kelimeleri içeren hatalar sembolün değil sağlayıcının hatasıdır
+PROVIDER_ERROR_HINTS = ('timeout', 'timed out', 'connection', 'rate limit', 'too many requests')
+
+# Yerel cache klasörü (son bilinen kurlar vb.)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.pkm_cache')
+FX_STATE_FILE = os.path.join(CACHE_DIR, 'fx_rates.json')
+
+FX_CACHE_DURATION = 900  # 15 dakika
+FX_PROBE_TIMEOUT = 5  # Her aday ticker için en fazla 5 saniye
+# Her döviz için denenecek ticker'lar (Yahoo Finance bazen ticker değiştiriyor)
+# 1'den küçük gelen kurlar (TRY=X, TRYUSD=X gibi ters pariteler) otomatik çevrilir
+FX_CANDIDATES = {
+    'USD': ['USDTRY=X', 'TRY=X', 'TRYUSD=X'],
+    'EUR': ['EURTRY=X', 'TRYEUR=X'],
+    'GBP': ['GBPTRY=X', 'TRYGBP=X'],
+}
+# Hiç kur kaydedilmemişse (ilk çalıştırma) kullanılacak başlangıç değerleri
+FX_BOOTSTRAP_RATES = {'USD': 42.0, 'EUR': 49.0, 'GBP': 56.0}
+
+
+class PriceCache:
+    """
+    Thread-safe fiyat cache'i
+    - Her anahtar kendi TTL'ine sahip
+    - Boyut sınırı aşılınca en uzun süredir kullanılmayan anahtar atılır (LRU)
+    - hit/miss sayaçları tutulur
+    """
+
+    def __init__(self, max_size=CACHE_MAX_SIZE, default_ttl=CACHE_DURATION):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Geçerli fiyatı döndürür, yoksa veya süresi dolmuşsa None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time() >= entry['expires']:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry['price']
+
+    def peek(self, key):
+        """Süresi dolmuş olsa bile son bilinen fiyatı döndürür (sayaçları etkilemez)"""
+        with self._lock:
+            entry = self._data.get(key)
+            return None if entry is None else entry['price']
+
+    def ttl_left(self, key):
+        """Kaydın süresinin dolmasına kalan saniye (yoksa None, dolmuşsa <= 0)"""
+        with self._lock:
+            entry = self._data.get(key)
+            return None if entry is None else entry['expires'] - time()
+
+    def age(self, key):
+        """Kaydın kaç saniye önce alındığını döndürür, yoksa None"""
+        with self._lock:
+            entry = self._data.get(key)
+            return None if entry is None else time() - entry['timestamp']
+
+    def set(self, key, price, ttl=None, timestamp=None):
+        """Fiyatı cache'e yazar (timestamp: fiyatın alındığı an, verilmezse şimdi)"""
+        timestamp = time() if timestamp is None else timestamp
+        with self._lock:
+            self._data[key] = {
+                'price': price,
+                'timestamp': timestamp,
+                'expires': timestamp + (self.default_ttl if ttl is None else ttl)
+            }
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Cache'i ve sayaçları sıfırlar"""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Cache istatistiklerini döndürür"""
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+class NegativeCache:
+    """
+    Fiyatı alınamayan semboller için negatif cache
+    Her ardışık hatada bekleme süresi ikiye katlanır (60 sn, 2 dk, 4 dk ... 6 saat)
+    """
+
+    def __init__(self, base_ttl=NEGATIVE_BASE_TTL, max_ttl=NEGATIVE_MAX_TTL):
+        self.base_ttl = base_ttl
+        self.max_ttl = max_ttl
+        self._failures = {}
+        self._lock = threading.Lock()
+        self.skipped = 0
+
+    def is_blocked(self, key):
+        """Sembol hâlâ bekleme süresindeyse True (atlanan istek sayılır)"""
+        with self._lock:
+            entry = self._failures.get(key)
+            if entry is None or time() >= entry['retry_at']:
+                return False
+            self.skipped += 1
+            return True
+
+    def record_failure(self, key):
+        with self._lock:
+            count = self._failures.get(key, {}).get('count', 0) + 1
+            ttl = min(self.base_ttl * 2 ** (count - 1), self.max_ttl)
+            self._failures[key] = {'count': count, 'retry_at': time() + ttl}
+
+    def record_success(self, key):
+        with self._lock:
+            self._failures.pop(key, None)
+
+    def stats(self):
+        now = time()
+        with self._lock:
+            return {
+                'blocked': sum(1 for entry in self._failures.values() if entry['retry_at'] > now),
+                'skipped': self.skipped
+            }
+
+
+class CircuitBreaker:
+    """
+    Sağlayıcı geneli devre kesici
+    - closed: istekler normal gider
+    - open: art arda BREAKER_THRESHOLD hatadan sonra BREAKER_COOLDOWN boyunca istek gitmez
+    - half_open: bekleme bitince tek bir deneme isteğine izin verilir
+    allow() sadece gerçekten istek gönderilecekse çağrılır ve her istek sonucu
+    record_success / record_failure / record_inconclusive ile bildirilir. Deneme
+    sonucu cooldown içinde bildirilmezse yeni bir denemeye izin verilir
+    (devre half_open'da askıda kalmaz).
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = 0
+        self.trial_at = 0
+        self.trips = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """İstek yapılabilir mi?"""
+        with self._lock:
+            now = time()
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and now - self.opened_at >= self.cooldown:
+                self.state = 'half_open'
+                self.trial_at = now
+                return True
+            if self.state == 'half_open' and now - self.trial_at >= self.cooldown:
+                # Önceki denemenin sonucu hiç bildirilmedi: yeni deneme
+                self.trial_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == 'half_open' or self.consecutive_failures >= self.threshold:
+                if self.state != 'open':
+                    self.trips += 1
+                    print(f"🔌 yfinance devre kesici açıldı ({self.cooldown} sn bekleniyor)")
+                self.state = 'open'
+                self.opened_at = time()
+
+    def record_inconclusive(self):
+        """
+        Sonuç sağlayıcının durumu hakkında bilgi vermedi (ör. tek sembol boş döndü):
+        closed'da sayaçlar değişmez, half_open denemesi başarı sayılmaz ve devre yeniden açılır
+        """
+        with self._lock:
+            if self.state == 'half_open':
+                self.state = 'open'
+                self.opened_at = time()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'trips': self.trips,
+                'rejected': self.rejected
+            }
+
+
+# Süreç genelinde tek cache (tüm rerun'lar ve oturumlar paylaşır)
+price_cache = PriceCache()
+negative_cache = NegativeCache()
+provider_breaker = CircuitBreaker()
+
+
+def normalize_symbol(symbol, asset_type):
+    """
+    Yahoo Finance ticker'ını döndürür
+    - Hisse senetleri için .IS ekler
+    - Paritesi yazılmamış kriptolar için -USD ekler (BTC -> BTC-USD)
+    """
+    symbol = str(symbol).strip().upper()
+    if asset_type == 'hisse' and not symbol.endswith('.IS'):
+        symbol = symbol + '.IS'
+    elif asset_type == 'kripto' and symbol and '-' not in symbol:
+        symbol = symbol + '-USD'
+    return symbol
+
+
+# Ticker -> varlık sınıfı (TTL hesabı için, portföy okunurken doldurulur)
+ticker_asset_types = {}
+
+
+def auto_priced_tickers(assets_df):
+    """Otomatik fiyatlı varlıkların (data_source != manuel) ticker listesini döndürür"""
+    if assets_df is None or assets_df.empty:
+        return []
+    auto_df = assets_df[assets_df['data_source'] != 'manuel']
+    tickers = []
+    for _, row in auto_df.iterrows():
+        ticker_symbol = normalize_symbol(row['symbol'], row['asset_type'])
+        if ticker_symbol:
+            ticker_asset_types[ticker_symbol] = row['asset_type']
+            tickers.append(ticker_symbol)
+    return list(dict.fromkeys(tickers))
+
+
+# ==============================
+# PİYASA SAATLERİ / TTL
+# ==============================
+
+def _next_bist_open(now_local):
+    """Verilen İstanbul saatinden sonraki ilk seans açılışı (hafta içi 10:00)"""
+    candidate = now_local.replace(hour=BIST_OPEN[0], minute=BIST_OPEN[1], second=0, microsecond=0)
+    if candidate <= now_local:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:  # Cumartesi/Pazar
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def bist_ttl(now=None):
+    """
+    BIST (.IS) fiyatı için TTL
+    - Seans içinde: CACHE_DURATION (kapanıştan sonra bir kez daha çekilecek şekilde kısaltılır)
+    - Seans dışında: bir sonraki seans açılışına kadar
+    Not: resmi tatiller takvimde yok, tatil günü açılışta bir çağrı fazladan yapılır.
+    """
+    now_local = datetime.fromtimestamp(time() if now is None else now, BIST_TZ)
+    session_open = now_local.replace(hour=BIST_OPEN[0], minute=BIST_OPEN[1], second=0, microsecond=0)
+    session_close = now_local.replace(hour=BIST_CLOSE[0], minute=BIST_CLOSE[1], second=0, microsecond=0)
+    if now_local.weekday() < 5 and session_open <= now_local < session_close:
+        until_close = (session_close - now_local).total_seconds() + MARKET_CLOSE_MARGIN
+        return min(CACHE_DURATION, until_close)
+    if now_local.weekday() < 5 and session_close <= now_local < session_close + timedelta(seconds=MARKET_CLOSE_MARGIN):
+        # Kapanış fiyatı henüz yerleşmemiş olabilir
+        return (session_close - now_local).total_seconds() + MARKET_CLOSE_MARGIN
+    return (_next_bist_open(now_local) - now_local).total_seconds()
+
+
+def fx_ttl(base_ttl, now=None):
+    """Döviz kurları hafta sonu değişmez: Cuma 22:00 - Pazar 22:00 UTC arası açılışa kadar cache'le"""
+    now_utc = datetime.fromtimestamp(time() if now is None else now, timezone.utc)
+    weekday, hour = now_utc.weekday(), now_utc.hour
+    closed = (weekday == 4 and hour >= 22) or weekday == 5 or (weekday == 6 and hour < FX_WEEKEND_REOPEN[1])
+    if not closed:
+        return base_ttl
+    reopen = now_utc.replace(hour=FX_WEEKEND_REOPEN[1], minute=0, second=0, microsecond=0)
+    reopen += timedelta(days=(FX_WEEKEND_REOPEN[0] - weekday) % 7)
+    return max(base_ttl, (reopen - now_utc).total_seconds())
+
+
+def price_ttl(ticker_symbol, asset_type=None, now=None):
+    """Ticker'ın varlık sınıfına ve borsa saatine göre cache süresi (saniye)"""
+    asset_type = asset_type or ticker_asset_types.get(ticker_symbol)
+    if asset_type == 'kripto':
+        return CRYPTO_TTL
+    if asset_type == 'hisse_fonlari':
+        return FUND_TTL
+    if asset_type == 'hisse' or ticker_symbol.endswith('.IS'):
+        return bist_ttl(now)
+    if ticker_symbol.endswith('=X'):
+        return fx_ttl(CACHE_DURATION, now)
+    if ticker_symbol.endswith(('-USD', '-EUR', '-GBP')):
+        return CRYPTO_TTL
+    return CACHE_DURATION
+
+
+def _extract_close(data, ticker_symbol):
+    """yf.download sonucundan ticker'ın son kapanış fiyatını çeker"""
+    if isinstance(data.columns, pd.MultiIndex):
+        if ticker_symbol not in data.columns.get_level_values(0):
+            return None
+        closes = data[ticker_symbol]['Close']
+    else:
+        closes = data['Close']
+    closes = closes.dropna()
+    if closes.empty:
+        return None
+    return float(closes.iloc[-1])
+
+
+def _is_provider_error(message):
+    message = str(message).lower()
+    return any(hint in message for hint in PROVIDER_ERROR_HINTS)
+
+
+def _download_batch(tickers):
+    """
+    Bir grup ticker'ı tek istekte indirir, {ticker: fiyat} döndürür
+    - İstisna veya çok sembollü grubun tamamen boş dönmesi sağlayıcı hatasıdır:
+      devre kesiciye yazılır, semboller negatif cache'e yazılmaz
+    - Fiyatı gelmeyen semboller (tek sembollük grubun boş dönmesi dahil: silinmiş veya
+      yanlış yazılmış sembol) negatif cache'e yazılır
+    - Her çağrı devre kesiciye bir sonuç bildirir (half_open denemesi askıda kalmaz)
+    """
+    try:
+        # period='5d': farklı borsaların tatil günleri tek tarih indeksinde NaN bırakır
+        data = yf.download(tickers, period='5d', group_by='ticker', threads=True,
+                           progress=False, timeout=10)
+    except Exception as e:
+        print(f"❌ Toplu fiyat çekme hatası: {str(e)[:100]}")
+        provider_breaker.record_failure()
+        return {}
+
+    prices = {}
+    if data is not None and not data.empty:
+        for ticker_symbol in tickers:
+            try:
+                price = _extract_close(data, ticker_symbol)
+            except KeyError:
+                price = None
+            if price is not None:
+                prices[ticker_symbol] = price
+
+    if not prices and len(tickers) > 1:
+        print(f"⚠️ Toplu fiyat çekme boş döndü ({len(tickers)} sembol)")
+        provider_breaker.record_failure()
+        return prices
+
+    if prices:
+        provider_breaker.record_success()
+    else:
+        provider_breaker.record_inconclusive()
+    for ticker_symbol in tickers:
+        if ticker_symbol in prices:
+            negative_cache.record_success(ticker_symbol)
+        else:
+            print(f"⚠️ {ticker_symbol} - Veri boş döndü")
+            negative_cache.record_failure(ticker_symbol)
+    return prices
+
+
+# Süreç genelinde fiyat thread havuzu: rerun bittikten sonra gelen (geç kalan)
+# sonuçlar da cache'e yazılır ve bir sonraki rerun'da kullanılır
+price_executor = ThreadPoolExecutor(max_workers=PRICE_WORKERS, thread_name_prefix='price')
+inflight_lock = threading.RLock()
+inflight = {}  # ticker -> Future (aynı sembol iki kez istenmesin)
+
+
+# Diskteki fiyat deposundan yüklenen (bu süreçte henüz yenilenmemiş) semboller
+store_seed_lock = threading.Lock()
+store_loaded = False
+store_seeded = set()
+
+
+def _seed_from_store():
+    """
+    Sürecin ilk fiyat isteğinde diskteki son fiyatları cache'e yükler
+    Süresi hâlâ geçerli olanlar (örn. seans dışı BIST) doğrudan cache isabeti olur,
+    süresi dolanlar stale olarak gösterilir ve arka planda yenilenir.
+    """
+    global store_loaded
+    if store_loaded:
+        return
+    with store_seed_lock:
+        if store_loaded:
+            return
+        stored = quote_store.load_quotes()
+        now = time()
+        for ticker_symbol, quote in stored.items():
+            if price_cache.peek(ticker_symbol) is not None:
+                continue
+            fetched_at = quote['fetched_at']
+            ttl = price_ttl(ticker_symbol, now=fetched_at)
+            price_cache.set(ticker_symbol, quote['price'], ttl=ttl, timestamp=fetched_at)
+            if fetched_at + ttl <= now:
+                store_seeded.add(ticker_symbol)
+        if stored:
+            print(f"💾 Fiyat deposundan {len(stored)} sembol yüklendi")
+        store_loaded = True
+
+
+def _download_and_cache(tickers):
+    """Grubu indirir, sonuçları cache'e ve diskteki depoya yazar (thread havuzunda çalışır)"""
+    prices = _download_batch(tickers)
+    for ticker_symbol, price in prices.items():
+        price_cache.set(ticker_symbol, price, ttl=price_ttl(ticker_symbol))
+        store_seeded.discard(ticker_symbol)
+    quote_store.save_quotes(prices, source='yfinance')
+    return prices
+
+
+def _release_inflight(tickers, future):
+    with inflight_lock:
+        for ticker_symbol in tickers:
+            if inflight.get(ticker_symbol) is future:
+                del inflight[ticker_symbol]
+
+
+def _submit_missing(missing):
+    """Eksik sembolleri paralel gruplara bölüp havuza gönderir, {ticker: Future} döndürür"""
+    futures = {}
+    with inflight_lock:
+        to_fetch = []
+        for ticker_symbol in missing:
+            if ticker_symbol in inflight:
+                futures[ticker_symbol] = inflight[ticker_symbol]
+            else:
+                to_fetch.append(ticker_symbol)
+
+        if to_fetch:
+            chunk_size = min(BATCH_SIZE, max(1, -(-len(to_fetch) // PRICE_WORKERS)))
+            for i in range(0, len(to_fetch), chunk_size):
+                chunk = to_fetch[i:i + chunk_size]
+                future = price_executor.submit(_download_and_cache, chunk)
+                for ticker_symbol in chunk:
+                    inflight[ticker_symbol] = future
+                    futures[ticker_symbol] = future
+                # Hemen biten future'da callback bu thread'de çalışır (RLock bu yüzden)
+                future.add_done_callback(lambda f, chunk=chunk: _release_inflight(chunk, f))
+    return futures
+
+
+def resolve_prices(tickers, deadline=PRICE_DEADLINE):
+    """
+    Birden fazla ticker'ın fiyatını süre sınırı içinde çözer
+    - Cache'te olanlar için ağ çağrısı yapılmaz
+    - Kalanlar paralel gruplar halinde (her grup tek yf.download) çekilir
+    - deadline dolunca beklenmez: son bilinen fiyat (stale) kullanılır,
+      geç gelen sonuçlar yine de cache'e yazılır
+    - Yeniden başlatma sonrası diskten gelen fiyatlar için hiç beklenmez:
+      hemen stale olarak döner, yenileme arka planda sürer
+
+    Returns:
+        (prices, status): {ticker: fiyat} ve {ticker: STATUS_*}
+        (fiyatı hiç bilinmeyen ticker'lar prices'ta yer almaz)
+    """
+    _seed_from_store()
+    prices = {}
+    status = {}
+    missing = []
+    for ticker_symbol in dict.fromkeys(tickers):
+        cached_price = price_cache.get(ticker_symbol)
+        if cached_price is not None:
+            prices[ticker_symbol] = cached_price
+            status[ticker_symbol] = STATUS_CACHE
+        else:
+            missing.append(ticker_symbol)
+
+    # Yakın zamanda hata veren semboller ve açık devre: ağa hiç gidilmez
+    # (devre kesiciye sadece istek gidecekse sorulur, half_open denemesi boşa harcanmaz)
+    blocked = [t for t in missing if negative_cache.is_blocked(t)]
+    if len(blocked) < len(missing) and not provider_breaker.allow():
+        blocked = missing
+    for ticker_symbol in blocked:
+        stale_price = price_cache.peek(ticker_symbol)
+        if stale_price is not None:
+            prices[ticker_symbol] = stale_price
+            status[ticker_symbol] = STATUS_STALE
+        else:
+            status[ticker_symbol] = STATUS_FAILED
+    missing = [t for t in missing if t not in status]
+
+    if not missing:
+        return prices, status
+
+    futures = _submit_missing(missing)
+    blocking = {futures[t] for t in missing if t not in store_seeded}
+    if blocking:
+        wait(blocking, timeout=deadline)
+
+    for ticker_symbol in missing:
+        future = futures[ticker_symbol]
+        price = None
+        if future.done() and not future.cancelled() and future.exception() is None:
+            price = future.result().get(ticker_symbol)
+
+        if price is not None:
+            prices[ticker_symbol] = price
+            status[ticker_symbol] = STATUS_LIVE
+            continue
+
+        stale_price = price_cache.peek(ticker_symbol)
+        if stale_price is not None:
+            prices[ticker_symbol] = stale_price
+            status[ticker_symbol] = STATUS_STALE
+        elif future.done():
+            status[ticker_symbol] = STATUS_MISSING
+        else:
+            status[ticker_symbol] = STATUS_PENDING
+
+    late = [t for t, state in status.items() if state in (STATUS_STALE, STATUS_PENDING)]
+    if late:
+        print(f"⏱️ {len(late)} sembol için güncel fiyat süre sınırına yetişmedi: {', '.join(late[:10])}")
+
+    return prices, status
+
+
+def fetch_prices(tickers, deadline=PRICE_DEADLINE):
+    """{ticker: fiyat} döndürür (bkz. resolve_prices)"""
+    return resolve_prices(tickers, deadline)[0]
+
+
+def fetch_price(symbol, asset_type):
+    """Tek sembolün güncel fiyatını döndürür (cache'li), alınamazsa None"""
+    ticker_symbol = normalize_symbol(symbol, asset_type)
+    ticker_asset_types[ticker_symbol] = asset_type
+    return fetch_prices([ticker_symbol]).get(ticker_symbol)
+
+
+def refresh_prices(tickers, horizon=0, timeout=60):
+    """
+    Süresi dolmuş veya horizon saniye içinde dolacak ticker'ları yeniden çeker
+    (arka plan yenileyicisi için; sayfa render'ından bağımsız, sonucu bekler)
+
+    Returns:
+        Yenilenen ticker sayısı
+    """
+    _seed_from_store()
+    due = []
+    for ticker_symbol in dict.fromkeys(tickers):
+        left = price_cache.ttl_left(ticker_symbol)
+        if left is not None and left > horizon:
+            continue
+        if negative_cache.is_blocked(ticker_symbol):
+            continue
+        due.append(ticker_symbol)
+
+    if not due or not provider_breaker.allow():
+        return 0
+
+    futures = _submit_missing(due)
+    done, _ = wait(set(futures.values()), timeout=timeout)
+    refreshed = [
+        t for t in due
+        if futures[t] in done and not futures[t].cancelled()
+        and futures[t].exception() is None and t in futures[t].result()
+    ]
+    return len(refreshed)
+
+
+def price_service_stats():
+    """Sayfada gösterilecek fiyat servisi sayaçları"""
+    return {
+        'cache': price_cache.stats(),
+        'negative': negative_cache.stats(),
+        'breaker': provider_breaker.stats()
+    }
+
+
+def get_portfolio_prices(assets_df, deadline=PRICE_DEADLINE):
+    """
+    assets tablosundaki tüm otomatik fiyatlı sembolleri çözer
+
+    Returns:
+        (prices, status) - bkz. resolve_prices
+    """
+    return resolve_prices(auto_priced_tickers(assets_df), deadline)
+
+
+
+# =============================================================================
+# DÖVİZ KURLARI (FX)
+# =============================================================================
+
+fx_lock = threading.Lock()
+# Kur yenileme işi arka planda tek seferde bir tane çalışır: süre sınırına
+# yetişmeyen sonuçlar da FX:MATRIX'e yazılır ve bir sonraki rerun'da kullanılır
+fx_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fx')
+fx_refresh = None  # Süren kur yenilemesinin Future'ı
+
+
+def _load_fx_state():
+    """Diskten son bilinen geçerli kurları okur: {döviz: {'rate', 'timestamp'}}"""
+    try:
+        with open(FX_STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_fx_state(rates):
+    """Son bilinen geçerli kurları diske yazar"""
+    state = _load_fx_state()
+    now = time()
+    for currency, rate in rates.items():
+        state[currency] = {'rate': rate, 'timestamp': now}
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(FX_STATE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+    except OSError as e:
+        print(f"⚠️ Kurlar diske yazılamadı: {e}")
+
+
+def _probe_fx_ticker(ticker_symbol):
+    """Tek bir kur ticker'ını çeker, TL karşılığını döndürür (ters pariteyi çevirir)"""
+    data = yf.Ticker(ticker_symbol).history(period='5d', timeout=FX_PROBE_TIMEOUT)
+    closes = data['Close'].dropna() if not data.empty else data
+    if closes.empty:
+        return None
+    rate = float(closes.iloc[-1])
+    if 0 < rate < 1:
+        rate = 1 / rate
+    return rate
+
+
+def _is_sane_rate(rate, last_good):
+    """Kur makul mu? Son bilinen değerin yarısı ile iki katı arasında olmalı"""
+    if rate is None or rate <= 1:
+        return False
+    if last_good:
+        return last_good / 2 <= rate <= last_good * 2
+    return True
+
+
+def _probe_fx_rates(currencies, last_good):
+    """
+    Tüm adayları paralel dener, her döviz için ilk makul sonucu döndürür
+    (arka plandaki kur yenileme işinde çalışır; adaylar en fazla FX_PROBE_TIMEOUT
+    kadar beklenir, zaman aşımı sağlayıcı hatası sayılır)
+    """
+    rates = {}
+    jobs = {}
+    failed = False
+    if not provider_breaker.allow():
+        return rates
+
+    executor = ThreadPoolExecutor(max_workers=8)
+    for currency in currencies:
+        for ticker_symbol in FX_CANDIDATES.get(currency, []):
+            jobs[executor.submit(_probe_fx_ticker, ticker_symbol)] = (currency, ticker_symbol)
+
+    try:
+        for future in as_completed(jobs, timeout=FX_PROBE_TIMEOUT * 2):
+            currency, ticker_symbol = jobs[future]
+            if currency in rates:
+                continue
+            try:
+                rate = future.result()
+            except Exception as e:
+                print(f"❌ {ticker_symbol} hata: {str(e)[:50]}")
+                if _is_provider_error(e) or isinstance(e, TimeoutError):
+                    provider_breaker.record_failure()
+                    failed = True
+                continue
+            if _is_sane_rate(rate, last_good.get(currency)):
+                print(f"✅ {currency}/TL kuru: {rate:.4f} ({ticker_symbol})")
+                rates[currency] = rate
+            if len(rates) == len(currencies):
+                break
+    except FutureTimeoutError:
+        print(f"⚠️ Kurlar {FX_PROBE_TIMEOUT * 2} sn içinde gelmedi ({len(rates)}/{len(currencies)})")
+        if not rates:
+            provider_breaker.record_failure()
+            failed = True
+
+    if rates:
+        provider_breaker.record_success()
+    elif not failed:
+        # Adaylar boş/makul olmayan kur döndü: deneme yine de sonuçlandırılır
+        provider_breaker.record_inconclusive()
+
+    # Yavaş kalan adayları bekleme
+    executor.shutdown(wait=False, cancel_futures=True)
+    return rates
+
+
+def _fx_matrix(fresh, last_good):
+    """Kur matrisi: çekilen kurlar, yoksa son bilinen, o da yoksa başlangıç değeri"""
+    rates = {'TRY': 1.0}
+    for currency in FX_CANDIDATES:
+        if currency in fresh:
+            rates[currency] = fresh[currency]
+        elif last_good.get(currency):
+            print(f"⚠️ {currency}/TL kuru çekilemedi, son bilinen değer kullanılıyor: {last_good[currency]:.4f}")
+            rates[currency] = last_good[currency]
+        else:
+            print(f"⚠️ {currency}/TL kuru çekilemedi, başlangıç değeri kullanılıyor: {FX_BOOTSTRAP_RATES[currency]}")
+            rates[currency] = FX_BOOTSTRAP_RATES[currency]
+    return rates
+
+
+def _last_good_rates():
+    return {currency: entry.get('rate') for currency, entry in _load_fx_state().items()}
+
+
+def _refresh_fx_rates():
+    """Kurları çeker, diske ve FX:MATRIX cache'ine yazar (fx_executor'da çalışır)"""
+    last_good = _last_good_rates()
+    fresh = _probe_fx_rates(list(FX_CANDIDATES), last_good)
+    if fresh:
+        _save_fx_state(fresh)
+    rates = _fx_matrix(fresh, last_good)
+    # Hiçbir kur çekilemediyse kısa süre sonra tekrar dene
+    price_cache.set('FX:MATRIX', rates, ttl=fx_ttl(FX_CACHE_DURATION) if fresh else 60)
+    return rates
+
+
+def _start_fx_refresh():
+    """Süren kur yenilemesinin Future'ı (yoksa başlatır; oturumlar aynı yenilemeyi bekler)"""
+    global fx_refresh
+    with fx_lock:
+        if fx_refresh is None or fx_refresh.done():
+            fx_refresh = fx_executor.submit(_refresh_fx_rates)
+        return fx_refresh
+
+
+def get_fx_rates(deadline=PRICE_DEADLINE):
+    """
+    Döviz/TL kur matrisini döndürür: {'TRY': 1.0, 'USD': ..., 'EUR': ..., 'GBP': ...}
+    - 15 dakikalık cache (süreç genelinde)
+    - Aday ticker'lar arka planda paralel denenir, en fazla deadline saniye beklenir
+    - Süre dolarsa son bilinen kurlar döner; yenileme arka planda sürer ve sonucu cache'e yazar
+      (süre sınırı sağlayıcı hatası sayılmaz)
+    - Çekilemeyen kur için diske kaydedilmiş son geçerli değer kullanılır
+    """
+    cached = price_cache.get('FX:MATRIX')
+    if cached is not None:
+        return cached
+
+    try:
+        return _start_fx_refresh().result(timeout=deadline)
+    except FutureTimeoutError:
+        print("⏱️ Kurlar süre sınırına yetişmedi, son bilinen kurlar kullanılıyor")
+    except Exception as e:
+        print(f"❌ Kur yenileme hatası: {str(e)[:100]}")
+    return price_cache.peek('FX:MATRIX') or _fx_matrix({}, _last_good_rates())
+
+
+def get_market_quotes(tickers, deadline=PRICE_DEADLINE):
+    """
+    Piyasa şeridi için fiyatlar ve USD/TL kuru tek seferde, paralel çözülür
+    Fiyatlar portföy cache'ini paylaşır (örn. portföydeki BTC-USD tekrar çekilmez).
+
+    Returns:
+        {ticker: {'price', 'age', 'status'}} - USD/TL kur matrisinden 'USDTRY=X' anahtarında
+        (age: fiyatın kaç saniye önce alındığı)
+    """
+    started = time()
+    if price_cache.peek('FX:MATRIX') is None or price_cache.ttl_left('FX:MATRIX') <= 0:
+        _start_fx_refresh()  # Kurlar fiyatlarla paralel çekilir
+    prices, status = resolve_prices(tickers, deadline)
+
+    quotes = {}
+    for ticker_symbol, price in prices.items():
+        quotes[ticker_symbol] = {
+            'price': price,
+            'age': price_cache.age(ticker_symbol),
+            'status': status.get(ticker_symbol)
+        }
+
+    rates = get_fx_rates(deadline=max(0.0, deadline - (time() - started)))
+    fx_status = STATUS_CACHE if (price_cache.ttl_left('FX:MATRIX') or 0) > 0 else STATUS_STALE
+    if rates:
+        quotes['USDTRY=X'] = {
+            'price': rates['USD'],
+            'age': price_cache.age('FX:MATRIX'),
+            'status': fx_status
+        }
+    return quotes
+
+
+def get_usd_tl_rate():
+    """USD/TL kurunu döndürür (cache'li kur matrisinden)"""
+    return get_fx_rates()['USD']
+
+
+def quote_currency(symbol, asset_type, currency=None):
+    """
+    Varlığın fiyatlandığı dövizi döndürür
+    - assets sheet'inde 'currency' kolonu doluysa o kullanılır
+    - kripto paralar USD bazlı (EXACTLY like Flask app)
+    - '-USD', '-EUR', '-GBP' ile biten ticker'lar ilgili dövizde
+    - diğer her şey TL
+    """
+    if currency and str(currency).strip():
+        return str(currency).strip().upper()
+    if asset_type == 'kripto':
+        return 'USD'
+    ticker_symbol = str(symbol).strip().upper()
+    for suffix in FX_CANDIDATES:
+        if ticker_symbol.endswith(f'-{suffix}'):
+            return suffix
+    return 'TRY'
@@ -0,0 +1,84 @@
+"""
+Kalıcı fiyat deposu (SQLite)
+Her sembolün son fiyatı, zamanı ve kaynağı diske yazılır; sunucu yeniden
+başladığında ilk sayfa bu kayıtlarla hemen çizilir.
+"""
+
+import os
+import sqlite3
+import threading
+from time import time
+
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.pkm_cache')
+STORE_FILE = os.path.join(STORE_DIR, 'quotes.sqlite3')
+STORE_TIMEOUT = 5  # Kilitli veritabanında en fazla bu kadar saniye bekle
+
+store_lock = threading.Lock()
+
+
+def _connect():
+    os.makedirs(STORE_DIR, exist_ok=True)
+    conn = sqlite3.connect(STORE_FILE, timeout=STORE_TIMEOUT)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS quotes ("
+        "symbol TEXT PRIMARY KEY, price REAL NOT NULL, fetched_at REAL NOT NULL, source TEXT)"
+    )
+    return conn
+
+
+def save_quotes(prices, source='yfinance', fetched_at=None):
+    """
+    {sembol: fiyat} kayıtlarını depoya yazar (varsa üzerine yazar)
+    Hata olursa sadece uyarı basar, fiyat akışını durdurmaz.
+    """
+    if not prices:
+        return
+    fetched_at = time() if fetched_at is None else fetched_at
+    rows = [(symbol, float(price), fetched_at, source) for symbol, price in prices.items()]
+    try:
+        with store_lock:
+            conn = _connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO quotes (symbol, price, fetched_at, source) VALUES (?, ?, ?, ?)",
+                        rows
+                    )
+            finally:
+                conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️ Fiyat deposuna yazılamadı: {e}")
+
+
+def load_quotes(symbols=None):
+    """
+    Depodaki fiyatları döndürür
+
+    Returns:
+        {sembol: {'price', 'fetched_at', 'source'}} (symbols verilirse sadece onlar)
+    """
+    if not os.path.exists(STORE_FILE):
+        return {}
+    try:
+        with store_lock:
+            conn = _connect()
+            try:
+                if symbols is None:
+                    rows = conn.execute("SELECT symbol, price, fetched_at, source FROM quotes").fetchall()
+                else:
+                    symbols = list(symbols)
+                    placeholders = ','.join('?' * len(symbols))
+                    rows = conn.execute(
+                        f"SELECT symbol, price, fetched_at, source FROM quotes WHERE symbol IN ({placeholders})",
+                        symbols
+                    ).fetchall() if symbols else []
+            finally:
+                conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️ Fiyat deposu okunamadı: {e}")
+        return {}
+
+    return {
+        symbol: {'price': price, 'fetched_at': fetched_at, 'source': source}
+        for symbol, price, fetched_at, source in rows
+    }
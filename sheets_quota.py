@@ -0,0 +1,230 @@
+"""
+Kota farkındalıklı Google Sheets HTTP client'ı
+Sheets API kullanıcı (service account) başına dakikada ~60 okuma ve ~60 yazma
+isteğine izin verir. Her service account için okuma ve yazma olmak üzere iki
+ayrı token bucket tutulur (bir tenant'ın kotası diğerlerini bekletmez):
+- Bucket boşalmışsa istek hata almak yerine token gelene kadar bekletilir
+- 429 / 5xx cevapları jitter'lı üstel geri çekilmeyle tekrar denenir
+  (varsa Retry-After başlığına uyulur). Satır ekleme (values:append) idempotent
+  olmadığından sadece 429'da (istek işlenmeden reddedildi) tekrar denenir.
+- quota_stats(tenant) son bir dakikadaki kullanımı ve bekleme/tekrar sayılarını verir
+
+gspread 6: HTTPClient alt sınıfı (authorize(http_client=...))
+gspread 5: Client alt sınıfı (authorize(client_factory=...))
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+import gspread
+from gspread.exceptions import APIError
+
+try:
+    from gspread.http_client import HTTPClient as _BaseClient  # gspread >= 6
+    GSPREAD_HTTP_CLIENT = True
+except ImportError:
+    from gspread.client import Client as _BaseClient  # gspread 5
+    GSPREAD_HTTP_CLIENT = False
+
+READ_QUOTA_PER_MINUTE = 60
+WRITE_QUOTA_PER_MINUTE = 60
+QUOTA_WINDOW = 60  # sn
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+APPEND_RETRY_STATUSES = {429}  # 408/5xx'te ekleme yapılmış olabilir: tekrar satır çoğaltır
+MAX_RETRIES = 5
+BACKOFF_BASE = 1  # sn, her denemede iki katına çıkar
+BACKOFF_MAX = 32  # sn
+
+# POST olduğu halde sadece okuyan Sheets uç noktaları
+READ_ENDPOINTS = (':batchGet', ':batchGetByDataFilter', ':getByDataFilter')
+APPEND_ENDPOINT = ':append'
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket
+    capacity token ile dolu başlar, saniyede rate token yenilenir.
+    acquire() token yoksa bir sonraki token'a kadar bekler (isteği kuyruğa alır).
+    """
+
+    def __init__(self, capacity, per_seconds=QUOTA_WINDOW):
+        self.capacity = capacity
+        self.rate = capacity / per_seconds
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._recent = deque()  # Son QUOTA_WINDOW içindeki istek zamanları
+        self.requests = 0
+        self.waits = 0
+        self.waited = 0.0
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Bir token alır; gerekirse bekler. Returns: beklenen süre (sn)"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self._recent.append(now)
+                    self.requests += 1
+                    if waited:
+                        self.waits += 1
+                        self.waited += waited
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def penalize(self):
+        """429 alındı: bucket'ı boşaltır, sonraki istekler yenilenmeyi bekler"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = 0.0
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            while self._recent and now - self._recent[0] > QUOTA_WINDOW:
+                self._recent.popleft()
+            return {
+                'used': len(self._recent),
+                'limit': self.capacity,
+                'available': int(self._tokens),
+                'requests': self.requests,
+                'waits': self.waits,
+                'waited': round(self.waited, 1)
+            }
+
+
+DEFAULT_TENANT = 'default'  # Service account e-postası bilinmeyen client'lar
+
+# Tenant (service account) başına kota; aynı hesabın tüm oturumları ve client'ları paylaşır
+tenant_buckets = {}
+tenant_retries = {}
+tenant_lock = threading.Lock()
+
+
+def _tenant(tenant):
+    """Tenant'ın bucket'larını ve tekrar sayaçlarını döndürür (yoksa oluşturur)"""
+    tenant = tenant or DEFAULT_TENANT
+    with tenant_lock:
+        if tenant not in tenant_buckets:
+            tenant_buckets[tenant] = {
+                'read': TokenBucket(READ_QUOTA_PER_MINUTE),
+                'write': TokenBucket(WRITE_QUOTA_PER_MINUTE),
+            }
+            tenant_retries[tenant] = {'retries': 0, 'throttled': 0, 'server_errors': 0, 'failed': 0}
+        return tenant_buckets[tenant], tenant_retries[tenant]
+
+
+def request_kind(method, endpoint):
+    """
+    İsteğin hangi kotaya sayılacağı: 'read', 'write' veya None
+    (Drive API istekleri - spreadsheet'i adla açma vb. - Sheets kotasına girmez)
+    """
+    if 'sheets.googleapis.com' not in str(endpoint):
+        return None
+    if method.upper() == 'GET' or str(endpoint).split('?', 1)[0].endswith(READ_ENDPOINTS):
+        return 'read'
+    return 'write'
+
+
+def backoff_delay(attempt, response=None):
+    """attempt. tekrar için bekleme: Retry-After varsa o, yoksa full jitter'lı üstel süre"""
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def _count(counters, name):
+    with tenant_lock:
+        counters[name] += 1
+
+
+class QuotaHTTPClient(_BaseClient):
+    """
+    Her isteği tenant'ın kota bucket'ından geçirir, 429/5xx'i tekrar dener
+    metrics: bu client'ın istek/hata sayıları (client havuzunun tenant metrikleri)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        auth = getattr(self, 'auth', None)
+        self.tenant = getattr(auth, 'service_account_email', None) or DEFAULT_TENANT
+        self.metrics = {'requests': 0, 'reads': 0, 'writes': 0, 'errors': 0, 'last_request': None}
+
+    def request(self, method, endpoint, *args, **kwargs):
+        kind = request_kind(method, endpoint)
+        buckets, retries = _tenant(self.tenant)
+        bucket = buckets.get(kind)
+        append = str(endpoint).split('?', 1)[0].endswith(APPEND_ENDPOINT)
+        retry_statuses = APPEND_RETRY_STATUSES if append else RETRY_STATUSES
+        attempt = 0
+        while True:
+            if bucket is not None:
+                bucket.acquire()
+            with tenant_lock:
+                self.metrics['requests'] += 1
+                if kind:
+                    self.metrics[kind + 's'] += 1
+                self.metrics['last_request'] = time.time()
+            try:
+                return super().request(method, endpoint, *args, **kwargs)
+            except APIError as e:
+                status = getattr(e.response, 'status_code', None)
+                if status not in retry_statuses or attempt >= MAX_RETRIES:
+                    _count(self.metrics, 'errors')
+                    if status in RETRY_STATUSES:
+                        _count(retries, 'failed')
+                    raise
+                if status == 429:
+                    _count(retries, 'throttled')
+                    if bucket is not None:
+                        bucket.penalize()
+                elif status >= 500:
+                    _count(retries, 'server_errors')
+                _count(retries, 'retries')
+                delay = backoff_delay(attempt, e.response)
+                logger.info("Sheets %s, %.1f sn sonra tekrar denenecek (%d/%d)", status, delay, attempt + 1, MAX_RETRIES)
+                time.sleep(delay)
+                attempt += 1
+
+
+def authorize(credentials):
+    """gspread.authorize'ın kota farkındalıklı hali (gspread 5 ve 6)"""
+    if GSPREAD_HTTP_CLIENT:
+        return gspread.authorize(credentials, http_client=QuotaHTTPClient)
+    return gspread.authorize(credentials, client_factory=QuotaHTTPClient)
+
+
+def quota_stats(tenant=None):
+    """
+    Tenant'ın (service account e-postası) canlı kota kullanımı
+
+    Returns:
+        {'read': {...}, 'write': {...}, 'retries', 'throttled', 'server_errors', 'failed'}
+        read/write: son dakikadaki istek ('used'), 'limit', 'available',
+        toplam 'requests', kuyrukta bekleyen istek sayısı 'waits' ve süresi 'waited'
+    """
+    buckets, retries = _tenant(tenant)
+    with tenant_lock:
+        stats = dict(retries)
+    stats.update({kind: bucket.stats() for kind, bucket in buckets.items()})
+    return stats
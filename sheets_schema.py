@@ -0,0 +1,144 @@
+"""
+Worksheet şema kaydı
+Her worksheet'in kolonları ve tipleri tek yerde tanımlanır (bkz. sheets_schema.md):
+sheet oluşturma başlıkları, tarih çözme ve tipli DataFrame okuma buradan beslenir.
+
+Tipler:
+- id: tam sayı ID (boş/geçersiz -> 0)
+- number: float (eski metin hücreler Türkçe ondalık olabilir: "16,23")
+- int: tam sayı (boş -> 0)
+- date / datetime: pandas datetime64 (okunamayan -> NaT)
+- text: string
+"""
+
+from functools import lru_cache
+
+import pandas as pd
+
+SHEET_SCHEMAS = {
+    # Portföy
+    'assets': {
+        'ID': 'id', 'asset_type': 'text', 'symbol': 'text', 'amount': 'number',
+        'buy_price': 'number', 'data_source': 'text', 'manual_price': 'number',
+        'basket': 'text', 'created_at': 'datetime', 'currency': 'text',
+    },
+    'debts': {'ID': 'id', 'description': 'text', 'amount': 'number', 'created_at': 'datetime'},
+    'asset_history': {'ID': 'id', 'date': 'date', 'total_value': 'number'},
+    'debt_history': {'ID': 'id', 'date': 'date', 'total_debt': 'number'},
+    'closed_positions': {
+        'ID': 'id', 'date': 'date', 'symbol': 'text', 'buy_price': 'number',
+        'sell_price': 'number', 'profit_loss_percent': 'number', 'created_at': 'datetime',
+    },
+    # Trade Asistanı
+    'Pozisyonlar': {
+        'ID': 'id', 'Pozisyon Tipi': 'text', 'Giriş Fiyatı': 'number', 'Lot Büyüklüğü': 'number',
+        'Stop Loss': 'number', 'Take Profit': 'number', 'Plan Notu': 'text', 'Durum': 'text',
+        'Sonuç': 'text', 'Öğrenilen Ders': 'text', 'Açılış Tarihi': 'datetime',
+        'Kapanış Tarihi': 'datetime', 'Çıkış Fiyatı': 'number', 'Piyasa': 'text', 'Timestamp': 'text',
+    },
+    'Gorsel_Tecrubeler': {
+        'ID': 'id', 'Başlık': 'text', 'Kategori': 'text', 'Not': 'text', 'Görsel URL': 'text',
+        'Zarar Miktarı': 'number', 'Oluşturma Tarihi': 'datetime', 'Timestamp': 'text',
+    },
+    'Kategoriler': {
+        'ID': 'id', 'Kategori Adı': 'text', 'Varsayılan mı?': 'text',
+        'Oluşturma Tarihi': 'datetime', 'Timestamp': 'text',
+    },
+    'Ozlu_Sozler': {
+        'ID': 'id', 'Söz': 'text', 'Sıra': 'int', 'Renk': 'text',
+        'Oluşturma Tarihi': 'datetime', 'Timestamp': 'text',
+    },
+    'Kendime_Notlar': {
+        'ID': 'id', 'Başlık': 'text', 'Kategori': 'text', 'İçerik': 'text', 'Görsel URL': 'text',
+        'Oluşturma Tarihi': 'datetime', 'Timestamp': 'text',
+    },
+    # Özgürlük Savaşı
+    'Challenge': {
+        'ID': 'id', 'Tarih': 'date', 'Kar_Zarar': 'number', 'Kasa': 'number',
+        'Kalan_Gun': 'int', 'Hedef': 'number', 'Hedefe_Kalan_Tutar': 'number',
+    },
+    'Challenge_Settings': {
+        'Baslangic_Sermaye': 'number', 'Hedef_Tutar': 'number',
+        'Hedef_Sure_Gun': 'int', 'Baslangic_Tarihi': 'date',
+    },
+    'Challenge_Trades': {
+        'ID': 'id', 'Yon': 'text', 'Enstruman': 'text', 'Giris_Fiyat': 'number', 'Lot': 'number',
+        'Cikis_Fiyat': 'number', 'Kar_Zarar': 'number', 'Durum': 'text',
+        'Acilis_Tarihi': 'datetime', 'Kapanis_Tarihi': 'datetime',
+    },
+}
+
+# Sheet oluşturulurken eklenmeyen, sonradan elle eklenebilen kolonlar
+OPTIONAL_COLUMNS = {'assets': ['currency']}
+
+DATE_FORMATS = {'date': '%Y-%m-%d', 'datetime': '%Y-%m-%d %H:%M:%S'}
+
+
+def sheet_headers(title):
+    """Yeni sheet'in başlık satırı (opsiyonel kolonlar hariç)"""
+    optional = OPTIONAL_COLUMNS.get(title, ())
+    return [column for column in SHEET_SCHEMAS[title] if column not in optional]
+
+
+def column_types(title):
+    """{kolon: tip}; şemada olmayan sheet için boş dict"""
+    return SHEET_SCHEMAS.get(title, {})
+
+
+@lru_cache(maxsize=64)
+def _positions(header):
+    return {column: i for i, column in enumerate(header) if column}
+
+
+def column_positions(header):
+    """Başlık satırından {kolon: index} (aynı başlık için cache'li)"""
+    return _positions(tuple(header))
+
+
+def _number(series):
+    numbers = pd.to_numeric(series, errors='coerce')
+    text = series[numbers.isna() & series.map(lambda value: isinstance(value, str))]
+    if not text.empty:
+        # Metin olarak kaydedilmiş eski değerler: "16,23", "1500 TL"
+        cleaned = text.str.replace('TL', '', regex=False).str.strip().str.replace(',', '.', regex=False)
+        numbers.loc[text.index] = pd.to_numeric(cleaned, errors='coerce')
+    return numbers.fillna(0.0).astype('float64')
+
+
+def _text(value):
+    return format(value, '.12g') if isinstance(value, float) else str(value)
+
+
+def to_frame(values, title):
+    """
+    get_all_values() çıktısını şemaya göre kolon kolon tiplenmiş DataFrame'e çevirir
+    - Boş satırlar atlanır
+    - Kolonlar sheet'teki başlıklardır; şemada olmayanlar string kalır
+    """
+    schema = column_types(title)
+    header = values[0] if values else []
+    positions = column_positions(header)
+    rows = [row for row in values[1:] if any(cell != '' for cell in row)]
+
+    frame = {}
+    for column, i in positions.items():
+        kind = schema.get(column, 'text')
+        series = pd.Series([row[i] if i < len(row) else '' for row in rows],
+                           dtype='object')
+
+        if kind == 'id' or kind == 'int':
+            frame[column] = _number(series).astype('int64')
+        elif kind == 'number':
+            frame[column] = _number(series)
+        elif kind in DATE_FORMATS:
+            # Tarihler sheets_utils.decode_dates ile metne çevrilmiş gelir
+            frame[column] = pd.to_datetime(series.replace('', None), format=DATE_FORMATS[kind],
+                                           errors='coerce')
+            if frame[column].isna().any():
+                # Farklı biçimde (ör. sadece tarih) girilmiş hücreler
+                loose = pd.to_datetime(series.replace('', None), format='mixed', errors='coerce')
+                frame[column] = frame[column].fillna(loose)
+        else:
+            frame[column] = series.map(_text)
+
+    return pd.DataFrame(frame, index=pd.RangeIndex(len(rows)))
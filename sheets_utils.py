@@ -0,0 +1,1428 @@
+"""
+Google Sheets veri erişim katmanı
+- (service account, spreadsheet) başına süreç genelinde tek bağlantı (ClientPool):
+  boşta kalan bağlantılar atılır, erişim token'ı süresi dolmadan yenilenir
+  (istekler sheets_quota ile okuma/yazma kotasına göre sıraya alınır)
+- (spreadsheet, worksheet) anahtarlı read-through cache: sayfalar arasında
+  geçerken aynı sheet tekrar indirilmez
+- Worksheet handle'ları get_worksheet() ile spreadsheet başına tek metadata
+  isteğinden gelir (spreadsheet.worksheet() her çağrıda metadata indirir)
+- Süresi dolan cache kaydı hemen yeniden indirilmez: Drive modifiedTime
+  (ChangeTracker) değişmemişse kayıt uzatılır, sheet sadece gerçek bir
+  düzenlemeden sonra okunur
+- APPEND_ONLY_SHEETS yenilenirken tüm sheet yerine sadece yeni satırlar okunur
+- Her yazmadan sonra invalidate() çağrılır, bir sonraki okuma sheet'ten gelir
+- Arka plan kuyruğunda bekleyen yazımlar (bkz. write_queue) okumalarda
+  cache'in üstüne uygulanır
+- Değerler UNFORMATTED_VALUE / SERIAL_NUMBER ile okunur: sayılar int/float
+  gelir (yerel ayar virgülü yok), tarih kolonları şemaya göre metne çevrilir
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from time import time
+
+import pandas as pd
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import DateTimeOption, ValueRenderOption, fill_gaps, rowcol_to_a1
+from oauth2client.service_account import ServiceAccountCredentials
+
+from sheets_quota import authorize
+from sheets_schema import DATE_FORMATS, SHEET_SCHEMAS, column_types, sheet_headers, to_frame
+
+SPREADSHEET_NAME = "PKM Database"
+SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+SHEET_CACHE_TTL = 60  # Varsayılan: 1 dakika
+SHEET_CACHE_MAX_SIZE = 200  # Cache'te tutulacak en fazla worksheet
+# Nadiren değişen sheet'ler daha uzun cache'lenir
+SHEET_TTLS = {
+    'Challenge_Settings': 600,
+    'Kategoriler': 600,
+    'Ozlu_Sozler': 300,
+    'asset_history': 300,
+    'debt_history': 300,
+    'closed_positions': 300,
+}
+
+CLIENT_POOL_MAX_SIZE = 32  # Aynı anda açık tutulacak en fazla (service account, spreadsheet)
+CLIENT_IDLE_TTL = 1800  # sn: 30 dakika kullanılmayan bağlantı havuzdan atılır
+TOKEN_REFRESH_MARGIN = 300  # sn: süresi 5 dakika içinde dolacak erişim token'ı önceden yenilenir
+
+CHANGE_CHECK_INTERVAL = 5  # sn: Drive modifiedTime en fazla bu sıklıkla sorulur
+SHEET_MAX_STALENESS = 900  # sn: değişiklik görülmese de bu süreden eski kopya yeniden okunur
+
+WORKSHEET_META_TTL = 900  # sn: worksheet listesi en fazla 15 dakikada bir yeniden okunur
+
+# Sadece sona satır eklenen sheet'ler: yenilemede sadece son bilinen satırdan
+# sonrası okunur (son satır tekrar okunup karşılaştırılır, farklıysa tam okuma)
+APPEND_ONLY_SHEETS = {'asset_history', 'debt_history', 'Challenge'}
+TAIL_FULL_RELOAD = 1800  # sn: kuyruk okumalarına rağmen en az bu sıklıkla tam okuma yapılır
+
+ROW_INDEX_TTL = 600  # ID -> satır index'i en fazla 10 dakikada bir sheet'ten yeniden kurulur
+
+# Sayısal kolonlar (float'a çevrilir; eski metin hücreler Türkçe ondalık olabilir: "16,23")
+NUMERIC_COLUMNS = ['amount', 'buy_price', 'manual_price', 'total_value', 'total_debt',
+                   'sell_price', 'profit_loss_percent']
+
+# Tarih kolonları (şema kaydından): SERIAL_NUMBER okumada tarih hücreleri gün sayısı
+# olarak gelir, uygulamanın yazdığı metin biçimine çevrilir (metin olarak saklananlar olduğu gibi kalır)
+DATE_COLUMNS = sorted({column for schema in SHEET_SCHEMAS.values()
+                       for column, kind in schema.items() if kind == 'date'})
+DATETIME_COLUMNS = sorted({column for schema in SHEET_SCHEMAS.values()
+                           for column, kind in schema.items() if kind == 'datetime'})
+COLUMN_TYPES = {
+    **{column: 'number' for column in NUMERIC_COLUMNS},
+    **{column: 'date' for column in DATE_COLUMNS},
+    **{column: 'datetime' for column in DATETIME_COLUMNS},
+}
+SERIAL_EPOCH = datetime(1899, 12, 30)  # Sheets tarih seri numarası 0
+
+# Okuma seçenekleri: biçimlendirilmemiş değerler, tarihler seri numarası
+READ_OPTIONS = {
+    'value_render_option': ValueRenderOption.unformatted,
+    'date_time_render_option': DateTimeOption.serial_number,
+}
+
+
+def id_key(value):
+    """ID hücresini karşılaştırma anahtarına çevirir (3, 3.0 ve "3" -> "3")"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+class SheetCache:
+    """
+    Thread-safe worksheet cache'i
+    Anahtar: (spreadsheet_id, worksheet başlığı), değer: get_all_values() sonucu
+    """
+
+    def __init__(self, max_size=SHEET_CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.revalidations = 0
+
+    def get(self, key):
+        """Geçerli değerleri döndürür, yoksa veya süresi dolmuşsa None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time() >= entry['expires']:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry['values']
+
+    def set(self, key, values, ttl):
+        with self._lock:
+            self._data[key] = {'values': values, 'timestamp': time(), 'expires': time() + ttl}
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def patch(self, key, fn):
+        """Geçerli kaydın değerlerini fn(values) ile değiştirir (yeniden indirmeden), kayıt yoksa False"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time() >= entry['expires']:
+                return False
+            entry['values'] = fn(entry['values'])
+            return True
+
+    def peek(self, key):
+        """Kaydın değerleri, süresi dolmuş olsa da (kuyruk okuması için); yoksa None"""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry['values'] if entry is not None else None
+
+    def expire(self, spreadsheet_id, titles):
+        """Kayıtları silmeden süresini bitirir (bir sonraki okuma kuyruk okuması olabilir)"""
+        with self._lock:
+            for key, entry in self._data.items():
+                if key[0] == spreadsheet_id and key[1] in titles:
+                    entry['expires'] = 0
+
+    def expired(self, key):
+        """Kayıt var ama süresi dolmuş mu (değişiklik kontrolüyle uzatılabilir)"""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and time() >= entry['expires']
+
+    def extend(self, spreadsheet_id, since, ttl_for, max_age=SHEET_MAX_STALENESS):
+        """
+        Spreadsheet'in since'ten sonra okunmuş, süresi dolmuş kayıtlarını
+        ttl_for(başlık) kadar uzatır (sheet o zamandan beri değişmediyse).
+        max_age'den eski kayıtlar uzatılmaz.
+
+        Returns:
+            Uzatılan kayıt sayısı
+        """
+        now = time()
+        extended = 0
+        with self._lock:
+            for key, entry in self._data.items():
+                if (key[0] == spreadsheet_id and now >= entry['expires']
+                        and since <= entry['timestamp'] and now - entry['timestamp'] < max_age):
+                    entry['expires'] = min(now + ttl_for(key[1]), entry['timestamp'] + max_age)
+                    extended += 1
+            self.revalidations += extended
+        return extended
+
+    def invalidate(self, spreadsheet_id, title=None):
+        """Tek worksheet'i (title verilirse) veya tüm spreadsheet'i cache'ten atar"""
+        with self._lock:
+            keys = [key for key in self._data
+                    if key[0] == spreadsheet_id
+                    and (title is None or key[1] == title or key[1].startswith(title + '!'))]
+            for key in keys:
+                del self._data[key]
+            self.invalidations += len(keys)
+
+    def keys(self, spreadsheet_id):
+        with self._lock:
+            return [key for key in self._data if key[0] == spreadsheet_id]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.invalidations = self.revalidations = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'revalidations': self.revalidations
+            }
+
+
+class RowIndex:
+    """
+    Worksheet başına ID -> satır numarası index'i
+    Sheet her okunduğunda yeniden kurulur, aradaki ekleme/silmeler yerinde işlenir;
+    böylece tek satırlık bir güncelleme/silme için tüm sheet indirilmez.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def build(self, key, values):
+        """get_all_values() çıktısından index'i kurar (ID kolonu yoksa kurmaz)"""
+        header = values[0] if values else []
+        if 'ID' not in header:
+            return
+        id_col = header.index('ID')
+        rows = {}
+        for row_number, row in enumerate(values[1:], start=2):
+            if id_col < len(row) and id_key(row[id_col]):
+                rows.setdefault(id_key(row[id_col]), row_number)  # Tekrarlanan ID: ilk satır
+        with self._lock:
+            self._data[key] = {
+                'header': list(header),
+                'rows': rows,
+                'last_row': len(values),
+                'expires': time() + ROW_INDEX_TTL
+            }
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time() >= entry['expires']:
+                return None
+            return entry
+
+    def extend(self, key, values, first_row):
+        """
+        Sona eklenen satırları (values[1:], first_row. satırdan itibaren) index'e işler
+        Index yoksa/süresi dolmuşsa veya başlık değiştiyse False (tam kurulum gerekir)
+        """
+        header = values[0] if values else []
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time() >= entry['expires'] or entry['header'] != list(header):
+                return False
+            id_col = header.index('ID')
+            for row_number, row in enumerate(values[1:], start=first_row):
+                if id_col < len(row) and id_key(row[id_col]):
+                    entry['rows'].setdefault(id_key(row[id_col]), row_number)
+            entry['last_row'] = max(entry['last_row'], first_row + len(values) - 2)
+            entry['expires'] = time() + ROW_INDEX_TTL
+        return True
+
+    def appended(self, key, record_id, row_number=None):
+        """Eklenen satırı index'e işler (row_number: append yanıtındaki satır)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return
+            row_number = row_number or entry['last_row'] + 1
+            entry['rows'][id_key(record_id)] = row_number
+            entry['last_row'] = max(entry['last_row'], row_number)
+
+    def deleted(self, key, row_number, count=1):
+        """Silinen satır(lar)ı index'ten çıkarır, alttaki satırları yukarı kaydırır"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return
+            end = row_number + count
+            entry['rows'] = {
+                record_id: (row if row < row_number else row - count)
+                for record_id, row in entry['rows'].items()
+                if not row_number <= row < end
+            }
+            entry['last_row'] -= count
+
+    def drop(self, spreadsheet_id, title=None):
+        """Tek worksheet'in (title verilirse) veya tüm spreadsheet'in index'ini atar"""
+        with self._lock:
+            for key in [key for key in self._data
+                        if key[0] == spreadsheet_id and (title is None or key[1] == title)]:
+                del self._data[key]
+
+
+class PendingWrites:
+    """
+    Arka plan kuyruğunda bekleyen (henüz Sheets'e yazılmamış) mutasyonlar
+    Okumalarda cache'teki değerlerin üstüne sırayla uygulanır; sayfa yazma
+    bitmesini beklemeden güncel hâli gösterir.
+    """
+
+    def __init__(self):
+        self._data = {}  # (spreadsheet_id, başlık) -> [(job_id, mutation)]
+        self._lock = threading.Lock()
+
+    def add(self, key, job_id, mutation):
+        with self._lock:
+            self._data.setdefault(key, []).append((job_id, mutation))
+
+    def _remove(self, key, job_id):
+        items = [item for item in self._data.get(key, []) if item[0] != job_id]
+        if items:
+            self._data[key] = items
+        else:
+            self._data.pop(key, None)
+
+    def settle(self, key, job_id, mutation):
+        """Sheets'e yazılan mutasyonu cache'teki kopyaya işler ve bekleyenlerden çıkarır"""
+        with self._lock:
+            if not sheet_cache.patch(key, lambda values: apply_mutation(values, mutation)):
+                # Kopya yok/süresi dolmuş: yazımı içermediği için uzatılmamalı
+                sheet_cache.invalidate(*key)
+            self._remove(key, job_id)
+
+    def discard(self, key, job_id):
+        """Yazılamayan mutasyonu bekleyenlerden çıkarır"""
+        with self._lock:
+            self._remove(key, job_id)
+
+    def apply(self, key, values):
+        with self._lock:
+            mutations = [mutation for _, mutation in self._data.get(key, [])]
+        for mutation in mutations:
+            values = apply_mutation(values, mutation)
+        return values
+
+    def count(self):
+        with self._lock:
+            return sum(len(items) for items in self._data.values())
+
+
+class IdAllocator:
+    """
+    Worksheet başına ID yüksek su işareti (high-water mark)
+    İlk kullanımda sheet'teki en büyük ID'den başlar, sonra her yeni ID bellekte
+    kilit altında artırılır: aynı süreçteki oturumlar aynı ID'yi alamaz.
+    Sheet her okunduğunda işaret okunan en büyük ID'ye yükseltilir (asla düşmez),
+    böylece başka yerden eklenen satırlar da hesaba katılır.
+    """
+
+    def __init__(self):
+        self._marks = {}
+        self._lock = threading.Lock()
+
+    def known(self, key):
+        with self._lock:
+            return key in self._marks
+
+    def observe(self, key, max_id):
+        with self._lock:
+            self._marks[key] = max(self._marks.get(key, 0), max_id)
+
+    def allocate(self, key):
+        with self._lock:
+            self._marks[key] = self._marks.get(key, 0) + 1
+            return self._marks[key]
+
+    def drop(self, spreadsheet_id):
+        with self._lock:
+            for key in [key for key in self._marks if key[0] == spreadsheet_id]:
+                del self._marks[key]
+
+
+class ClientPool:
+    """
+    Tenant başına gspread bağlantı havuzu
+    Anahtar: (client_email veya credentials dosyası, spreadsheet id). Aynı hesabın
+    sayfaları ve oturumları tek bağlantıyı paylaşır; farklı hesaplar/spreadsheet'ler
+    birbirinden ayrı tutulur. Havuz sınırlıdır: en uzun süredir kullanılmayan
+    bağlantı atılır, CLIENT_IDLE_TTL boyunca kullanılmayanlar da kendiliğinden düşer.
+    """
+
+    def __init__(self, max_size=CLIENT_POOL_MAX_SIZE, idle_ttl=CLIENT_IDLE_TTL):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._entries = OrderedDict()  # (tenant, spreadsheet_id) -> bağlantı kaydı
+        self._aliases = {}  # (tenant, spreadsheet adı) -> (tenant, spreadsheet_id)
+        self._open_locks = {}  # (tenant, spreadsheet adı/id) -> {'lock': açma/yenileme kilidi, 'users'}
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.evicted = 0
+        self.refreshed = 0
+
+    def _lookup(self, tenant, name, spreadsheet_id, now):
+        """Havuzdaki kaydı bulur ve kullanıldı olarak işaretler (self._lock altında çağrılır)"""
+        key = (tenant, spreadsheet_id) if spreadsheet_id else self._aliases.get((tenant, name))
+        entry = self._entries.get(key) if key else None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            entry['last_used'] = now
+        return key, entry
+
+    def get(self, tenant, name=None, spreadsheet_id=None, open_client=None):
+        """
+        Havuzdaki spreadsheet'i döndürür, yoksa open_client() ile yetkilendirip açar
+        Açma ve token yenileme (ağ istekleri) havuz kilidi dışında, hedef başına ayrı
+        kilitle yapılır: yavaş bir tenant diğerlerini bekletmez.
+
+        Args:
+            name / spreadsheet_id: spreadsheet adı veya id'si (id öncelikli)
+            open_client: gspread client'ı döndüren fonksiyon (sadece ilk açılışta çağrılır)
+        """
+        with self._lock:
+            now = time()
+            self._evict_idle(now)
+            key, entry = self._lookup(tenant, name, spreadsheet_id, now)
+            # Kilit sadece bekleyen/açan çağrı varken tutulur (her hedef için birikmez)
+            target = (tenant, spreadsheet_id or name)
+            open_lock = self._open_locks.setdefault(target, {'lock': threading.Lock(), 'users': 0})
+            open_lock['users'] += 1
+
+        try:
+            with open_lock['lock']:
+                if entry is None:
+                    # Aynı hedefi bekleyen başka bir çağrı açmış olabilir
+                    with self._lock:
+                        key, entry = self._lookup(tenant, name, spreadsheet_id, time())
+                if entry is None:
+                    client = open_client()
+                    spreadsheet = client.open_by_key(spreadsheet_id) if spreadsheet_id else client.open(name)
+                    key = (tenant, spreadsheet.id)
+                    entry = {'spreadsheet': spreadsheet, 'name': name or spreadsheet.title,
+                             'opened_at': time(), 'last_used': time()}
+                    with self._lock:
+                        self._entries[key] = entry
+                        self.opened += 1
+                        while len(self._entries) > self.max_size:
+                            self._remove(next(iter(self._entries)))
+                if name:
+                    with self._lock:
+                        self._aliases[(tenant, name)] = key
+                try:
+                    self._refresh_token(entry['spreadsheet'])
+                except Exception:
+                    with self._lock:
+                        self._remove(key, evicted=False)  # Yenilenemeyen bağlantı bir sonraki çağrıda baştan açılır
+                    raise
+                return entry['spreadsheet']
+        finally:
+            with self._lock:
+                open_lock['users'] -= 1
+                if not open_lock['users']:
+                    del self._open_locks[target]
+
+    def _refresh_token(self, spreadsheet):
+        """Erişim token'ı yoksa veya TOKEN_REFRESH_MARGIN içinde dolacaksa yeniler"""
+        auth = getattr(spreadsheet.client, 'auth', None)
+        if auth is None or not hasattr(auth, 'refresh'):
+            return
+        expiry = getattr(auth, 'expiry', None)  # google-auth: naive UTC
+        if auth.token and (expiry is None or expiry - datetime.utcnow() > timedelta(seconds=TOKEN_REFRESH_MARGIN)):
+            return
+        from google.auth.transport.requests import Request
+        auth.refresh(Request())
+        with self._lock:
+            self.refreshed += 1
+
+    def _remove(self, key, evicted=True):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            worksheet_registry.drop(entry['spreadsheet'])
+        for alias in [alias for alias, target in self._aliases.items() if target == key]:
+            del self._aliases[alias]
+        if evicted:
+            self.evicted += 1
+
+    def _evict_idle(self, now):
+        for key in [key for key, entry in self._entries.items() if now - entry['last_used'] > self.idle_ttl]:
+            self._remove(key)
+
+    def stats(self):
+        """Havuz özeti ve tenant başına istek metrikleri (sheets_quota.QuotaHTTPClient.metrics)"""
+        with self._lock:
+            now = time()
+            tenants = [
+                {
+                    'tenant': tenant,
+                    'spreadsheet': entry['name'],
+                    'idle': round(now - entry['last_used']),
+                    **getattr(entry['spreadsheet'].client, 'metrics', {})
+                }
+                for (tenant, _), entry in self._entries.items()
+            ]
+            return {
+                'size': len(self._entries),
+                'opened': self.opened,
+                'evicted': self.evicted,
+                'refreshed': self.refreshed,
+                'tenants': tenants
+            }
+
+
+class ChangeTracker:
+    """
+    Spreadsheet başına son bilinen Drive modifiedTime'ı
+    Kontrol tek Drive metadata isteğidir (Sheets okuma kotasına girmez) ve
+    spreadsheet başına en fazla CHANGE_CHECK_INTERVAL saniyede bir yapılır.
+    Bu süreçteki yazımlar local_write() ile işaretlenir: onların değiştirdiği
+    modifiedTime dış düzenleme sayılmaz. Yine de son yazımdan önce okunan kopyalar
+    uzatılmaz ('since' en az son yazım zamanıdır); yazımı işlenmiş kopyalar
+    patch ile güncel tutulur, işlenemeyenler bir sonraki okumada yenilenir.
+    """
+
+    def __init__(self, interval=CHANGE_CHECK_INTERVAL):
+        self.interval = interval
+        self._data = {}  # spreadsheet_id -> {'modified', 'checked_at', 'since', 'local_write'}
+        self._writes = {}  # spreadsheet_id -> son yerel yazım zamanı (time())
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.changes = 0
+
+    def local_write(self, spreadsheet_id):
+        with self._lock:
+            self._writes[spreadsheet_id] = time()
+            entry = self._data.get(spreadsheet_id)
+            if entry is not None:
+                entry['local_write'] = True
+
+    def check(self, spreadsheet):
+        """
+        Spreadsheet'in modifiedTime'ını (gerekirse) sorar
+
+        Returns:
+            {'changed': dış düzenleme görüldü mü, 'since': bu zamandan (time()) sonra
+            okunan kopyalar hâlâ güncel}; Drive isteği başarısızsa None
+        """
+        with self._lock:
+            entry = self._data.get(spreadsheet.id)
+            if entry is not None and time() - entry['checked_at'] < self.interval:
+                return {'changed': False, 'since': max(entry['since'], self._writes.get(spreadsheet.id, 0))}
+        try:
+            modified = spreadsheet.get_lastUpdateTime()
+        except Exception as e:
+            print(f"⚠️ Değişiklik kontrolü yapılamadı: {str(e)[:100]}")
+            return None
+        with self._lock:
+            self.checks += 1
+            now = time()
+            entry = self._data.get(spreadsheet.id)
+            changed = entry is not None and modified != entry['modified'] and not entry['local_write']
+            # İlk kontrol veya dış düzenleme: bundan önce okunan kopyalara güvenilmez
+            since = now if entry is None or changed else entry['since']
+            self._data[spreadsheet.id] = {'modified': modified, 'checked_at': now,
+                                          'since': since, 'local_write': False}
+            self.changes += changed
+            return {'changed': changed, 'since': max(since, self._writes.get(spreadsheet.id, 0))}
+
+
+class WorksheetRegistry:
+    """
+    Tenant ve spreadsheet başına worksheet handle'ları ve metadata'sı
+    Tüm worksheet'ler tek spreadsheet.worksheets() isteğiyle alınır; listede olmayan
+    başlık istendiğinde, sheet eklendiğinde veya WORKSHEET_META_TTL dolduğunda yenilenir.
+    Handle'lar onları yükleyen client'a bağlıdır: anahtar (tenant, spreadsheet_id) ve
+    kayıt sadece aynı Spreadsheet nesnesi için kullanılır (havuzdan yeniden açılan
+    bağlantı kendi handle'larını yükler, istekler doğru tenant'ın kotasına sayılır).
+    """
+
+    def __init__(self, ttl=WORKSHEET_META_TTL):
+        self.ttl = ttl
+        self._data = {}  # (tenant, spreadsheet_id) -> {'spreadsheet', 'handles': {başlık: Worksheet}, 'expires'}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    @staticmethod
+    def _key(spreadsheet):
+        return (getattr(spreadsheet.client, 'tenant', None), spreadsheet.id)
+
+    def _load(self, spreadsheet):
+        handles = {worksheet.title: worksheet for worksheet in spreadsheet.worksheets()}
+        entry = {'spreadsheet': spreadsheet, 'handles': handles, 'expires': time() + self.ttl}
+        with self._lock:
+            self._data[self._key(spreadsheet)] = entry
+            self.loads += 1
+        return entry
+
+    def get(self, spreadsheet, title):
+        """title'ın Worksheet handle'ı; yoksa gspread.exceptions.WorksheetNotFound"""
+        with self._lock:
+            entry = self._data.get(self._key(spreadsheet))
+        if (entry is None or entry['spreadsheet'] is not spreadsheet
+                or time() >= entry['expires'] or title not in entry['handles']):
+            entry = self._load(spreadsheet)
+        if title not in entry['handles']:
+            raise WorksheetNotFound(title)
+        return entry['handles'][title]
+
+    def info(self, spreadsheet, title):
+        """{'id', 'title', 'index', 'rows', 'cols'}: metadata'daki (son yüklemedeki) hâli"""
+        worksheet = self.get(spreadsheet, title)
+        return {
+            'id': worksheet.id,
+            'title': worksheet.title,
+            'index': worksheet.index,
+            'rows': worksheet.row_count,
+            'cols': worksheet.col_count
+        }
+
+    def invalidate(self, spreadsheet_id):
+        """Spreadsheet'in tüm tenant'lardaki handle'larını atar (sheet eklendi/silindi)"""
+        with self._lock:
+            for key in [key for key in self._data if key[1] == spreadsheet_id]:
+                del self._data[key]
+
+    def drop(self, spreadsheet):
+        """Bu Spreadsheet nesnesinin (havuzdan atılan bağlantının) handle'larını atar"""
+        with self._lock:
+            for key in [key for key, entry in self._data.items() if entry['spreadsheet'] is spreadsheet]:
+                del self._data[key]
+
+
+# Süreç genelinde tek cache (tüm rerun'lar, sayfalar ve oturumlar paylaşır)
+sheet_cache = SheetCache()
+row_index = RowIndex()
+pending_writes = PendingWrites()
+id_allocator = IdAllocator()
+worksheet_registry = WorksheetRegistry()
+change_tracker = ChangeTracker()
+
+# Kuyruk okuması: son tam okuma zamanı ve sayaçlar
+tail_loads = {}  # (spreadsheet_id, başlık) -> time()
+tail_stats = {'reads': 0, 'rows': 0, 'fallbacks': 0}
+
+# load_frames: (spreadsheet_id, başlık) -> (kaynak değer listesi, DataFrame)
+frame_cache = {}
+frame_lock = threading.Lock()
+
+client_pool = ClientPool()
+
+# ensure_sheets: şeması doğrulanmış spreadsheet id'leri (oturumlar arası)
+verified_spreadsheets = set()
+schema_lock = threading.Lock()
+
+
+# ==============================
+# BAĞLANTI
+# ==============================
+
+def get_spreadsheet(creds_data, name=SPREADSHEET_NAME, spreadsheet_id=None):
+    """
+    Credentials dict'i ile spreadsheet'i açar
+    Aynı service account + spreadsheet için bağlantı havuzdan tekrar kullanılır
+    (her sayfada yeniden yetkilendirme yapılmaz).
+
+    Args:
+        spreadsheet_id: verilirse ad yerine id ile açılır
+    """
+    return client_pool.get(
+        creds_data.get('client_email'), name, spreadsheet_id,
+        lambda: authorize(ServiceAccountCredentials.from_json_keyfile_dict(creds_data, SCOPE))
+    )
+
+
+def open_spreadsheet_from_file(path="credentials.json", name=SPREADSHEET_NAME):
+    """Script'ler ve eski uygulama için: credentials.json dosyasıyla spreadsheet'i açar (havuzdan)"""
+    return client_pool.get(
+        os.path.abspath(path), name, None,
+        lambda: authorize(ServiceAccountCredentials.from_json_keyfile_name(path, SCOPE))
+    )
+
+
+# ==============================
+# ŞEMA KURULUMU
+# ==============================
+
+def ensure_sheets(spreadsheet, titles=None, rows=100):
+    """
+    Eksik worksheet'leri başlık satırlarıyla oluşturur
+    - Mevcut sheet'ler tek metadata isteğiyle öğrenilir
+    - Eksiklerin hepsi (addSheet + başlık için updateCells) tek batchUpdate ile eklenir
+    - Sonuç süreç genelinde hatırlanır: aynı spreadsheet için sonraki çağrılar istek atmaz
+
+    Args:
+        titles: kontrol edilecek sheet'ler (None: şema kaydındakilerin hepsi)
+
+    Returns:
+        (oluşturulan başlıklar, zaten var olan başlıklar); doğrulanmışsa ([], titles)
+    """
+    titles = list(SHEET_SCHEMAS if titles is None else titles)
+    with schema_lock:
+        if spreadsheet.id in verified_spreadsheets:
+            return [], titles
+
+        metadata = spreadsheet.fetch_sheet_metadata(params={'fields': 'sheets.properties(sheetId,title)'})
+        properties = [sheet['properties'] for sheet in metadata.get('sheets', [])]
+        existing = {prop['title'] for prop in properties}
+        missing = [title for title in titles if title not in existing]
+
+        requests = []
+        next_sheet_id = max([prop['sheetId'] for prop in properties] + [0]) + 1
+        for sheet_id, title in enumerate(missing, start=next_sheet_id):
+            headers = sheet_headers(title)
+            requests.append({'addSheet': {'properties': {
+                'sheetId': sheet_id,
+                'title': title,
+                'gridProperties': {'rowCount': rows, 'columnCount': len(headers)}
+            }}})
+            requests.append({'updateCells': {
+                'start': {'sheetId': sheet_id, 'rowIndex': 0, 'columnIndex': 0},
+                'rows': [{'values': [{'userEnteredValue': {'stringValue': header}} for header in headers]}],
+                'fields': 'userEnteredValue'
+            }})
+        if requests:
+            spreadsheet.batch_update({'requests': requests})
+            change_tracker.local_write(spreadsheet.id)
+            worksheet_registry.invalidate(spreadsheet.id)
+            for title in missing:
+                sheet_cache.invalidate(spreadsheet.id, title)
+                row_index.drop(spreadsheet.id, title)
+
+        verified_spreadsheets.add(spreadsheet.id)
+        return missing, [title for title in titles if title in existing]
+
+
+# ==============================
+# OKUMA (read-through cache)
+# ==============================
+
+def get_worksheet(spreadsheet, title):
+    """
+    spreadsheet.worksheet(title) yerine: handle metadata cache'inden gelir,
+    her çağrıda HTTP isteği atılmaz (bkz. WorksheetRegistry)
+    """
+    return worksheet_registry.get(spreadsheet, title)
+
+
+def worksheet_info(spreadsheet, title):
+    """Worksheet'in sheet id'si, satır/kolon sayısı ve başlık satırı (index/cache'ten)"""
+    info = worksheet_registry.info(spreadsheet, title)
+    info['header'] = get_header(worksheet_registry.get(spreadsheet, title))
+    return info
+
+
+def sheet_key(worksheet):
+    """Cache anahtarı: (spreadsheet_id, worksheet başlığı)"""
+    spreadsheet_id = getattr(worksheet, 'spreadsheet_id', None) or worksheet.spreadsheet.id
+    return (spreadsheet_id, worksheet.title)
+
+
+def revalidate(spreadsheet):
+    """
+    Süresi dolan cache kayıtlarını değişiklik kontrolüyle doğrular
+    - Drive modifiedTime değişmemişse kayıtlar uzatılır (yeniden indirilmez)
+    - Dışarıdan düzenlenmişse spreadsheet'in cache'i ve ID index'leri atılır
+
+    Returns:
+        True: süresi dolan kayıtlar hâlâ geçerli
+    """
+    state = change_tracker.check(spreadsheet)
+    if state is None:
+        return False
+    if state['changed']:
+        # Dış düzenleme satır eklemekle sınırlı olmayabilir: kuyruk okuması yerine tam okuma
+        sheet_cache.invalidate(spreadsheet.id)
+        row_index.drop(spreadsheet.id)
+        return False
+    return sheet_cache.extend(
+        spreadsheet.id, state['since'],
+        lambda title: SHEET_TTLS.get(title.split('!', 1)[0], SHEET_CACHE_TTL)
+    ) > 0
+
+
+def get_values(worksheet, ttl=None, refresh=False, pending=True):
+    """
+    Worksheet'in tüm değerlerini döndürür (cache'li)
+
+    Args:
+        ttl: cache süresi (None: SHEET_TTLS veya SHEET_CACHE_TTL)
+        refresh: True ise cache atlanır, sheet'ten okunup cache yenilenir
+        pending: True ise kuyrukta bekleyen yazımlar da uygulanır
+            (False: sheet'teki hâli, satır numaraları ID index'iyle uyumlu)
+
+    Not: dönen liste cache ile paylaşılır, değiştirmeyin.
+    """
+    key = sheet_key(worksheet)
+    values = None if refresh else sheet_cache.get(key)
+    if values is None and not refresh and sheet_cache.expired(key) and revalidate(worksheet.spreadsheet):
+        values = sheet_cache.get(key)
+    if values is None:
+        tail = None if refresh else _tail_request(key)
+        if tail is not None:
+            response = worksheet.spreadsheet.values_batch_get(tail[1], params=_batch_params())
+            values = _merge_tail(key, tail[0], response.get('valueRanges', []))
+            if values is not None:
+                _store_tail(key, tail[0], values, ttl)
+        if values is None:
+            values = worksheet.get_all_values(**READ_OPTIONS)
+            tail_loads[key] = time()
+            _store(key, values, ttl)
+    return pending_writes.apply(key, values) if pending else values
+
+
+def decode_dates(values, title=None):
+    """
+    Şemadaki tarih kolonlarında seri numaralarını metne çevirir (yerinde)
+    title şema kaydında varsa o sheet'in tipleri, yoksa kolon adına göre COLUMN_TYPES kullanılır.
+    """
+    if not values:
+        return values
+    types = column_types(title) or COLUMN_TYPES
+    columns = [(i, DATE_FORMATS[types[header]]) for i, header in enumerate(values[0])
+               if types.get(header) in DATE_FORMATS]
+    for row in values[1:] if columns else ():
+        for i, fmt in columns:
+            if i < len(row) and isinstance(row[i], (int, float)) and not isinstance(row[i], bool):
+                row[i] = (SERIAL_EPOCH + timedelta(seconds=round(row[i] * 86400))).strftime(fmt)
+    return values
+
+
+def _store(key, values, ttl=None):
+    """Okunan değerleri cache'e yazar, tam sheet ise ID index'ini yeniden kurar"""
+    decode_dates(values, key[1].split('!', 1)[0])
+    sheet_cache.set(key, values, SHEET_TTLS.get(key[1], SHEET_CACHE_TTL) if ttl is None else ttl)
+    if '!' not in key[1]:
+        row_index.build(key, values)
+    if values and 'ID' in values[0]:
+        id_allocator.observe((key[0], key[1].split('!', 1)[0]), max_id(values))
+
+
+def _store_tail(key, previous, values, ttl=None):
+    """
+    Kuyruk okumasıyla tamamlanan değerleri cache'e yazar
+    Tarihler _merge_tail'de sadece yeni satırlarda çözülmüştür; ID index'i ve ID
+    işareti de sadece eklenen satırlarla güncellenir (önceki satırlar yeniden taranmaz).
+    """
+    sheet_cache.set(key, values, SHEET_TTLS.get(key[1], SHEET_CACHE_TTL) if ttl is None else ttl)
+    added = [values[0]] + values[len(previous):]
+    if not row_index.extend(key, added, len(previous) + 1):
+        row_index.build(key, values)
+    if 'ID' in values[0]:
+        id_allocator.observe(key, max_id(added) if id_allocator.known(key) else max_id(values))
+
+
+def _sheet_range(title):
+    """Worksheet başlığını A1 aralığına çevirir ('Kendime_Notlar', 'asset_history'!A1:C)"""
+    if '!' in title:
+        name, cells = title.split('!', 1)
+        return f"'{name}'!{cells}"
+    return f"'{title}'"
+
+
+def _batch_params():
+    return {'valueRenderOption': READ_OPTIONS['value_render_option'],
+            'dateTimeRenderOption': READ_OPTIONS['date_time_render_option']}
+
+
+def _tail_request(key):
+    """
+    Kuyruk okuması yapılabiliyorsa (önceki değerler, [başlık aralığı, kuyruk aralığı])
+    Sadece APPEND_ONLY_SHEETS, cache'te (süresi dolmuş da olsa) kopyası olan ve son
+    TAIL_FULL_RELOAD içinde tam okunmuş sheet'ler için; aksi halde None.
+    """
+    title = key[1]
+    previous = sheet_cache.peek(key) if title in APPEND_ONLY_SHEETS else None
+    if not previous or len(previous) < 2 or time() - tail_loads.get(key, 0) > TAIL_FULL_RELOAD:
+        return None
+    last_col = re.sub(r'\d', '', rowcol_to_a1(1, len(previous[0])))
+    # Son bilinen satır da istenir: yerinde durduğu doğrulanır (üstten silme olmamış)
+    return previous, [f"'{title}'!A1:{last_col}1", f"'{title}'!A{len(previous)}:{last_col}"]
+
+
+def _merge_tail(key, previous, value_ranges):
+    """
+    Kuyruk okumasını önceki değerlere ekler
+    Başlık değiştiyse veya son bilinen satır yerinde değilse (silme/taşıma) None: tam okuma gerekir
+    """
+    if len(value_ranges) < 2:
+        return None
+    width = len(previous[0])
+    header = value_ranges[0].get('values', [[]])[0]
+    rows = fill_gaps(value_ranges[1].get('values', []), cols=width) if value_ranges[1].get('values') else []
+    decode_dates([header] + rows, key[1])
+    if header + [''] * (width - len(header)) != previous[0] or not rows or rows[0] != previous[-1]:
+        tail_stats['fallbacks'] += 1
+        return None
+    tail_stats['reads'] += 1
+    tail_stats['rows'] += len(rows) - 1
+    return previous + rows[1:]  # Önceki satır nesneleri korunur (load_frames sadece yenileri parse eder)
+
+
+def load_sheets(spreadsheet, titles, ttl=None, refresh=False):
+    """
+    Bir sayfanın ihtiyaç duyduğu worksheet'leri tek values_batch_get çağrısıyla okur
+    Cache'te geçerli olanlar istenmez; hepsi cache'teyse hiç istek atılmaz.
+
+    Args:
+        titles: worksheet başlıkları
+        refresh: True ise hepsi sheet'ten yeniden okunur
+
+    Returns:
+        {başlık: get_all_values() biçiminde satırlar}
+    """
+    result = {}
+    missing = []
+    if not refresh and any(sheet_cache.expired((spreadsheet.id, title)) for title in titles):
+        revalidate(spreadsheet)
+    for title in dict.fromkeys(titles):
+        values = None if refresh else sheet_cache.get((spreadsheet.id, title))
+        if values is None:
+            missing.append(title)
+        else:
+            result[title] = values
+
+    if missing:
+        # Ekleme yapılan sheet'lerden sadece yeni satırlar, diğerleri tamamen (hepsi tek istekte)
+        tails = {} if refresh else {title: _tail_request((spreadsheet.id, title)) for title in missing}
+        ranges = []
+        for title in missing:
+            ranges.extend(tails[title][1] if tails.get(title) else [_sheet_range(title)])
+        value_ranges = spreadsheet.values_batch_get(ranges, params=_batch_params()).get('valueRanges', [])
+
+        full = []
+        position = 0
+        for title in missing:
+            key = (spreadsheet.id, title)
+            if tails.get(title):
+                values = _merge_tail(key, tails[title][0], value_ranges[position:position + 2])
+                position += 2
+                if values is None:
+                    full.append(title)
+                    continue
+                _store_tail(key, tails[title][0], values, ttl)
+            else:
+                # get_all_values() ile aynı biçim: dikdörtgen, boş hücreler ''
+                values = value_ranges[position].get('values', []) if position < len(value_ranges) else []
+                values = fill_gaps(values) if values else []
+                position += 1
+                tail_loads[key] = time()
+                _store(key, values, ttl)
+            result[title] = values
+
+        if full:
+            # Kuyruğu doğrulanamayanlar (silme/yapı değişikliği) tam okunur
+            for title, values in load_sheets(spreadsheet, full, ttl=ttl, refresh=True).items():
+                result[title] = sheet_cache.peek((spreadsheet.id, title))
+
+    return {title: pending_writes.apply((spreadsheet.id, title), values) for title, values in result.items()}
+
+
+def load_records(spreadsheet, titles, numeric_columns=(), ttl=None, refresh=False):
+    """load_sheets + values_to_records: {başlık: dict listesi}"""
+    return {
+        title: values_to_records(values, numeric_columns)
+        for title, values in load_sheets(spreadsheet, titles, ttl=ttl, refresh=refresh).items()
+    }
+
+
+def _appended_to(old, new):
+    """new, old'un satır nesnelerini aynen koruyup sona satır eklenmiş hâli mi"""
+    return len(new) > len(old) > 0 and all(a is b for a, b in zip(old, new))
+
+
+def load_frames(spreadsheet, titles, ttl=None, refresh=False):
+    """
+    load_sheets + sheets_schema.to_frame: {başlık: şemaya göre tiplenmiş DataFrame}
+    Aynı değerler için DataFrame bir kez kurulur (cache'teki liste değişmedikçe
+    rerun'larda yeniden parse edilmez).
+
+    Not: dönen DataFrame'ler paylaşılır, değiştirmeden önce .copy() alın.
+    """
+    frames = {}
+    for title, values in load_sheets(spreadsheet, titles, ttl=ttl, refresh=refresh).items():
+        key = (spreadsheet.id, title)
+        with frame_lock:
+            entry = frame_cache.get(key)
+        if entry is not None and entry[0] is not values and _appended_to(entry[0], values):
+            # Sadece sona satır eklenmiş (kuyruk okuması): yeni satırlar parse edilip eklenir
+            added = to_frame([values[0]] + values[len(entry[0]):], title.split('!', 1)[0])
+            frame = pd.concat([entry[1], added], ignore_index=True) if not added.empty else entry[1]
+            entry = (values, frame)
+            with frame_lock:
+                frame_cache[key] = entry
+        elif entry is None or entry[0] is not values:
+            entry = (values, to_frame(values, title.split('!', 1)[0]))
+            with frame_lock:
+                frame_cache[key] = entry
+        frames[title] = entry[1]
+    return frames
+
+
+def parse_turkish_decimal(value):
+    """
+    Parse Turkish decimal format (comma as decimal separator) to float.
+    Okumalar UNFORMATTED_VALUE olduğundan sayı hücreleri zaten int/float gelir;
+    sadece metin olarak kaydedilmiş eski değerler ("16,23") burada çözülür.
+    """
+    if value is None or value == '':
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = value.strip().replace(' TL', '').replace('TL', '').strip()
+        value = value.replace(',', '.')
+        try:
+            return float(value)
+        except ValueError:
+            return 0.0
+    return 0.0
+
+
+def cell_text(value):
+    """Hücre değerini metne çevirir (float'lar kısa gösterimle: 16.23, 100)"""
+    if isinstance(value, float):
+        return format(value, '.12g')
+    return str(value)
+
+
+def values_to_records(values, numeric_columns=()):
+    """
+    get_all_values() çıktısını dict listesine çevirir
+    - Boş satırlar atlanır
+    - ID int'e çevrilir (geçersizse 0)
+    - numeric_columns float'a çevrilir (sayı hücreleri doğrudan), kalanlar string
+    """
+    if not values or len(values) < 2:
+        return []
+
+    headers = values[0]
+    records = []
+    for row in values[1:]:
+        if not any(row):
+            continue
+
+        record = {}
+        for i, header in enumerate(headers):
+            value = row[i] if i < len(row) else ''
+            if header in numeric_columns:
+                record[header] = parse_turkish_decimal(value)
+            elif header == 'ID':
+                try:
+                    record[header] = int(id_key(value)) if value != '' else 0
+                except ValueError:
+                    record[header] = 0
+            else:
+                record[header] = cell_text(value)
+        records.append(record)
+
+    return records
+
+
+def get_records(worksheet, numeric_columns=(), ttl=None, refresh=False):
+    """Worksheet'i dict listesi olarak döndürür (cache'li, bkz. values_to_records)"""
+    return values_to_records(get_values(worksheet, ttl=ttl, refresh=refresh), numeric_columns)
+
+
+# ==============================
+# ID -> SATIR
+# ==============================
+
+def _index_entry(worksheet):
+    key = sheet_key(worksheet)
+    entry = row_index.get(key)
+    if entry is None:
+        get_values(worksheet)  # Cache'te yoksa okur ve index'i kurar
+        entry = row_index.get(key)
+    return entry
+
+
+def get_header(worksheet):
+    """Worksheet'in başlık satırı (index'ten, istek atmadan)"""
+    entry = _index_entry(worksheet)
+    return entry['header'] if entry else get_values(worksheet)[0]
+
+
+def find_row(worksheet, record_id):
+    """ID'nin sheet'teki satır numarası (1 tabanlı, başlık 1. satır), yoksa None"""
+    entry = _index_entry(worksheet)
+    if entry is None:
+        return None
+    return entry['rows'].get(id_key(record_id))
+
+
+def _verified_row(worksheet, record_id):
+    """
+    Yazmadan önce find_row'un satırını doğrular: satırın ID hücresi sheet'ten okunur
+    (tek hücre isteği). Index eskiyse (sheet dışarıdan değişmiş) index atılır,
+    sheet yeniden okunup satır tekrar bulunur. Yoksa None.
+    """
+    row_number = find_row(worksheet, record_id)
+    header = get_header(worksheet)
+    if row_number is None or 'ID' not in header:
+        return row_number
+    cell = worksheet.cell(row_number, header.index('ID') + 1,
+                          value_render_option=ValueRenderOption.unformatted)
+    if cell.value is not None and id_key(cell.value) == id_key(record_id):
+        return row_number
+    row_index.drop(*sheet_key(worksheet))
+    get_values(worksheet, refresh=True, pending=False)
+    return find_row(worksheet, record_id)
+
+
+def get_row(worksheet, record_id):
+    """
+    (satır numarası, satır değerleri) döndürür, yoksa (None, None)
+    Satır numarası sheet'teki ID hücresiyle doğrulanır (bkz. _verified_row): dönen
+    numaraya doğrudan yazılabilir. Satır değerleri cache'teki son okumadan gelir.
+    """
+    row_number = _verified_row(worksheet, record_id)
+    values = get_values(worksheet, pending=False)
+    if row_number is None or row_number - 1 >= len(values):
+        return None, None
+    row = values[row_number - 1]
+    header = values[0]
+    # Cache ile index ayrışmışsa (araya yazma girdiyse) sheet'ten tekrar oku
+    if 'ID' in header and id_key(row[header.index('ID')]) != id_key(record_id):
+        values = get_values(worksheet, refresh=True, pending=False)
+        row_number = find_row(worksheet, record_id)
+        if row_number is None:
+            return None, None
+        row = values[row_number - 1]
+    return row_number, row
+
+
+def max_id(values):
+    """get_all_values() biçimindeki satırlarda en büyük sayısal ID (yoksa 0)"""
+    if not values or 'ID' not in values[0]:
+        return 0
+    id_col = values[0].index('ID')
+    ids = [row[id_col] for row in values[1:] if id_col < len(row)]
+    return max((int(key) for key in map(id_key, ids) if key.isdigit()), default=0)
+
+
+def next_id(worksheet):
+    """
+    Worksheet için bir sonraki ID (tüm sheet indirilmeden)
+    İşaret yoksa cache'teki değerlerden, cache de yoksa sadece ID kolonundan kurulur.
+    """
+    key = sheet_key(worksheet)
+    if not id_allocator.known(key):
+        values = sheet_cache.get(key)
+        if values is None:
+            column = worksheet.col_values(1, value_render_option=ValueRenderOption.unformatted)  # ID: A kolonu
+            values = [[value] for value in column] if column[:1] == ['ID'] else get_values(worksheet)
+        id_allocator.observe(key, max_id(pending_writes.apply(key, values)))
+    return id_allocator.allocate(key)
+
+
+def find_record(worksheet, record_id):
+    """ID'li satırı {kolon: değer} olarak döndürür (bekleyen yazımlar dahil), yoksa None"""
+    values = get_values(worksheet)
+    if not values or 'ID' not in values[0]:
+        return None
+    header = values[0]
+    id_col = header.index('ID')
+    for row in values[1:]:
+        if id_col < len(row) and id_key(row[id_col]) == id_key(record_id):
+            return dict(zip(header, list(row) + [''] * (len(header) - len(row))))
+    return None
+
+
+def _index_append(worksheet, row, response):
+    """append_row yanıtındaki satır numarasını ID index'ine işler"""
+    key = sheet_key(worksheet)
+    entry = row_index.get(key)
+    if entry is not None and 'ID' in entry['header']:
+        row_number = None
+        updated_range = (response or {}).get('updates', {}).get('updatedRange', '')
+        match = re.search(r'![A-Z]+(\d+)', updated_range)
+        if match:
+            row_number = int(match.group(1))
+        row_index.appended(key, row[entry['header'].index('ID')], row_number)
+
+
+def append_record(worksheet, row):
+    """Satırı sona ekler, ID index'ini günceller ve cache'i temizler"""
+    response = worksheet.append_row(row)
+    _index_append(worksheet, row, response)
+    key = sheet_key(worksheet)
+    if key[1] in APPEND_ONLY_SHEETS:
+        # Cache atılmaz: bir sonraki okuma sadece eklenen satırı getirir
+        change_tracker.local_write(key[0])
+        sheet_cache.expire(key[0], {key[1]})
+    else:
+        invalidate(worksheet)
+    return response
+
+
+def delete_record(worksheet, record_id):
+    """ID'li satırı siler (tam sheet taraması olmadan), bulunamazsa False"""
+    row_number = _verified_row(worksheet, record_id)
+    if row_number is None:
+        return False
+    worksheet.delete_rows(row_number)
+    row_index.deleted(sheet_key(worksheet), row_number)
+    invalidate(worksheet)
+    return True
+
+
+def row_ranges(row_numbers):
+    """Satır numaralarını ardışık (başlangıç, bitiş) aralıklarına birleştirir: [2,3,4,7] -> [(2,4), (7,7)]"""
+    ranges = []
+    for row_number in sorted(set(row_numbers)):
+        if ranges and row_number == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], row_number)
+        else:
+            ranges.append((row_number, row_number))
+    return ranges
+
+
+def delete_rows_bulk(worksheet, row_numbers):
+    """
+    Satırları tek batchUpdate isteğiyle siler (ardışık satırlar tek deleteDimension aralığı)
+    row_numbers get_values(..., pending=False) satır numaralarıdır (1 tabanlı, başlık 1. satır).
+    ID index'i ve cache'teki kopya aynı adımda güncellenir, sheet yeniden indirilmez.
+
+    Returns:
+        Silinen satır sayısı
+    """
+    ranges = row_ranges(row_numbers)
+    if not ranges:
+        return 0
+
+    # Alttan üste: her silme yalnızca kendi altındaki satırları kaydırır
+    requests = [
+        {'deleteDimension': {'range': {
+            'sheetId': worksheet.id,
+            'dimension': 'ROWS',
+            'startIndex': start - 1,
+            'endIndex': end
+        }}}
+        for start, end in reversed(ranges)
+    ]
+    worksheet.spreadsheet.batch_update({'requests': requests})
+
+    key = sheet_key(worksheet)
+    change_tracker.local_write(key[0])
+    for start, end in reversed(ranges):
+        row_index.deleted(key, start, end - start + 1)
+    deleted = {row_number for start, end in ranges for row_number in range(start, end + 1)}
+    if not sheet_cache.patch(key, lambda values: [row for row_number, row in enumerate(values, start=1)
+                                                  if row_number not in deleted]):
+        sheet_cache.invalidate(*key)
+    return len(deleted)
+
+
+# ==============================
+# TOPLU YAZMA
+# ==============================
+
+class WriteBatch:
+    """
+    Bir aksiyondaki hücre/satır yazımlarını toplar ve tek batch_update
+    (values.batchUpdate) isteğiyle gönderir. Yazımların hepsi aynı istekte
+    gider: ya hepsi yazılır ya da hata çağırana tek bir istisna olarak döner.
+
+    Kullanım:
+        with WriteBatch(sheet) as batch:
+            batch.cell(row_idx, status_col, 'CLOSED')
+            batch.cell(row_idx, result_col, 12.5)
+    with bloğu hatasız biterse flush edilir, blok içinde hata olursa hiçbir şey yazılmaz.
+    """
+
+    def __init__(self, worksheet, value_input_option='USER_ENTERED'):
+        self.worksheet = worksheet
+        self.value_input_option = value_input_option  # update_cell ile aynı yorumlama
+        self._data = []
+
+    def cell(self, row, col, value):
+        """Tek hücre yazımı ekler (1 tabanlı satır/kolon)"""
+        self._data.append({'range': rowcol_to_a1(row, col), 'values': [[value]]})
+        return self
+
+    def row(self, row, values, start_col=1):
+        """Satırın start_col'dan başlayan kısmını tek aralık olarak ekler"""
+        start = rowcol_to_a1(row, start_col)
+        end = rowcol_to_a1(row, start_col + len(values) - 1)
+        self._data.append({'range': f'{start}:{end}', 'values': [list(values)]})
+        return self
+
+    def __len__(self):
+        return len(self._data)
+
+    def flush(self, keep_cache=False):
+        """
+        Bekleyen yazımları tek istekte gönderir, cache'i temizler
+
+        Args:
+            keep_cache: True ise cache kaydı atılmaz (çağıran kendisi günceller)
+        Returns:
+            batch_update yanıtı (bekleyen yazım yoksa None)
+        Raises:
+            İstek başarısız olursa gspread hatası; bekleyen yazımların hiçbiri tekrar denenmez
+        """
+        if not self._data:
+            return None
+        data, self._data = self._data, []
+        try:
+            return self.worksheet.batch_update(data, value_input_option=self.value_input_option)
+        finally:
+            change_tracker.local_write(sheet_key(self.worksheet)[0])
+            if not keep_cache:
+                invalidate(self.worksheet)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        else:
+            self._data = []
+        return False
+
+
+# ==============================
+# MUTASYONLAR (yazma kuyruğu)
+# ==============================
+
+def _cell_value(value):
+    return '' if value is None else value
+
+
+def apply_mutation(values, mutation):
+    """
+    Mutasyonu get_all_values() biçimindeki satırlara uygular (yeni liste döner, girdi değişmez)
+    Tekrar uygulamak sonucu değiştirmez (aynı ID'li satır zaten varsa ekleme yapılmaz).
+
+    mutation:
+        {'op': 'append', 'row': [...]}
+        {'op': 'update', 'id': ID, 'cells': {kolon başlığı: değer}}
+        {'op': 'delete', 'id': ID}
+    """
+    op = mutation['op']
+    header = values[0] if values else []
+    id_col = header.index('ID') if 'ID' in header else None
+
+    if op == 'append':
+        row = [_cell_value(value) for value in mutation['row']]
+        if id_col is not None and id_col < len(row):
+            if any(id_col < len(existing) and id_key(existing[id_col]) == id_key(row[id_col])
+                   for existing in values[1:]):
+                return values
+        return list(values) + [row + [''] * (len(header) - len(row))]
+
+    if id_col is None:
+        return values
+    record_id = id_key(mutation['id'])
+    for row_number, row in enumerate(values[1:], start=1):
+        if id_col < len(row) and id_key(row[id_col]) == record_id:
+            result = list(values)
+            if op == 'delete':
+                del result[row_number]
+            else:
+                row = list(row) + [''] * (len(header) - len(row))
+                for column, value in mutation['cells'].items():
+                    if column in header:
+                        row[header.index(column)] = _cell_value(value)
+                result[row_number] = row
+            return result
+    return values
+
+
+def _already_appended(worksheet, row):
+    """Satırın ID'si sheet'te var mı (yanıtı alınamayan önceki ekleme yazılmış olabilir)"""
+    values = get_values(worksheet, refresh=True, pending=False)
+    header = values[0] if values else []
+    return 'ID' in header and find_row(worksheet, row[header.index('ID')]) is not None
+
+
+def write_mutation(worksheet, mutation, retry=False):
+    """
+    Mutasyonu Sheets'e yazar ve ID index'ini günceller (cache'e dokunmaz;
+    kuyruk başarılı yazımı PendingWrites.settle ile cache'e işler)
+    retry: önceki deneme hata verdi; ekleme/silme yapılmış olabileceğinden
+        önce sheet kontrol edilir (satır çoğalmaz, silinmiş satır hata sayılmaz)
+
+    Raises:
+        LookupError: güncellenecek/silinecek ID sheet'te yok
+    """
+    op = mutation['op']
+    if op == 'append':
+        if retry and _already_appended(worksheet, mutation['row']):
+            # Yeniden okunan kopya satırı zaten içeriyor: settle tekrar eklemesin
+            sheet_cache.invalidate(*sheet_key(worksheet))
+            return
+        _index_append(worksheet, mutation['row'], worksheet.append_row(mutation['row']))
+        change_tracker.local_write(sheet_key(worksheet)[0])
+        return
+
+    row_number = _verified_row(worksheet, mutation['id'])
+    if row_number is None and op == 'delete' and retry:
+        return  # Önceki deneme silmiş
+    if row_number is None:
+        raise LookupError(f"{worksheet.title}: ID {mutation['id']} bulunamadı")
+    if op == 'delete':
+        worksheet.delete_rows(row_number)
+        row_index.deleted(sheet_key(worksheet), row_number)
+        change_tracker.local_write(sheet_key(worksheet)[0])
+    else:
+        header = get_header(worksheet)
+        batch = WriteBatch(worksheet)
+        for column, value in mutation['cells'].items():
+            batch.cell(row_number, header.index(column) + 1, value)
+        batch.flush(keep_cache=True)
+
+
+# ==============================
+# YAZMA SONRASI
+# ==============================
+
+def invalidate(worksheet, rows_moved=False):
+    """
+    Yazmadan sonra worksheet'in cache kaydını atar
+    rows_moved: satırlar index dışında silindi/taşındıysa ID index'i de atılır
+    """
+    key = sheet_key(worksheet)
+    change_tracker.local_write(key[0])
+    sheet_cache.invalidate(*key)
+    if rows_moved:
+        row_index.drop(*key)
+
+
+def invalidate_spreadsheet(spreadsheet):
+    """Spreadsheet'in tüm worksheet'lerini (ve ID index'lerini) cache'ten atar (toplu sıfırlama vb.)"""
+    change_tracker.local_write(spreadsheet.id)
+    sheet_cache.invalidate(spreadsheet.id)
+    row_index.drop(spreadsheet.id)
+    id_allocator.drop(spreadsheet.id)
@@ -2,79 +2,24 @@
 Quick verification that decimal parsing is now working correctly
 """
 
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import sys
 import io
+from sheets_utils import NUMERIC_COLUMNS, get_records, open_spreadsheet_from_file
 
 # Fix encoding
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-def parse_turkish_decimal(value):
-    """Parse Turkish decimal format (comma as decimal separator) to float."""
-    if value is None or value == '':
-        return 0.0
-    if isinstance(value, (int, float)):
-        return float(value)
-    if isinstance(value, str):
-        value = value.strip().replace(' TL', '').replace('TL', '').strip()
-        value = value.replace(',', '.')
-        try:
-            return float(value)
-        except ValueError:
-            return 0.0
-    return 0.0
-
-def get_sheet_data_as_dict(worksheet):
-    """Get worksheet data as list of dictionaries with proper Turkish decimal handling."""
-    all_values = worksheet.get_all_values()
-
-    if not all_values or len(all_values) < 2:
-        return []
-
-    headers = all_values[0]
-    records = []
-
-    for row in all_values[1:]:
-        if not any(row):
-            continue
-
-        record = {}
-        for i, header in enumerate(headers):
-            if i < len(row):
-                value = row[i]
-
-                if header in ['amount', 'buy_price', 'manual_price', 'total_value', 'total_debt',
-                              'sell_price', 'profit_loss_percent']:
-                    record[header] = parse_turkish_decimal(value)
-                elif header == 'ID':
-                    try:
-                        record[header] = int(value) if value else 0
-                    except ValueError:
-                        record[header] = 0
-                else:
-                    record[header] = str(value)
-            else:
-                record[header] = ''
-
-        records.append(record)
-
-    return records
-
 def verify():
     """Verify the decimal parsing is working correctly."""
 
     print("🔍 Verifying Turkish decimal parsing fix...\n")
 
     # Connect to Google Sheets
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name("credentials.json", scope)
-    client = gspread.authorize(creds)
-    db = client.open("PKM Database")
+    db = open_spreadsheet_from_file("credentials.json")
 
     # Get assets
     assets_sheet = db.worksheet("assets")
-    assets_data = get_sheet_data_as_dict(assets_sheet)
+    assets_data = get_records(assets_sheet, NUMERIC_COLUMNS)
 
     # Find FONET
     fonet = None
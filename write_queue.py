@@ -0,0 +1,170 @@
+"""
+Arka plan yazma kuyruğu (write-behind)
+Sayfalardaki ekle/kapat/sil işlemleri Sheets'in cevabını beklemez: mutasyon
+bekleyenler listesine girer ve okumalarda cache'in üstüne uygulanır (iyimser
+görünüm). Her tenant (service account) için ayrı bir worker thread mutasyonları
+geliş sırasıyla, hata olursa tekrar deneyerek Sheets'e yazar; bir tenant'ın
+tekrar denemeleri diğerlerinin yazımlarını bekletmez. Durum ve başarısız
+yazımlar da tenant başına tutulur (bir hesabın kayıt bilgileri diğerine görünmez).
+"""
+
+import threading
+import time
+from collections import deque
+from itertools import count
+
+import streamlit as st
+
+from sheets_quota import DEFAULT_TENANT
+from sheets_utils import invalidate, pending_writes, sheet_key, write_mutation
+
+WRITE_RETRIES = 3  # Geçici hatada en fazla bu kadar deneme
+WRITE_RETRY_DELAY = 2  # sn, her denemede iki katına çıkar
+FAILED_KEEP = 20  # Gösterilecek en fazla başarısız yazım
+
+
+class WriteQueue:
+    """
+    Thread-safe FIFO yazma kuyruğu
+    Tenant başına tek worker olduğu için aynı sheet'e giden mutasyonlar sırası bozulmadan yazılır.
+    """
+
+    def __init__(self):
+        self._jobs = {}  # tenant -> deque
+        self._threads = {}  # tenant -> worker thread
+        self._cond = threading.Condition()
+        self._ids = count(1)
+        self._stats = {}  # tenant -> {'failed', 'written', 'retries'}
+
+    def _tenant_stats(self, tenant):
+        """Tenant'ın sayaçları (yoksa oluşturur); self._cond tutulurken çağrılır"""
+        if tenant not in self._stats:
+            self._stats[tenant] = {'failed': deque(maxlen=FAILED_KEEP), 'written': 0, 'retries': 0}
+        return self._stats[tenant]
+
+    def submit(self, worksheet, mutation, label=''):
+        """
+        Mutasyonu kuyruğa ekler; okumalara hemen yansır, yazma arka planda yapılır
+
+        Returns:
+            İş numarası
+        """
+        job = {
+            'id': next(self._ids),
+            'tenant': worksheet_tenant(worksheet),
+            'worksheet': worksheet,
+            'key': sheet_key(worksheet),
+            'mutation': mutation,
+            'label': label or f"{worksheet.title} ({mutation['op']})",
+            'queued_at': time.time()
+        }
+        tenant = job['tenant']
+        with self._cond:
+            pending_writes.add(job['key'], job['id'], mutation)
+            self._jobs.setdefault(tenant, deque()).append(job)
+            thread = self._threads.get(tenant)
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._run, args=(tenant,),
+                                          name=f'sheets-write-queue-{tenant}', daemon=True)
+                self._threads[tenant] = thread
+                thread.start()
+            self._cond.notify_all()
+        return job['id']
+
+    def _run(self, tenant):
+        jobs = self._jobs[tenant]
+        while True:
+            with self._cond:
+                while not jobs:
+                    self._cond.wait()
+                job = jobs[0]
+            self._process(job)
+            with self._cond:
+                jobs.popleft()
+
+    def _process(self, job):
+        delay = WRITE_RETRY_DELAY
+        for attempt in range(1, WRITE_RETRIES + 1):
+            try:
+                write_mutation(job['worksheet'], job['mutation'], retry=attempt > 1)
+                pending_writes.settle(job['key'], job['id'], job['mutation'])
+                with self._cond:
+                    self._tenant_stats(job['tenant'])['written'] += 1
+                return
+            except LookupError as e:
+                error = e  # Kayıt yok: tekrar denemek işe yaramaz
+                break
+            except Exception as e:
+                error = e
+                if attempt < WRITE_RETRIES:
+                    with self._cond:
+                        self._tenant_stats(job['tenant'])['retries'] += 1
+                    time.sleep(delay)
+                    delay *= 2
+
+        # Yazılamadı: iyimser kopya geri alınır, sheet bir sonraki okumada yeniden gelir
+        pending_writes.discard(job['key'], job['id'])
+        invalidate(job['worksheet'], rows_moved=True)
+        with self._cond:
+            self._tenant_stats(job['tenant'])['failed'].append({'label': job['label'], 'error': str(error)[:100], 'at': time.time()})
+        print(f"❌ Sheets'e yazılamadı ({job['label']}): {str(error)[:100]}")
+
+    def status(self, tenant):
+        with self._cond:
+            stats = self._tenant_stats(tenant)
+            return {
+                'pending': len(self._jobs.get(tenant, ())),
+                'failed': list(stats['failed']),
+                'written': stats['written'],
+                'retries': stats['retries']
+            }
+
+    def clear_failed(self, tenant):
+        with self._cond:
+            self._tenant_stats(tenant)['failed'].clear()
+
+
+def worksheet_tenant(worksheet):
+    """Worksheet'in tenant'ı: client'ın service account'u (bilinmiyorsa spreadsheet id)"""
+    return getattr(getattr(worksheet, 'client', None), 'tenant', None) or sheet_key(worksheet)[0]
+
+
+# Süreç genelinde tek kuyruk
+write_queue = WriteQueue()
+
+
+def queue_append(worksheet, row, label=''):
+    """Satır ekleme (append_record'un arka plan karşılığı)"""
+    return write_queue.submit(worksheet, {'op': 'append', 'row': list(row)}, label)
+
+
+def queue_update(worksheet, record_id, cells, label=''):
+    """ID'li satırda {kolon başlığı: değer} hücrelerini günceller"""
+    return write_queue.submit(worksheet, {'op': 'update', 'id': record_id, 'cells': dict(cells)}, label)
+
+
+def queue_delete(worksheet, record_id, label=''):
+    """ID'li satırı siler (delete_record'un arka plan karşılığı)"""
+    return write_queue.submit(worksheet, {'op': 'delete', 'id': record_id}, label)
+
+
+def write_status(tenant):
+    """Tenant'ın (service account e-postası) bekleyen/başarısız yazım özeti: {'pending', 'failed', 'written', 'retries'}"""
+    return write_queue.status(tenant or DEFAULT_TENANT)
+
+
+def clear_failed_writes(tenant):
+    """Tenant'ın başarısız yazım listesini temizler (kullanıcı uyarıyı kapattığında)"""
+    write_queue.clear_failed(tenant or DEFAULT_TENANT)
+
+
+def show_write_status(tenant):
+    """Arka plan yazma kuyruğunun durumu: bekleyen ve Sheets'e yazılamayan değişiklikler"""
+    status = write_status(tenant)
+    if status['pending']:
+        st.caption(f"⏳ {status['pending']} değişiklik Google Sheets'e yazılıyor...")
+    for failure in status['failed']:
+        st.error(f"❌ Kaydedilemedi: {failure['label']} ({failure['error']})")
+    if status['failed'] and st.button("Uyarıları kapat", key="clear_failed_writes"):
+        clear_failed_writes(tenant)
+        st.rerun()